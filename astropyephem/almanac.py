@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+#
+#  almanac.py
+#  astropyephem
+#
+
+"""
+Nightly almanacs: sun and moon rise and set times, twilights, and moon phase.
+
+Rather than searching for each event separately, the altitudes of the Sun
+and Moon are scanned once over the whole date range on a coarse grid. Every
+horizon crossing found on the grid is then refined with a few exact
+:mod:`ephem` computations.
+"""
+
+from __future__ import (absolute_import, unicode_literals, division,
+                        print_function)
+
+import numpy as np
+import ephem
+
+import astropy.units as u
+from astropy.table import Table
+
+from .arrays import (ephem_instance, ephem_dates, astropy_times, sample, sidereal_time, hadec_to_altaz,
+    unit_vectors, radec_from_vectors, refine_root)
+
+__all__ = ['almanac', 'TWILIGHTS']
+
+#: Horizons (in degrees, for the center of the Sun without refraction) which define twilight.
+TWILIGHTS = (('civil', -6.0), ('nautical', -12.0), ('astronomical', -18.0))
+
+# The approximate altitude of the center of the Sun or Moon at rise or set,
+# without refraction. Used only to find events on the coarse grid.
+_RISE_SET_HORIZON = np.radians(-0.8333)
+
+def _limb_altitude(body, observer):
+    """The altitude of the upper limb, with refraction, as a function of date."""
+    def altitude(date):
+        observer.date = date
+        body.compute(observer)
+        return body.alt + body.radius
+    return altitude
+
+def _center_altitude(body, observer, horizon):
+    """The altitude of the center relative to a horizon, as a function of date."""
+    def altitude(date):
+        observer.date = date
+        body.compute(observer)
+        return body.alt - horizon
+    return altitude
+
+def _scan_altitude(body, observer, dates, coarse):
+    """Interpolate the altitude of a body onto a fine grid of dates from a coarse sampling."""
+    positions = sample(body, coarse, observer=observer, fields=('ra', 'dec'))
+    vectors = unit_vectors(positions['ra'], positions['dec'])
+    fine = np.stack([np.interp(dates, coarse, vectors[:, i]) for i in range(3)], axis=-1)
+    ra, dec = radec_from_vectors(fine)
+    lst = sidereal_time(dates, float(observer.lon))
+    alt, az = hadec_to_altaz(lst - ra, dec, float(observer.lat))
+    return alt
+
+def _first_crossings(altitude, horizon, dates, noons, rising):
+    """For each night, the index of the grid step containing the first crossing of a horizon."""
+    above = altitude > horizon
+    if rising:
+        steps = np.flatnonzero(~above[:-1] & above[1:])
+    else:
+        steps = np.flatnonzero(above[:-1] & ~above[1:])
+    nights = np.searchsorted(noons, dates[steps], side='right') - 1
+    first = np.full(len(noons) - 1, -1, dtype=int)
+    valid = (nights >= 0) & (nights < len(first))
+    nights, steps = nights[valid], steps[valid]
+    unique_nights, index = np.unique(nights, return_index=True)
+    first[unique_nights] = steps[index]
+    return first
+
+def _refine(func, steps, dates):
+    """Refine grid crossings into event dates, with ``nan`` where there is no event."""
+    events = np.full(steps.shape, np.nan)
+    for night, step in enumerate(steps):
+        if step >= 0:
+            events[night] = refine_root(func, dates[step], dates[step + 1])
+    return events
+
+def _event_times(dates):
+    """Event dates as an ISO formatted :class:`astropy.time.Time`, masked where there is no event."""
+    missing = np.isnan(dates)
+    times = astropy_times(np.where(missing, 0.0, dates))
+    if missing.any():
+        times[missing] = np.ma.masked
+    times.format = 'iso'
+    return times
+
+def almanac(observer, start, stop, step=10 * u.minute):
+    """Compute a nightly almanac for an observer.
+
+    Each row of the result is one night, beginning at local mean noon on
+    each date from ``start`` to ``stop``. Event columns are
+    :class:`astropy.time.Time` columns, which are masked when an event does
+    not happen that night (e.g. during polar day, or when the Moon does not
+    rise). Sunrise and sunset use the upper limb of the Sun and the
+    observer's refraction, like :meth:`ephem.Observer.next_setting`;
+    twilights use the center of the Sun without refraction.
+
+    :param observer: The :class:`~astropyephem.observers.Observer`.
+    :param start: The first date, as an :class:`astropy.time.Time`.
+    :param stop: The last date, as an :class:`astropy.time.Time`.
+    :param step: The spacing of the grid used to find events.
+    """
+    observer = ephem_instance(observer).copy()
+    airless = observer.copy()
+    airless.pressure = 0
+    local = float(observer.lon) / (2 * np.pi)
+    first, last = np.floor(ephem_dates(start) + local), np.floor(ephem_dates(stop) + local)
+    noons = np.arange(first, last + 2) - local
+    step = u.Quantity(step, u.day).value
+    dates = np.arange(noons[0], noons[-1] + step, step)
+    coarse = np.arange(noons[0] - 1.0 / 24.0, noons[-1] + 2.0 / 24.0, 1.0 / 24.0)
+    sun, moon = ephem.Sun(), ephem.Moon()
+
+    columns = [('date', astropy_times(noons[:-1] + 0.5))]
+    sun_altitude = _scan_altitude(sun, airless, dates, coarse)
+    evening, morning = [], []
+    steps = _first_crossings(sun_altitude, _RISE_SET_HORIZON, dates, noons, rising=False)
+    evening.append(('sunset', _refine(_limb_altitude(sun, observer), steps, dates)))
+    steps = _first_crossings(sun_altitude, _RISE_SET_HORIZON, dates, noons, rising=True)
+    morning.insert(0, ('sunrise', _refine(_limb_altitude(sun, observer), steps, dates)))
+    for name, horizon in TWILIGHTS:
+        horizon = np.radians(horizon)
+        func = _center_altitude(sun, airless, horizon)
+        steps = _first_crossings(sun_altitude, horizon, dates, noons, rising=False)
+        evening.append(('{}_twilight_evening'.format(name), _refine(func, steps, dates)))
+        steps = _first_crossings(sun_altitude, horizon, dates, noons, rising=True)
+        morning.insert(0, ('{}_twilight_morning'.format(name), _refine(func, steps, dates)))
+    columns += evening + morning
+
+    moon_altitude = _scan_altitude(moon, airless, dates, coarse)
+    for name, rising in (('moonrise', True), ('moonset', False)):
+        steps = _first_crossings(moon_altitude, _RISE_SET_HORIZON, dates, noons, rising=rising)
+        columns.append((name, _refine(_limb_altitude(moon, observer), steps, dates)))
+    columns = [(name, _event_times(value)) if name != 'date' else (name, value) for name, value in columns]
+    columns[0][1].format = 'iso'
+
+    phase = sample(moon, noons[:-1] + 0.5, observer=observer, fields=('elong', 'moon_phase'))
+    columns.append(('moon_phase', (phase['elong'] % (2 * np.pi)) / (2 * np.pi)))
+    columns.append(('moon_illumination', phase['moon_phase']))
+    table = Table([value for name, value in columns], names=[name for name, value in columns])
+    table['moon_phase'].description = "Fraction of the lunation since new moon, at local midnight."
+    table['moon_illumination'].description = "Illuminated fraction of the Moon's disk, at local midnight."
+    return table
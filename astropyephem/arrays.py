@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+#
+#  arrays.py
+#  astropyephem
+#
+
+"""
+Array helpers for evaluating :mod:`ephem` objects over many times.
+
+These work directly on the wrapped :mod:`ephem` instances and on plain
+:mod:`numpy` arrays, so that sweeps over time do not pay for creating an
+:mod:`astropy` object for every sample.
+"""
+
+from __future__ import (absolute_import, unicode_literals, division,
+                        print_function)
+
+import numpy as np
+
+import astropy.units as u
+import astropy.time
+
+__all__ = ['EPHEM_JD_OFFSET', 'ephem_instance', 'ephem_dates', 'astropy_times', 'date_grid', 'sample', 'nutation',
+    'sidereal_time', 'hadec_to_altaz', 'unit_vectors', 'radec_from_vectors', 'refine_root',
+    'precession_matrix', 'nutation_matrix', 'earth_velocity', 'apparent_place', 'REFRACTION_WAVELENGTH',
+    'dispersion', 'unrefract', 'refract']
+
+#: Julian date of the :mod:`ephem` date zero point (1899 December 31 12:00 UT).
+EPHEM_JD_OFFSET = 2415020.0
+
+#: Julian date of J2000.0
+JD_J2000 = 2451545.0
+
+def ephem_instance(obj):
+    """Return the :mod:`ephem` object wrapped by an :mod:`astropyephem` object, or the object itself."""
+    return getattr(obj, '__wrapped_instance__', obj)
+
+def ephem_dates(times):
+    """Convert an :class:`astropy.time.Time` (scalar or array) to :mod:`ephem` date floats."""
+    if not isinstance(times, astropy.time.Time):
+        times = astropy.time.Time(times, scale='utc')
+    utc = times.utc
+    return (np.asarray(utc.jd1) - EPHEM_JD_OFFSET) + np.asarray(utc.jd2)
+
+def astropy_times(dates):
+    """Convert :mod:`ephem` date floats to an :class:`astropy.time.Time`."""
+    return astropy.time.Time(EPHEM_JD_OFFSET, np.asarray(dates, dtype=np.float64), format='jd', scale='utc')
+
+def date_grid(start, stop, step):
+    """Return an evenly spaced grid of :mod:`ephem` dates from start up to and including stop."""
+    start, stop = ephem_dates(start), ephem_dates(stop)
+    step = u.Quantity(step, u.day).value
+    count = int(np.floor((stop - start) / step + 1e-9)) + 1
+    return start + step * np.arange(count)
+
+def sample(body, dates, observer=None, fields=('a_ra', 'a_dec')):
+    """Compute a body at each of a sequence of :mod:`ephem` dates.
+
+    The body (and observer, if given) are copied, so the originals are left
+    untouched. Returns a dictionary mapping each field name to a float array.
+    """
+    body = ephem_instance(body).copy()
+    dates = np.atleast_1d(np.asarray(dates, dtype=np.float64))
+    results = dict((field, np.empty(dates.shape, dtype=np.float64)) for field in fields)
+    if observer is not None:
+        observer = ephem_instance(observer).copy()
+    for i, date in enumerate(dates):
+        if observer is not None:
+            observer.date = date
+            body.compute(observer)
+        else:
+            body.compute(date)
+        for field in fields:
+            results[field][i] = getattr(body, field)
+    return results
+
+def nutation(dates):
+    """Return the nutation in longitude, nutation in obliquity and mean obliquity, in radians.
+
+    Uses the four largest terms of the IAU 1980 series, which is good to about
+    half an arcsecond.
+    """
+    t = (np.asarray(dates) + EPHEM_JD_OFFSET - JD_J2000) / 36525.0
+    node = np.radians(125.04452 - 1934.136261 * t)
+    sun = np.radians(2 * (280.4665 + 36000.7698 * t))
+    moon = np.radians(2 * (218.3165 + 481267.8813 * t))
+    dpsi = -17.20 * np.sin(node) - 1.32 * np.sin(sun) - 0.23 * np.sin(moon) + 0.21 * np.sin(2 * node)
+    deps = 9.20 * np.cos(node) + 0.57 * np.cos(sun) + 0.10 * np.cos(moon) - 0.09 * np.cos(2 * node)
+    obliquity = 23.439291111 - 0.0130041667 * t
+    return np.radians(dpsi / 3600.0), np.radians(deps / 3600.0), np.radians(obliquity)
+
+def sidereal_time(dates, longitude):
+    """Local apparent sidereal time in radians for :mod:`ephem` dates and a longitude in radians.
+
+    Like :mod:`ephem`, this treats UTC as UT1. Agrees with
+    :meth:`ephem.Observer.sidereal_time` to a few hundredths of a second.
+    """
+    days = np.asarray(dates) + EPHEM_JD_OFFSET - JD_J2000
+    t = days / 36525.0
+    gmst = 280.46061837 + 360.98564736629 * days + (0.000387933 - t / 38710000.0) * t * t
+    dpsi, deps, obliquity = nutation(dates)
+    return (np.radians(gmst % 360.0) + dpsi * np.cos(obliquity + deps) + np.asarray(longitude)) % (2 * np.pi)
+
+def hadec_to_altaz(ha, dec, latitude, temperature=None, pressure=None, wavelength=None):
+    """Convert hour angle and declination to altitude and azimuth (east of north), all in radians.
+
+    Altitudes are geometric unless a pressure (in mbar) is given, when they
+    are refracted with :func:`refract` for the temperature (in C, 15 if not
+    given), pressure and wavelength, which may be arrays like the angles.
+    """
+    sin_lat, cos_lat = np.sin(latitude), np.cos(latitude)
+    sin_dec, cos_dec = np.sin(dec), np.cos(dec)
+    cos_ha = np.cos(ha)
+    alt = np.arcsin(np.clip(sin_lat * sin_dec + cos_lat * cos_dec * cos_ha, -1.0, 1.0))
+    az = np.arctan2(-cos_dec * np.sin(ha), sin_dec * cos_lat - cos_dec * cos_ha * sin_lat) % (2 * np.pi)
+    if pressure is not None:
+        alt = refract(alt, 15.0 if temperature is None else temperature, pressure, wavelength)
+    return alt, az
+
+def unit_vectors(ra, dec):
+    """Cartesian unit vectors, with the coordinate along the last axis, for angles in radians."""
+    cos_dec = np.cos(dec)
+    return np.stack([cos_dec * np.cos(ra), cos_dec * np.sin(ra), np.sin(dec) * np.ones_like(ra)], axis=-1)
+
+def radec_from_vectors(vectors):
+    """Right ascension and declination in radians for (not necessarily unit) cartesian vectors."""
+    vectors = np.asarray(vectors)
+    x, y, z = vectors[..., 0], vectors[..., 1], vectors[..., 2]
+    ra = np.arctan2(y, x) % (2 * np.pi)
+    dec = np.arctan2(z, np.hypot(x, y))
+    return ra, dec
+
+def refine_root(func, lower, upper, tolerance=1e-5, maxiter=50):
+    """Find a root of a scalar function of :mod:`ephem` date between two dates.
+
+    Uses the Illinois variant of regula falsi. If the end points do not bracket
+    a root, the interval is widened a few times before giving up and returning
+    ``nan``. The default tolerance is just under one second.
+    """
+    f_lower, f_upper = func(lower), func(upper)
+    width = upper - lower
+    for expansion in range(4):
+        if f_lower * f_upper <= 0:
+            break
+        if expansion == 3:
+            return np.nan
+        lower, upper = lower - width, upper + width
+        f_lower, f_upper = func(lower), func(upper)
+    side = 0
+    for iteration in range(maxiter):
+        if f_upper == f_lower:
+            return 0.5 * (lower + upper)
+        guess = (lower * f_upper - upper * f_lower) / (f_upper - f_lower)
+        f_guess = func(guess)
+        if f_guess * f_upper > 0:
+            upper, f_upper = guess, f_guess
+            if side == -1:
+                f_lower *= 0.5
+            side = -1
+        else:
+            lower, f_lower = guess, f_guess
+            if side == 1:
+                f_upper *= 0.5
+            side = 1
+        if abs(upper - lower) < tolerance or f_guess == 0:
+            return guess
+    return guess
+
+def _rotation(angle, axis):
+    """Rotation matrices (stacked along leading axes) about a coordinate axis, for frame rotations."""
+    angle = np.asarray(angle, dtype=np.float64)
+    c, s = np.cos(angle), np.sin(angle)
+    i, j = [(1, 2), (2, 0), (0, 1)][axis]
+    matrix = np.empty(angle.shape + (3, 3))
+    matrix[..., axis, :] = 0.0
+    matrix[..., :, axis] = 0.0
+    matrix[..., axis, axis] = 1.0
+    matrix[..., i, i] = c
+    matrix[..., j, j] = c
+    matrix[..., i, j] = s
+    matrix[..., j, i] = -s
+    return matrix
+
+def precession_matrix(dates):
+    """IAU 1976 precession matrices from the mean equator and equinox of J2000 to that of each date."""
+    t = (np.asarray(dates) + EPHEM_JD_OFFSET - JD_J2000) / 36525.0
+    zeta = np.radians((2306.2181 + (0.30188 + 0.017998 * t) * t) * t / 3600.0)
+    z = np.radians((2306.2181 + (1.09468 + 0.018203 * t) * t) * t / 3600.0)
+    theta = np.radians((2004.3109 - (0.42665 + 0.041833 * t) * t) * t / 3600.0)
+    return np.matmul(_rotation(-z, 2), np.matmul(_rotation(theta, 1), _rotation(-zeta, 2)))
+
+def nutation_matrix(dates):
+    """Nutation matrices from the mean to the true equator and equinox of each date."""
+    dpsi, deps, obliquity = nutation(dates)
+    return np.matmul(_rotation(-(obliquity + deps), 0), np.matmul(_rotation(-dpsi, 2), _rotation(obliquity, 0)))
+
+def earth_velocity(dates):
+    """The velocity of the Earth in units of the speed of light, in mean equatorial coordinates of date.
+
+    Uses a circular-orbit approximation from the true longitude of the Sun,
+    good to better than half an arcsecond in the aberration it implies.
+    """
+    t = (np.asarray(dates) + EPHEM_JD_OFFSET - JD_J2000) / 36525.0
+    anomaly = np.radians(357.52911 + 35999.05029 * t)
+    longitude = np.radians(280.46646 + 36000.76983 * t
+        + (1.914602 - 0.004817 * t) * np.sin(anomaly) + 0.019993 * np.sin(2 * anomaly))
+    _, _, obliquity = nutation(dates)
+    kappa = np.radians(20.49552 / 3600.0)
+    vx = kappa * np.sin(longitude)
+    vy = -kappa * np.cos(longitude)
+    return np.stack([vx, vy * np.cos(obliquity), vy * np.sin(obliquity)], axis=-1)
+
+def apparent_place(ra, dec, dates):
+    """Reduce mean J2000 (FK5) positions to apparent positions of date, in radians.
+
+    Applies IAU 1976 precession, nutation and annual aberration, the same
+    steps :mod:`ephem` uses for fixed bodies. ``ra`` and ``dec`` broadcast
+    against ``dates``.
+    """
+    dates = np.asarray(dates, dtype=np.float64)
+    vectors = unit_vectors(*np.broadcast_arrays(ra, dec, dates)[:2])
+    velocity = np.broadcast_to(earth_velocity(dates), vectors.shape)
+    vectors = np.einsum('...ij,...j->...i', precession_matrix(dates), vectors)
+    vectors = vectors + velocity - np.sum(vectors * velocity, axis=-1)[..., np.newaxis] * vectors
+    vectors = np.einsum('...ij,...j->...i', nutation_matrix(dates), vectors)
+    return radec_from_vectors(vectors)
+
+#: The wavelength at which the refractivity of standard air matches the
+#: refraction constant of :mod:`ephem`, in microns.
+REFRACTION_WAVELENGTH = 0.574
+
+def _refractivity(wavelength):
+    """Edlen's (1966) dispersion of standard air, as (n - 1) * 1e8, for vacuum wavelengths in microns."""
+    sigma2 = 1.0 / np.asarray(wavelength, dtype=np.float64) ** 2
+    return 8342.13 + 2406030.0 / (130.0 - sigma2) + 15997.0 / (38.9 - sigma2)
+
+def dispersion(wavelength):
+    """The refraction at a wavelength relative to that of the :mod:`ephem` model.
+
+    :param wavelength: A vacuum wavelength as a length, or a number in microns,
+        or `None` for the :mod:`ephem` model itself.
+    """
+    if wavelength is None:
+        return 1.0
+    return _refractivity(u.Quantity(wavelength, u.micron).value) / _refractivity(REFRACTION_WAVELENGTH)
+
+def unrefract(altitude, temperature, pressure, wavelength=None):
+    """Remove refraction from apparent altitudes in radians, for temperatures in C and pressures in mbar.
+
+    This is the model used by :mod:`ephem`: the Saemundsson-style formula of
+    the Explanatory Supplement below 14.5 degrees, a cotangent law above 15.5
+    degrees, and a linear blend between them. Temperatures, pressures and
+    wavelengths may be arrays which broadcast against the altitudes; the
+    refraction is scaled by :func:`dispersion` for the wavelength.
+    """
+    altitude = np.asarray(altitude, dtype=np.float64)
+    pressure = np.asarray(pressure, dtype=np.float64) * dispersion(wavelength)
+    degrees = np.degrees(altitude)
+    kelvin = 273.0 + np.asarray(temperature, dtype=np.float64)
+    low = np.radians(pressure * (0.1594 + 0.0196 * degrees + 2e-5 * degrees * degrees)
+        / (kelvin * (1.0 + 0.505 * degrees + 0.0845 * degrees * degrees)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        high = 7.888888e-5 * pressure / (kelvin * np.tan(altitude))
+        weight = np.clip(degrees - 14.5, 0.0, 1.0)
+        return altitude - np.where(degrees < 14.5, low, (1.0 - weight) * low + weight * high)
+
+def refract(altitude, temperature, pressure, wavelength=None, iterations=8):
+    """Apply refraction to true altitudes in radians, for temperatures in C and pressures in mbar.
+
+    Inverts :func:`unrefract` with the secant method, as :mod:`ephem` does,
+    and like :mod:`ephem` never lowers a position.
+    """
+    altitude = np.asarray(altitude, dtype=np.float64)
+    previous = unrefract(altitude, temperature, pressure, wavelength)
+    delta = 0.8 * (altitude - previous)
+    apparent = altitude
+    for iteration in range(iterations):
+        apparent = apparent + delta
+        current = unrefract(apparent, temperature, pressure, wavelength)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            delta = np.where(current != previous, -delta * (altitude - current) / (previous - current), 0.0)
+        previous = current
+    return np.maximum(apparent, altitude)
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+#
+#  batch.py
+#  astropyephem
+#
+
+"""
+Ephemerides for many targets computed in parallel, from the command line.
+
+Targets are read from a text file with one target per line, which may be
+the name of a planet or moon (``Mars``), an XEphem database line, or a name,
+right ascension and declination (J2000) separated by spaces::
+
+    Mars
+    M31 00:42:44.3 +41:16:09
+    Vega 279.2347 38.7837
+    C/2020 F3 (NEOWISE),e,128.9375,61.0103,37.2786,358.4460,0.0001240,0.999170,0.0000,07/03.6761/2020,2000,g  8.0,3.2
+
+Right ascensions containing a colon are in hours, others in degrees. Lines
+starting with ``#`` are ignored.
+
+The observer is a JSON object of ``lat`` and ``lon`` (in degrees, or as
+sexagesimal strings), ``elevation`` in meters, and optionally ``temp`` in
+Celsius and ``pressure`` in mbar.
+
+The time grid is split into chunks for each target, and the chunks are
+computed by a pool of processes and written, in order, as they finish.
+"""
+
+from __future__ import (absolute_import, unicode_literals, division,
+                        print_function)
+
+import io
+import json
+import timeit
+import itertools
+import collections
+import multiprocessing
+
+import numpy as np
+import ephem
+
+import astropy.units as u
+from astropy.time import Time
+from astropy.coordinates import SkyCoord
+
+from .ephemeris import EphemerisWriter, _body_name, _time_grid, _chunk
+
+__all__ = ['read_targets', 'parse_target', 'observer_from_dict', 'batch_ephemeris', 'main']
+
+def read_targets(filename):
+    """The target lines of a target file, without blanks and comments."""
+    with io.open(filename, encoding='utf-8') as stream:
+        lines = [line.strip() for line in stream]
+    return [line for line in lines if line and not line.startswith('#')]
+
+def parse_target(line):
+    """A body from a line of a target file."""
+    from .targets import FixedBody
+    if ',' in line:
+        return ephem.readdb(str(line))
+    parts = line.split()
+    if len(parts) == 1:
+        planet = getattr(ephem, parts[0], None)
+        if not (isinstance(planet, type) and issubclass(planet, ephem.Planet)):
+            raise ValueError("Unknown target '{}'.".format(parts[0]))
+        return planet()
+    if len(parts) < 3:
+        raise ValueError("Can't read a target from '{}'.".format(line))
+    name, ra, dec = " ".join(parts[:-2]), parts[-2], parts[-1]
+    body = FixedBody(SkyCoord(ra, dec, unit=(u.hourangle if ':' in ra else u.deg, u.deg)))
+    body.__wrapped_instance__.name = str(name)
+    return body
+
+def observer_from_dict(definition):
+    """An :class:`ephem.Observer` from a dictionary like that of an observer file."""
+    observer = ephem.Observer()
+    observer.lat, observer.lon = str(definition['lat']), str(definition['lon'])
+    observer.elevation = float(definition.get('elevation', 0.0))
+    for name in ('temp', 'pressure'):
+        if name in definition:
+            setattr(observer, name, float(definition[name]))
+    return observer
+
+def _compute(task):
+    """Compute one chunk in a worker, from picklable arguments."""
+    line, name, name_dtype, dates, definition, fields = task
+    observer = None if definition is None else observer_from_dict(definition)
+    return _chunk(parse_target(line), name, name_dtype, dates, observer, fields)
+
+def _bounded_imap(pool, func, tasks, max_pending):
+    """Like :meth:`multiprocessing.pool.Pool.imap`, but with at most ``max_pending`` tasks submitted and not yet
+    consumed, so that neither the tasks nor the results are read or held far ahead of the caller."""
+    pending = collections.deque()
+    tasks = iter(tasks)
+    for task in itertools.islice(tasks, max_pending):
+        pending.append(pool.apply_async(func, (task,)))
+    while pending:
+        result = pending.popleft().get()
+        for task in itertools.islice(tasks, 1):
+            pending.append(pool.apply_async(func, (task,)))
+        yield result
+
+def batch_ephemeris(lines, start, stop, step, observer=None, fields=None, processes=None, chunk_size=10000,
+    max_pending=None):
+    """Yield ephemeris tables of many targets, computed by a pool of processes.
+
+    Chunks are yielded in the same order as :func:`~astropyephem.ephemeris.ephemeris_chunks`
+    would yield them.
+
+    :param lines: Target file lines.
+    :param observer: An observer dictionary, as read by :func:`observer_from_dict`.
+    :param processes: The number of worker processes, or all processors if
+        not given. With one process, chunks are computed in this process.
+    :param chunk_size: The largest number of rows in each table.
+    :param max_pending: The largest number of chunks being computed or
+        waiting to be yielded, by default twice the number of processes, so
+        that memory does not grow when the tables are written more slowly
+        than they are computed.
+    """
+    if fields is None:
+        fields = ('a_ra', 'a_dec') if observer is None else ('a_ra', 'a_dec', 'alt', 'az')
+    names = [_body_name(parse_target(line)) for line in lines]
+    name_dtype = 'U{}'.format(max(len(name) for name in names))
+    first, step, count = _time_grid(start, stop, step)
+    tasks = ((line, name, name_dtype, first + step * np.arange(offset, min(offset + chunk_size, count)),
+        observer, tuple(fields)) for line, name in zip(lines, names) for offset in range(0, count, chunk_size))
+    if processes == 1:
+        for task in tasks:
+            yield _compute(task)
+        return
+    processes = processes or multiprocessing.cpu_count()
+    pool = multiprocessing.Pool(processes)
+    try:
+        for table in _bounded_imap(pool, _compute, tasks, max_pending or 2 * processes):
+            yield table
+    finally:
+        pool.terminate()
+        pool.join()
+
+def main(args=None):
+    """Command-line entry point to compute ephemerides for a file of targets."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Compute ephemerides for a file of targets in parallel.")
+    parser.add_argument('targets', help="Target file, with one target per line.")
+    parser.add_argument('output', help="Output file (.csv, .ecsv or .fits).")
+    parser.add_argument('--observer', default=None, help="Observer JSON file, for topocentric fields.")
+    parser.add_argument('--start', required=True, help="First date (any astropy Time string).")
+    parser.add_argument('--stop', required=True, help="Last date (any astropy Time string).")
+    parser.add_argument('--step', default='1 hour', help="Time step, e.g. '10 min'.")
+    parser.add_argument('--fields', default=None, help="Comma separated fields (default: a_ra,a_dec and alt,az).")
+    parser.add_argument('--format', default=None, help="Output format (default: from the extension).")
+    parser.add_argument('--processes', type=int, default=None, help="Worker processes (default: all processors).")
+    parser.add_argument('--chunk-size', type=int, default=10000, help="Rows computed by each task.")
+    opts = parser.parse_args(args)
+    observer = None
+    if opts.observer:
+        with io.open(opts.observer, encoding='utf-8') as stream:
+            observer = json.load(stream)
+    fields = opts.fields.split(",") if opts.fields else None
+    lines = read_targets(opts.targets)
+    began = timeit.default_timer()
+    with EphemerisWriter(opts.output, format=opts.format) as writer:
+        for table in batch_ephemeris(lines, Time(opts.start, scale='utc'), Time(opts.stop, scale='utc'),
+            u.Quantity(opts.step), observer=observer, fields=fields, processes=opts.processes,
+            chunk_size=opts.chunk_size):
+            writer.write(table)
+    elapsed = timeit.default_timer() - began
+    print("Wrote {} rows for {} targets to {} in {:.2f} s ({:.0f} rows/s).".format(writer.rows, len(lines),
+        opts.output, elapsed, writer.rows / elapsed if elapsed > 0 else float('inf')))
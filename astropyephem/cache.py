@@ -0,0 +1,362 @@
+# -*- coding: utf-8 -*-
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+#
+#  cache.py
+#  astropyephem
+#
+
+"""
+Caches for computed positions.
+
+The geocentric part of a computation (distances, magnitude, phase and the
+apparent geocentric place) depends only on the body and the date, so many
+observers can share it. :class:`GeocentricCache` computes it once per body
+and date with :mod:`ephem`, and derives the topocentric place for each
+observer from it with diurnal parallax, sidereal time and refraction.
+
+:class:`DiskCache` keeps complete results of computations and rise, set and
+transit searches in an SQLite database, so that they survive between runs
+and can be shared by several processes.
+"""
+
+from __future__ import (absolute_import, unicode_literals, division,
+                        print_function)
+
+import os
+import math
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import contextlib
+from collections import OrderedDict
+
+import ephem
+
+from .arrays import ephem_instance, sidereal_time
+from .bases import SNAPSHOT_FIELDS
+
+__all__ = ['GEOCENTRIC_FIELDS', 'SEARCHES', 'body_key', 'observer_key', 'GeocentricCache', 'DiskCache']
+
+#: Fields which do not depend on the observer, when present on a body.
+GEOCENTRIC_FIELDS = ('g_ra', 'g_dec', 'a_ra', 'a_dec', 'earth_distance', 'sun_distance', 'mag', 'size',
+    'phase', 'elong', 'radius', 'hlon', 'hlat')
+
+#: The :class:`ephem.Observer` searches which :meth:`DiskCache.search` can cache.
+SEARCHES = ('next_rising', 'next_setting', 'next_transit', 'next_antitransit',
+    'previous_rising', 'previous_setting', 'previous_transit', 'previous_antitransit')
+
+# The equatorial radius and flattening of the Earth, and the astronomical unit, in meters.
+_EARTH_RADIUS = 6378137.0
+_EARTH_FLATTENING = 1.0 / 298.257
+_AU = 149597870700.0
+
+def _definition(body):
+    """The defining parameters of an :mod:`ephem` body, at full precision, by attribute name."""
+    parameters = []
+    for name in sorted(dir(type(body))):
+        if not name.startswith('_') or name.startswith('__'):
+            continue
+        try:
+            value = getattr(body, name)
+        except (AttributeError, ValueError, RuntimeError):
+            continue
+        parameters.append((name, repr(value if isinstance(value, str) else float(value))))
+    return tuple(parameters)
+
+def body_key(body):
+    """A hashable key for the definition of a body, independent of its computed state.
+
+    The key holds the full name and the exact values of the orbital elements
+    or catalog position, since the database line written by
+    :meth:`ephem.Body.writedb` rounds them.
+    """
+    body = ephem_instance(body)
+    try:
+        definition = body.writedb()
+    except (AttributeError, ValueError, TypeError):
+        definition = None
+    return (type(body).__name__, body.name, _definition(body), definition)
+
+def observer_key(observer):
+    """A hashable key for the parameters of an observer, including its date."""
+    observer = ephem_instance(observer)
+    return tuple(float(getattr(observer, name)) for name in
+        ('lat', 'lon', 'elevation', 'temp', 'pressure', 'horizon', 'epoch', 'date'))
+
+def _observer_vector(observer, lst):
+    """The geocentric position of an observer in AU, in the equatorial frame of date."""
+    latitude = float(observer.lat)
+    e2 = 2 * _EARTH_FLATTENING - _EARTH_FLATTENING ** 2
+    normal = _EARTH_RADIUS / math.sqrt(1 - e2 * math.sin(latitude) ** 2)
+    rho = (normal + observer.elevation) * math.cos(latitude) / _AU
+    z = (normal * (1 - e2) + observer.elevation) * math.sin(latitude) / _AU
+    return rho * math.cos(lst), rho * math.sin(lst), z
+
+def _unrefract(altitude, temperature, pressure):
+    """A scalar form of :func:`~astropyephem.arrays.unrefract`, for the per-observer path."""
+    degrees = math.degrees(altitude)
+    kelvin = 273.0 + temperature
+    low = math.radians(pressure * (0.1594 + 0.0196 * degrees + 2e-5 * degrees * degrees)
+        / (kelvin * (1.0 + 0.505 * degrees + 0.0845 * degrees * degrees)))
+    if degrees < 14.5:
+        return altitude - low
+    high = 7.888888e-5 * pressure / (kelvin * math.tan(altitude))
+    weight = min(degrees - 14.5, 1.0)
+    return altitude - ((1.0 - weight) * low + weight * high)
+
+def _refract(altitude, temperature, pressure):
+    """A scalar form of :func:`~astropyephem.arrays.refract`, for the per-observer path."""
+    previous = _unrefract(altitude, temperature, pressure)
+    delta = 0.8 * (altitude - previous)
+    apparent = altitude
+    for iteration in range(8):
+        apparent += delta
+        current = _unrefract(apparent, temperature, pressure)
+        if current == previous or abs(altitude - current) < 1e-9:
+            break
+        delta *= -(altitude - current) / (previous - current)
+        previous = current
+    return max(apparent, altitude)
+
+class GeocentricCache(object):
+    """A least-recently-used cache of geocentric results, shared between observers.
+
+    Topocentric places derived from the cache agree with :mod:`ephem` to a
+    fraction of an arcsecond. Bodies without a distance (fixed bodies and
+    planet moons) are treated as infinitely distant, which ignores at most a
+    couple of arcseconds of parallax for planet moons. Earth satellites have
+    no observer-independent position, and are rejected.
+
+    :param maxsize: The largest number of (body, date) results to keep.
+    """
+
+    def __init__(self, maxsize=1024):
+        super(GeocentricCache, self).__init__()
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        """Represent this cache."""
+        return "<{} {}/{} entries, {} hits, {} misses>".format(self.__class__.__name__, len(self), self.maxsize,
+            self.hits, self.misses)
+
+    def __len__(self):
+        return len(self._results)
+
+    def clear(self):
+        """Empty the cache."""
+        with self._lock:
+            self._results.clear()
+
+    def _entry(self, body, date, epoch):
+        """The cached geocentric fields and Greenwich apparent sidereal time for a body and date."""
+        key = (body_key(body), date, float(epoch))
+        with self._lock:
+            entry = self._results.pop(key, None)
+            if entry is not None:
+                self._results[key] = entry
+                self.hits += 1
+                return entry
+        body = ephem_instance(body)
+        if isinstance(body, ephem.EarthSatellite):
+            raise TypeError("Earth satellites have no observer-independent position.")
+        body = body.copy()
+        body.compute(date, epoch=epoch)
+        cls = type(body)
+        entry = (dict((name, getattr(body, name)) for name in GEOCENTRIC_FIELDS if hasattr(cls, name)),
+            float(sidereal_time(date, 0.0)))
+        with self._lock:
+            self.misses += 1
+            self._results[key] = entry
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+        return entry
+
+    def geocentric(self, body, date, epoch=ephem.J2000):
+        """The geocentric fields of a body at an :mod:`ephem` date, as a dictionary of floats."""
+        return dict(self._entry(body, float(date), epoch)[0])
+
+    def compute(self, body, observer):
+        """The geocentric and topocentric fields of a body for an observer at the observer's date.
+
+        Returns a dictionary of the :data:`GEOCENTRIC_FIELDS` for the body,
+        and the topocentric ``ra``, ``dec``, ``ha``, ``alt`` and ``az``, all
+        floats in the units used by :mod:`ephem`.
+        """
+        observer = ephem_instance(observer)
+        fields, gast = self._entry(body, float(observer.date), observer.epoch)
+        result = dict(fields)
+        lst = (gast + float(observer.lon)) % (2 * math.pi)
+        ra, dec = result['g_ra'], result['g_dec']
+        if 'earth_distance' in result:
+            distance, cos_dec = result['earth_distance'], math.cos(dec)
+            x, y, z = _observer_vector(observer, lst)
+            x = distance * cos_dec * math.cos(ra) - x
+            y = distance * cos_dec * math.sin(ra) - y
+            z = distance * math.sin(dec) - z
+            ra, dec = math.atan2(y, x) % (2 * math.pi), math.atan2(z, math.hypot(x, y))
+        ha = (lst - ra) % (2 * math.pi)
+        latitude = float(observer.lat)
+        sin_lat, cos_lat = math.sin(latitude), math.cos(latitude)
+        sin_dec, cos_dec, cos_ha = math.sin(dec), math.cos(dec), math.cos(ha)
+        alt = math.asin(max(-1.0, min(1.0, sin_lat * sin_dec + cos_lat * cos_dec * cos_ha)))
+        az = math.atan2(-cos_dec * math.sin(ha), sin_dec * cos_lat - cos_dec * cos_ha * sin_lat) % (2 * math.pi)
+        if observer.pressure > 0:
+            alt = _refract(alt, observer.temp, observer.pressure)
+        result.update(ra=ra, dec=dec, ha=ha, alt=alt, az=az)
+        return result
+
+class DiskCache(object):
+    """A persistent cache of computed fields and search results, in an SQLite database.
+
+    Entries are keyed by a hash of the exact body definition (see
+    :func:`body_key`), the observer parameters and the date. When the stored
+    results grow beyond ``max_bytes``, the least recently used entries are
+    removed. The database uses write-ahead logging and each process and
+    thread opens its own connection, so several processes can share one
+    cache file.
+
+    :param filename: The database file, which is created if needed.
+    :param max_bytes: The largest total size of the stored results.
+    """
+
+    def __init__(self, filename, max_bytes=64 * 1024 * 1024):
+        super(DiskCache, self).__init__()
+        self.filename = filename
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        with self._transaction() as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, value TEXT, size INTEGER, accessed REAL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+            connection.execute("CREATE TABLE IF NOT EXISTS meta (total INTEGER)")
+            if connection.execute("SELECT COUNT(*) FROM meta").fetchone()[0] == 0:
+                connection.execute("INSERT INTO meta VALUES (0)")
+
+    def __repr__(self):
+        """Represent this cache."""
+        return "<{} '{}' {} entries>".format(self.__class__.__name__, self.filename, len(self))
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def _connection(self):
+        """The connection for this process and thread."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.filename, timeout=60.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """A write transaction, which takes the database lock up front."""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def get(self, key):
+        """The value stored for a key, or `None`."""
+        connection = self._connection()
+        row = connection.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        with self._transaction() as connection:
+            connection.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        """Store a JSON serializable value for a key, evicting old entries if the cache is too big."""
+        value = json.dumps(value)
+        with self._transaction() as connection:
+            old = connection.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+            connection.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                (key, value, len(value), time.time()))
+            connection.execute("UPDATE meta SET total = total + ?", (len(value) - (old[0] if old else 0),))
+            total = connection.execute("SELECT total FROM meta").fetchone()[0]
+            if total > self.max_bytes:
+                rows = connection.execute("SELECT key, size FROM results ORDER BY accessed")
+                evicted = []
+                for key, size in rows:
+                    if total <= 0.9 * self.max_bytes:
+                        break
+                    evicted.append((key,))
+                    total -= size
+                connection.executemany("DELETE FROM results WHERE key = ?", evicted)
+                connection.execute("UPDATE meta SET total = ?", (total,))
+
+    def clear(self):
+        """Remove every entry."""
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM results")
+            connection.execute("UPDATE meta SET total = 0")
+
+    @staticmethod
+    def key(*parts):
+        """A hash of the repr of some key parts."""
+        return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+    def compute(self, body, observer):
+        """Every computed field of a body for an observer (or an :mod:`ephem` date), as a dictionary.
+
+        The fields are those of :meth:`~astropyephem.bases.EphemPositionClass.snapshot`,
+        with `None` for fields which are undefined.
+        """
+        if isinstance(ephem_instance(observer), ephem.Observer):
+            circumstances = observer_key(observer)
+            observer = ephem_instance(observer)
+        else:
+            circumstances = float(observer)
+        key = self.key('compute', body_key(body), circumstances)
+        result = self.get(key)
+        if result is None:
+            body = ephem_instance(body).copy()
+            body.compute(observer)
+            result = {}
+            for name, unit in SNAPSHOT_FIELDS:
+                if hasattr(type(body), name):
+                    try:
+                        result[name] = float(getattr(body, name))
+                    except RuntimeError:
+                        result[name] = None
+            self.set(key, result)
+        return result
+
+    def search(self, observer, method, body, start=None, use_center=False):
+        """The result of an :class:`ephem.Observer` search such as ``next_rising``, as an :mod:`ephem` date.
+
+        Errors from the search, such as :exc:`ephem.NeverUpError`, are cached
+        and raised again.
+        """
+        if method not in SEARCHES:
+            raise ValueError("Can't cache the search '{}'.".format(method))
+        observer = ephem_instance(observer)
+        start = observer.date if start is None else start
+        key = self.key('search', method, body_key(body), observer_key(observer), float(start), bool(use_center))
+        result = self.get(key)
+        if result is None:
+            try:
+                result = {'date': float(getattr(observer.copy(), method)(ephem_instance(body).copy(),
+                    start=start, use_center=use_center))}
+            except ephem.CircumpolarError as error:
+                result = {'error': type(error).__name__, 'message': str(error)}
+            self.set(key, result)
+        if 'error' in result:
+            raise getattr(ephem, result['error'])(result['message'])
+        return ephem.Date(result['date'])
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+#
+#  constellations.py
+#  astropyephem
+#
+
+"""
+Constellation lookup for whole catalogs at once.
+
+In the equinox of B1875 the constellation boundaries are lines of constant
+right ascension and declination, so every boundary value cuts the sky into a
+grid of rectangles which each lie in a single constellation. The grid is
+built once from the boundary table in ``data/constellation_boundaries.dat``,
+labelling each rectangle with :func:`ephem.constellation`, and positions are
+then looked up with two binary searches.
+"""
+
+from __future__ import (absolute_import, unicode_literals, division,
+                        print_function)
+
+import numpy as np
+import ephem
+
+from astropy.coordinates import FK5
+from astropy.utils.data import get_pkg_data_filename
+
+from .bases import EQUINOX_J2000
+from .arrays import precession_matrix, unit_vectors, radec_from_vectors
+
+__all__ = ['constellation', 'ConstellationIndex']
+
+# The epoch to which libastro precesses positions before looking them up.
+_B1875 = float(ephem.Date('1875'))
+
+class ConstellationIndex(object):
+    """A grid of B1875 rectangles, each labelled with a single constellation.
+
+    Right ascension boundaries are in units of 2 seconds of time and
+    declination boundaries in arcminutes, as in libastro.
+    """
+
+    def __init__(self, filename=None):
+        super(ConstellationIndex, self).__init__()
+        if filename is None:
+            filename = get_pkg_data_filename('data/constellation_boundaries.dat')
+        table = np.loadtxt(filename, usecols=(0, 1, 2), dtype=int)
+        self.ra_edges = np.unique(table[:, :2])
+        self.dec_edges = np.unique(np.concatenate([table[:, 2], [-90 * 60, 90 * 60]]))
+        ra = np.radians(0.5 * (self.ra_edges[:-1] + self.ra_edges[1:]) / 1800.0 * 15.0)
+        dec = np.radians(0.5 * (self.dec_edges[:-1] + self.dec_edges[1:]) / 60.0)
+        names = {}
+        self.labels = np.empty((len(dec), len(ra)), dtype=np.int16)
+        for j, d in enumerate(dec):
+            for i, r in enumerate(ra):
+                abbreviation, name = ephem.constellation((r, d), epoch=_B1875)
+                self.labels[j, i] = names.setdefault((abbreviation, name), len(names))
+        names = sorted(names, key=names.get)
+        self.abbreviations = np.array([abbreviation for abbreviation, name in names])
+        self.names = np.array([name for abbreviation, name in names])
+
+    def __repr__(self):
+        """Represent this index."""
+        return "<{} {}x{} cells>".format(self.__class__.__name__, len(self.dec_edges) - 1, len(self.ra_edges) - 1)
+
+    def lookup(self, ra, dec):
+        """Label indices for B1875 right ascensions and declinations in radians."""
+        ra_units = np.floor(np.degrees(np.asarray(ra) % (2 * np.pi)) / 15.0 * 1800.0)
+        arcmin = np.degrees(np.asarray(dec)) * 60.0
+        dec_units = np.trunc(arcmin) - (arcmin < 0)
+        i = np.clip(np.searchsorted(self.ra_edges, ra_units, side='right') - 1, 0, len(self.ra_edges) - 2)
+        j = np.clip(np.searchsorted(self.dec_edges, dec_units, side='right') - 1, 0, len(self.dec_edges) - 2)
+        return self.labels[j, i]
+
+_index = None
+
+def _get_index():
+    """The shared :class:`ConstellationIndex`, built on first use."""
+    global _index
+    if _index is None:
+        _index = ConstellationIndex()
+    return _index
+
+def constellation(coords, short_name=True):
+    """The constellations containing an array of coordinates.
+
+    Agrees with :func:`ephem.constellation` for positions given in the
+    equinox of J2000.
+
+    :param coords: A :class:`~astropy.coordinates.SkyCoord`, scalar or array.
+    :param short_name: Return the three letter abbreviations, rather than the full names.
+    :returns: A string, or an array of strings with the shape of ``coords``.
+    """
+    index = _get_index()
+    fk5 = coords.transform_to(FK5(equinox=EQUINOX_J2000))
+    vectors = unit_vectors(np.asarray(fk5.ra.radian), np.asarray(fk5.dec.radian))
+    ra, dec = radec_from_vectors(np.dot(vectors, precession_matrix(_B1875).T))
+    names = index.abbreviations if short_name else index.names
+    result = names[index.lookup(ra, dec)]
+    return result if np.ndim(result) else result.item()
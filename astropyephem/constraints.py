@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+#
+#  constraints.py
+#  astropyephem
+#
+
+"""
+Observing constraints evaluated for many targets over a grid of times.
+
+Fixed targets are reduced once to a position of date, moving targets, the
+Sun and the Moon are sampled once per time with :mod:`ephem`, and all of the
+per-(target, time) geometry is then done with :mod:`numpy` arrays of shape
+``(targets, times)``.
+"""
+
+from __future__ import (absolute_import, unicode_literals, division,
+                        print_function)
+
+import numpy as np
+import ephem
+
+import astropy.units as u
+from astropy.coordinates import SkyCoord, FK5
+
+from .bases import EQUINOX_J2000
+from .arrays import (ephem_instance, ephem_dates, sample, sidereal_time, hadec_to_altaz,
+    apparent_place)
+
+__all__ = ['ConstraintGrid', 'constraint_grid', 'target_positions', 'angular_separation']
+
+def angular_separation(ra1, dec1, ra2, dec2):
+    """The angular separation between positions in radians, broadcasting over arrays."""
+    sin_ddec = np.sin(0.5 * (dec2 - dec1))
+    sin_dra = np.sin(0.5 * (ra2 - ra1))
+    h = sin_ddec * sin_ddec + np.cos(dec1) * np.cos(dec2) * sin_dra * sin_dra
+    return 2 * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+def target_positions(targets, observer, dates):
+    """Topocentric positions of date for targets, as arrays of shape ``(targets, times)`` in radians.
+
+    ``targets`` may be a :class:`~astropy.coordinates.SkyCoord` (scalar or
+    array), or a sequence of scalar coordinates and :mod:`astropyephem` or
+    :mod:`ephem` bodies. Coordinates and fixed bodies are reduced to an
+    apparent position of date once, at the middle of the time grid; other
+    bodies are computed at every time. Coordinates go through
+    :func:`~astropyephem.arrays.apparent_place`, which agrees with the
+    :mod:`ephem` reduction of a fixed body to better than an arcsecond.
+    """
+    dates = np.atleast_1d(dates)
+    middle = 0.5 * (dates[0] + dates[-1])
+    j2000 = FK5(equinox=EQUINOX_J2000)
+    if isinstance(targets, SkyCoord):
+        coords = targets.transform_to(j2000)
+        ra, dec = apparent_place(np.atleast_1d(coords.ra.radian), np.atleast_1d(coords.dec.radian), middle)
+        ra, dec = ra[:, np.newaxis], dec[:, np.newaxis]
+        return np.broadcast_to(ra, (ra.shape[0], dates.shape[0])), np.broadcast_to(dec, (dec.shape[0], dates.shape[0]))
+    ra = np.empty((len(targets), dates.shape[0]))
+    dec = np.empty_like(ra)
+    coords = [i for i, target in enumerate(targets) if isinstance(target, SkyCoord)]
+    if coords:
+        # Collect ICRS coordinates through their raw representations, which is much
+        # cheaper than combining SkyCoord objects, then transform them all at once.
+        icrs = [i for i in coords if targets[i].frame.name == 'icrs']
+        if icrs:
+            lon = np.array([targets[i].data.lon.radian for i in icrs])
+            lat = np.array([targets[i].data.lat.radian for i in icrs])
+            fk5 = SkyCoord(lon * u.radian, lat * u.radian, frame='icrs').transform_to(j2000)
+            apparent = apparent_place(fk5.ra.radian, fk5.dec.radian, middle)
+            ra[icrs] = apparent[0][:, np.newaxis]
+            dec[icrs] = apparent[1][:, np.newaxis]
+        for i in coords:
+            if targets[i].frame.name != 'icrs':
+                fk5 = targets[i].transform_to(j2000)
+                ra[i], dec[i] = apparent_place(fk5.ra.radian, fk5.dec.radian, middle)
+    for i, target in enumerate(targets):
+        if isinstance(target, SkyCoord):
+            continue
+        elif isinstance(ephem_instance(target), ephem.FixedBody):
+            positions = sample(target, [middle], observer=observer, fields=('ra', 'dec'))
+        else:
+            positions = sample(target, dates, observer=observer, fields=('ra', 'dec'))
+        ra[i], dec[i] = positions['ra'], positions['dec']
+    return ra, dec
+
+def _weather(value, unit):
+    """Weather values as plain arrays, converting quantities to a unit."""
+    if isinstance(value, u.Quantity):
+        return value.to(unit, equivalencies=u.temperature()).value
+    return np.asarray(value, dtype=np.float64)
+
+class ConstraintGrid(object):
+    """Observing quantities and constraint masks for a set of targets over a set of times.
+
+    Float quantities are :class:`~astropy.units.Quantity` arrays of shape
+    ``(targets, times)``, except for :attr:`sun_altitude`, which has shape
+    ``(times,)``. :attr:`masks` maps each constraint that was applied to a
+    boolean array which is `True` where the constraint is satisfied, and
+    :attr:`observable` is `True` where all of them are.
+    """
+
+    def __init__(self, times, altitude, azimuth, hour_angle, moon_separation, sun_altitude):
+        super(ConstraintGrid, self).__init__()
+        self.times = times
+        self.altitude = altitude
+        self.azimuth = azimuth
+        self.hour_angle = hour_angle
+        self.moon_separation = moon_separation
+        self.sun_altitude = sun_altitude
+        self.masks = {}
+
+    def __repr__(self):
+        """Represent this grid."""
+        return "<{} {} targets x {} times, constraints: {}>".format(self.__class__.__name__,
+            self.altitude.shape[0], self.altitude.shape[1], ", ".join(sorted(self.masks)) or "none")
+
+    @property
+    def shape(self):
+        """The shape ``(targets, times)`` of this grid."""
+        return self.altitude.shape
+
+    @property
+    def airmass(self):
+        """The plane-parallel airmass, sec(z), which is infinite below the horizon."""
+        sin_alt = np.sin(self.altitude.to(u.radian).value)
+        with np.errstate(divide='ignore'):
+            return u.Quantity(np.where(sin_alt > 0, 1.0 / np.where(sin_alt > 0, sin_alt, 1.0), np.inf))
+
+    @property
+    def observable(self):
+        """`True` where every constraint is satisfied."""
+        mask = np.ones(self.shape, dtype=bool)
+        for constraint in self.masks.values():
+            mask &= constraint
+        return mask
+
+def constraint_grid(targets, observer, times, min_altitude=None, max_airmass=None, min_moon_separation=None,
+    max_sun_altitude=None, max_hour_angle=None, refraction=False, temperature=None, pressure=None,
+    wavelength=None):
+    """Evaluate observing constraints for targets over a grid of times.
+
+    Target altitudes are geometric (no refraction) unless ``refraction`` is
+    set; the altitude of the Sun is as computed by :mod:`ephem` for the
+    observer. Constraints left as `None` are not applied.
+
+    :param targets: A :class:`~astropy.coordinates.SkyCoord` or a sequence of bodies.
+    :param observer: The :class:`~astropyephem.observers.Observer`.
+    :param times: An :class:`astropy.time.Time` array.
+    :param min_altitude: The lowest acceptable target altitude.
+    :param max_airmass: The highest acceptable airmass.
+    :param min_moon_separation: The smallest acceptable distance from the Moon.
+    :param max_sun_altitude: The highest acceptable altitude of the Sun.
+    :param max_hour_angle: The largest acceptable absolute hour angle.
+    :param refraction: Whether to refract the target altitudes.
+    :param temperature: Temperatures for refraction, as one value or one for
+        each time. The observer's temperature is used if not given.
+    :param pressure: Pressures for refraction, like ``temperature``.
+    :param wavelength: The wavelength for refraction, as a length. The
+        :mod:`ephem` model is used if not given.
+    :returns: A :class:`ConstraintGrid`.
+    """
+    observer = ephem_instance(observer)
+    dates = np.atleast_1d(ephem_dates(times))
+    ra, dec = target_positions(targets, observer, dates)
+    lst = sidereal_time(dates, float(observer.lon))
+    hour_angle = (lst - ra + np.pi) % (2 * np.pi) - np.pi
+    if refraction:
+        temperature = observer.temp if temperature is None else _weather(temperature, u.deg_C)
+        pressure = observer.pressure if pressure is None else _weather(pressure, u.mbar)
+        altitude, azimuth = hadec_to_altaz(hour_angle, dec, float(observer.lat), temperature, pressure,
+            wavelength)
+    else:
+        altitude, azimuth = hadec_to_altaz(hour_angle, dec, float(observer.lat))
+
+    sun = sample(ephem.Sun(), dates, observer=observer, fields=('alt',))
+    moon = sample(ephem.Moon(), dates, observer=observer, fields=('ra', 'dec'))
+    moon_separation = angular_separation(ra, dec, moon['ra'], moon['dec'])
+
+    grid = ConstraintGrid(times, altitude * u.radian, azimuth * u.radian, hour_angle * u.radian,
+        moon_separation * u.radian, sun['alt'] * u.radian)
+    if min_altitude is not None:
+        grid.masks['altitude'] = altitude >= u.Quantity(min_altitude, u.radian).value
+    if max_airmass is not None:
+        grid.masks['airmass'] = grid.airmass.value <= max_airmass
+    if min_moon_separation is not None:
+        grid.masks['moon_separation'] = moon_separation >= u.Quantity(min_moon_separation, u.radian).value
+    if max_sun_altitude is not None:
+        sun_mask = sun['alt'] <= u.Quantity(max_sun_altitude, u.radian).value
+        grid.masks['sun_altitude'] = np.broadcast_to(sun_mask, altitude.shape)
+    if max_hour_angle is not None:
+        grid.masks['hour_angle'] = np.abs(hour_angle) <= u.Quantity(max_hour_angle, u.radian).value
+    return grid
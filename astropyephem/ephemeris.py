@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+#
+#  ephemeris.py
+#  astropyephem
+#
+
+"""
+Ephemerides for bodies over a range of times, as columnar tables.
+
+:func:`ephemeris_chunks` yields :class:`~astropy.table.QTable` chunks of a
+fixed number of rows, computing each chunk from :mod:`ephem` floats only when
+it is requested, so that long sweeps use a bounded amount of memory.
+:class:`EphemerisWriter` appends those chunks to a single file on disk.
+"""
+
+from __future__ import (absolute_import, unicode_literals, division,
+                        print_function)
+
+import io
+import os
+
+import numpy as np
+
+import astropy.units as u
+from astropy.table import QTable
+from astropy.io import fits
+
+from .arrays import ephem_instance, ephem_dates, astropy_times, sample
+
+__all__ = ['EPHEMERIS_FIELDS', 'ephemeris_chunks', 'ephemeris_table', 'EphemerisWriter', 'write_ephemeris']
+
+#: Fields which can be tabulated, with the unit of each column. Angles are
+#: converted from the radians used by :mod:`ephem` to degrees.
+EPHEMERIS_FIELDS = {
+    'a_ra': u.deg, 'a_dec': u.deg, 'g_ra': u.deg, 'g_dec': u.deg, 'ra': u.deg, 'dec': u.deg,
+    'alt': u.deg, 'az': u.deg, 'ha': u.deg, 'elong': u.deg, 'radius': u.deg,
+    'mag': u.mag, 'size': u.arcsec, 'phase': u.percent,
+    'earth_distance': u.AU, 'sun_distance': u.AU,
+}
+
+_ANGLES = set(['a_ra', 'a_dec', 'g_ra', 'g_dec', 'ra', 'dec', 'alt', 'az', 'ha', 'elong', 'radius'])
+
+def ephemeris_chunks(bodies, start, stop, step, observer=None, fields=None, chunk_size=10000):
+    """Yield tables of the ephemerides of bodies, with at most ``chunk_size`` rows each.
+
+    Rows run through every time for the first body, then every time for the
+    next body, and so on. Each table has a ``name`` column, a ``time``
+    column, and a :class:`~astropy.units.Quantity` column for each field.
+
+    :param bodies: A body, or a sequence of bodies.
+    :param start: The first time, as an :class:`astropy.time.Time`.
+    :param stop: The last time, included if it falls on the grid.
+    :param step: The time step.
+    :param observer: The :class:`~astropyephem.observers.Observer`, for topocentric fields.
+    :param fields: The names of fields from :data:`EPHEMERIS_FIELDS`. Defaults to
+        ``a_ra`` and ``a_dec``, and also ``alt`` and ``az`` if there is an observer.
+    :param chunk_size: The largest number of rows in each table.
+    """
+    if not isinstance(bodies, (list, tuple)):
+        bodies = [bodies]
+    if fields is None:
+        fields = ('a_ra', 'a_dec') if observer is None else ('a_ra', 'a_dec', 'alt', 'az')
+    for field in fields:
+        if field not in EPHEMERIS_FIELDS:
+            raise ValueError("Unknown ephemeris field '{}'.".format(field))
+    first, step, count = _time_grid(start, stop, step)
+    names = [_body_name(body) for body in bodies]
+    name_dtype = 'U{}'.format(max(len(name) for name in names))
+    for body, name in zip(bodies, names):
+        for offset in range(0, count, chunk_size):
+            dates = first + step * np.arange(offset, min(offset + chunk_size, count))
+            yield _chunk(body, name, name_dtype, dates, observer, fields)
+
+def _body_name(body):
+    """The name used for a body in ephemeris tables."""
+    return str(getattr(ephem_instance(body), 'name', None) or body.__class__.__name__)
+
+def _time_grid(start, stop, step):
+    """The first :mod:`ephem` date, the step in days, and the number of times on a grid."""
+    first = ephem_dates(start)
+    step = u.Quantity(step, u.day).value
+    return first, step, int(np.floor((ephem_dates(stop) - first) / step + 1e-9)) + 1
+
+def _chunk(body, name, name_dtype, dates, observer, fields):
+    """The ephemeris table of one body at an array of :mod:`ephem` dates."""
+    values = sample(body, dates, observer=observer, fields=fields)
+    columns = [np.full(dates.shape, name, dtype=name_dtype), astropy_times(dates)]
+    for field in fields:
+        value = np.degrees(values[field]) if field in _ANGLES else values[field]
+        columns.append(u.Quantity(value, EPHEMERIS_FIELDS[field], copy=False))
+    return QTable(columns, names=['name', 'time'] + list(fields))
+
+def ephemeris_table(bodies, start, stop, step, observer=None, fields=None):
+    """The whole ephemeris as a single :class:`~astropy.table.QTable`. See :func:`ephemeris_chunks`."""
+    from astropy.table import vstack
+    return vstack(list(ephemeris_chunks(bodies, start, stop, step, observer=observer, fields=fields)))
+
+class EphemerisWriter(object):
+    """Append table chunks to a file, without holding more than one chunk in memory.
+
+    ASCII formats (such as ``ascii.ecsv`` or ``ascii.csv``) write the header
+    with the first chunk and only data lines after that. The ``fits`` format
+    writes a binary table extension, streaming rows to disk and filling in
+    the row count when the writer is closed. Every chunk must have the same
+    columns as the first.
+
+    :param filename: The file to write, which is replaced if it exists.
+    :param format: The format, guessed from the extension (``.fits``,
+        ``.csv``, or ECSV for anything else) if not given.
+    """
+
+    def __init__(self, filename, format=None):
+        super(EphemerisWriter, self).__init__()
+        if format is None:
+            format = 'fits' if filename.endswith(('.fits', '.fit')) else 'ascii.ecsv'
+            format = 'ascii.csv' if filename.endswith('.csv') else format
+        self.filename = filename
+        self.format = format
+        self.rows = 0
+        self._header = None
+        self._header_offset = None
+        self._file = open(filename, 'wb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, table):
+        """Append a table to the file."""
+        if self.format == 'fits':
+            self._write_fits(table)
+        else:
+            stream = io.StringIO()
+            table.write(stream, format=self.format)
+            lines = stream.getvalue().splitlines(True)
+            if self.rows:
+                lines = [line for line in lines if not line.startswith('#')][1:]
+            self._file.write("".join(lines).encode('utf-8'))
+        self.rows += len(table)
+
+    def _write_fits(self, table):
+        """Append the rows of a table to a binary table extension."""
+        hdu = fits.table_to_hdu(table)
+        stream = io.BytesIO()
+        hdu.writeto(stream)
+        primary, header = fits.PrimaryHDU().header.tostring(), hdu.header.tostring()
+        if self._header is None:
+            self._header = hdu.header
+            self._file.write(primary.encode('ascii'))
+            self._header_offset = self._file.tell()
+            self._file.write(header.encode('ascii'))
+        start = len(primary) + len(header)
+        self._file.write(stream.getvalue()[start:start + hdu.header['NAXIS1'] * len(table)])
+
+    def close(self):
+        """Finish and close the file."""
+        if self._file.closed:
+            return
+        if self.format == 'fits' and self._header is not None:
+            size = self._header['NAXIS1'] * self.rows
+            self._file.write(b'\0' * (-size % 2880))
+            self._header['NAXIS2'] = self.rows
+            self._file.seek(self._header_offset, os.SEEK_SET)
+            self._file.write(self._header.tostring().encode('ascii'))
+        self._file.close()
+
+def write_ephemeris(chunks, filename, format=None):
+    """Write an iterable of table chunks to a file with an :class:`EphemerisWriter`.
+
+    :returns: The number of rows written.
+    """
+    with EphemerisWriter(filename, format=format) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+    return writer.rows
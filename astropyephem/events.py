@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+#
+#  events.py
+#  astropyephem
+#
+
+"""
+Tables of astronomical events over long spans of time.
+
+Rather than searching for one event at a time, as :func:`ephem.next_full_moon`
+and friends do, a target function (such as the difference in ecliptic
+longitude between the Moon and the Sun) is sampled once over the whole span
+on a coarse grid. Every crossing or extremum found on the grid is then refined
+with a few exact evaluations.
+
+Target functions take an array of :mod:`ephem` dates and return an array of
+values, so that the coarse sampling is done in a single batch.
+"""
+
+from __future__ import (absolute_import, unicode_literals, division,
+                        print_function)
+
+import numpy as np
+import ephem
+
+import astropy.units as u
+from astropy.table import Table
+
+from .arrays import ephem_instance, astropy_times, date_grid, sample, nutation
+from .constraints import angular_separation
+
+__all__ = ['MOON_PHASES', 'SEASONS', 'refine_roots', 'find_crossings', 'find_extrema', 'moon_phases', 'seasons', 'conjunctions',
+    'greatest_elongations', 'closest_approaches']
+
+#: The lunar phases, by the excess of the Moon's ecliptic longitude over the Sun's.
+MOON_PHASES = (('new_moon', 0.0), ('first_quarter', 0.5 * np.pi), ('full_moon', np.pi),
+    ('last_quarter', 1.5 * np.pi))
+
+#: The seasons, by the apparent right ascension of the Sun.
+SEASONS = (('march_equinox', 0.0), ('june_solstice', 0.5 * np.pi), ('september_equinox', np.pi),
+    ('december_solstice', 1.5 * np.pi))
+
+def _wrap(values, level, period):
+    """Values less a level, wrapped into half a period either side of zero."""
+    values = np.asarray(values) - level
+    if period is None:
+        return values
+    return np.remainder(values + 0.5 * period, period) - 0.5 * period
+
+def refine_roots(func, lower, upper, f_lower=None, f_upper=None, tolerance=1e-5, maxiter=50):
+    """Refine many bracketed roots of a function of date at once.
+
+    Like :func:`~astropyephem.arrays.refine_root`, this uses the Illinois
+    variant of regula falsi, but every bracket is advanced together so that
+    each iteration makes a single call to ``func`` with an array of dates.
+
+    :param func: A function of an array of :mod:`ephem` dates.
+    :param lower: The lower ends of the brackets.
+    :param upper: The upper ends of the brackets.
+    :param f_lower: The function at the lower ends, if it is already known.
+    :param f_upper: The function at the upper ends, if it is already known.
+    """
+    lower, upper = np.array(lower, dtype=np.float64), np.array(upper, dtype=np.float64)
+    if not len(lower):
+        return lower
+    f_lower = func(lower) if f_lower is None else np.array(f_lower, dtype=np.float64)
+    f_upper = func(upper) if f_upper is None else np.array(f_upper, dtype=np.float64)
+    side = np.zeros(lower.shape, dtype=int)
+    roots = np.full(lower.shape, np.nan)
+    active = np.arange(len(lower))
+    for iteration in range(maxiter):
+        flat = f_upper == f_lower
+        guess = np.where(flat, 0.5 * (lower + upper),
+            (lower * f_upper - upper * f_lower) / np.where(flat, 1.0, f_upper - f_lower))
+        f_guess = func(guess)
+        right = f_guess * f_upper > 0
+        f_lower = np.where(right & (side == -1), 0.5 * f_lower, f_lower)
+        f_upper = np.where(~right & (side == 1), 0.5 * f_upper, f_upper)
+        upper, f_upper = np.where(right, guess, upper), np.where(right, f_guess, f_upper)
+        lower, f_lower = np.where(right, lower, guess), np.where(right, f_lower, f_guess)
+        side = np.where(right, -1, 1)
+        done = (np.abs(upper - lower) < tolerance) | (f_guess == 0) | flat
+        roots[active[done]] = guess[done]
+        if done.all():
+            break
+        keep = ~done
+        active, lower, upper, f_lower, f_upper, side = (active[keep], lower[keep], upper[keep], f_lower[keep],
+            f_upper[keep], side[keep])
+    else:
+        roots[active] = guess[keep]
+    return roots
+
+def find_crossings(func, start, stop, step, level=0.0, period=None):
+    """Dates on which a function of date crosses a level.
+
+    :param func: A function of an array of :mod:`ephem` dates.
+    :param start: The first :class:`astropy.time.Time` to search.
+    :param stop: The last :class:`astropy.time.Time` to search.
+    :param step: The spacing of the coarse grid, which should be shorter
+        than the time between crossings.
+    :param level: The level to cross.
+    :param period: For angles, the period over which the function wraps
+        (e.g. ``2 * pi``). Wrapping from one end of the period to the other is
+        not counted as a crossing.
+    :returns: The :mod:`ephem` dates of the crossings, and whether the
+        function was rising at each one.
+    """
+    dates = date_grid(start, stop, step)
+    return _crossings(func, dates, func(dates), level, period)
+
+def _crossings(func, dates, values, level, period):
+    """Refine the crossings of a level on a grid of already sampled values."""
+    values = _wrap(values, level, period)
+    steps = np.flatnonzero((values[:-1] < 0) != (values[1:] < 0))
+    if period is not None:
+        steps = steps[np.abs(values[steps + 1] - values[steps]) < 0.5 * period]
+    roots = refine_roots(lambda d: _wrap(func(d), level, period), dates[steps], dates[steps + 1],
+        values[steps], values[steps + 1])
+    return roots, values[steps + 1] > values[steps]
+
+def _level_events(func, start, stop, step, levels):
+    """Events when an angle rises through each of a set of named levels."""
+    dates = date_grid(start, stop, step)
+    values = func(dates)
+    events = []
+    for name, level in levels:
+        found, rising = _crossings(func, dates, values, level, 2 * np.pi)
+        events += [(date, name) for date in found[rising]]
+    return events
+
+def find_extrema(func, start, stop, step, kind='both', delta=1e-3):
+    """Dates on which a function of date has a local maximum or minimum.
+
+    :param func: A function of an array of :mod:`ephem` dates.
+    :param start: The first :class:`astropy.time.Time` to search.
+    :param stop: The last :class:`astropy.time.Time` to search.
+    :param step: The spacing of the coarse grid, which should be shorter
+        than half the time between extrema.
+    :param kind: ``maximum``, ``minimum`` or ``both``.
+    :param delta: The step in days used to find the derivative while refining.
+    :returns: The :mod:`ephem` dates of the extrema, the function values at
+        each one, and whether each one is a maximum.
+    """
+    dates = date_grid(start, stop, step)
+    slope = np.diff(func(dates))
+    steps = np.flatnonzero((slope[:-1] > 0) != (slope[1:] > 0))
+    maximum = slope[steps] > 0
+    if kind == 'maximum':
+        steps, maximum = steps[maximum], maximum[maximum]
+    elif kind == 'minimum':
+        steps, maximum = steps[~maximum], maximum[~maximum]
+    def derivative(dates):
+        values = func(np.concatenate([dates + delta, dates - delta]))
+        return values[:len(dates)] - values[len(dates):]
+    found = refine_roots(derivative, dates[steps], dates[steps + 2])
+    return found, func(found) if len(found) else found.copy(), maximum
+
+def _ecliptic_longitude(ra, dec, dates):
+    """Ecliptic longitudes for equatorial coordinates of date, in radians."""
+    obliquity = nutation(dates)[2]
+    return np.arctan2(np.sin(ra) * np.cos(obliquity) + np.tan(dec) * np.sin(obliquity), np.cos(ra))
+
+def _longitude_difference(body, reference):
+    """The excess of one body's geocentric ecliptic longitude over another's, as a function of date."""
+    def difference(dates):
+        first = sample(body, dates, fields=('g_ra', 'g_dec'))
+        second = sample(reference, dates, fields=('g_ra', 'g_dec'))
+        return (_ecliptic_longitude(first['g_ra'], first['g_dec'], dates)
+            - _ecliptic_longitude(second['g_ra'], second['g_dec'], dates))
+    return difference
+
+def _event_table(events, values=None, unit=None):
+    """A table of (date, name) events, sorted by date."""
+    events = sorted(events, key=lambda event: event[0])
+    times = astropy_times(np.array([date for date, name in events], dtype=np.float64))
+    times.format = 'iso'
+    columns, names = [times, np.array([name for date, name in events], dtype=np.str_)], ['time', 'event']
+    if values is not None:
+        order = dict((date, value) for date, value in values)
+        columns.append(u.Quantity([order[date] for date, name in events], unit))
+        names.append('value')
+    return Table(columns, names=names)
+
+def moon_phases(start, stop, step=3 * u.day):
+    """Every new, first quarter, full and last quarter moon between two times.
+
+    Phases are defined, as by :func:`ephem.next_full_moon`, by the difference
+    in geocentric ecliptic longitude between the Moon and the Sun.
+
+    :returns: A :class:`~astropy.table.Table` of ``time`` and ``event``.
+    """
+    return _event_table(_level_events(_longitude_difference(ephem.Moon(), ephem.Sun()), start, stop, step,
+        MOON_PHASES))
+
+def seasons(start, stop, step=5 * u.day):
+    """Every equinox and solstice between two times.
+
+    These are defined, as by :func:`ephem.next_equinox`, by the apparent
+    right ascension of the Sun.
+
+    :returns: A :class:`~astropy.table.Table` of ``time`` and ``event``.
+    """
+    sun = ephem.Sun()
+    func = lambda dates: sample(sun, dates, fields=('ra',))['ra']
+    return _event_table(_level_events(func, start, stop, step, SEASONS))
+
+def conjunctions(body, start, stop, step=1 * u.day):
+    """Every conjunction with and opposition to the Sun of a body between two times.
+
+    Conjunctions are in geocentric ecliptic longitude. For bodies inside the
+    orbit of the Earth, conjunctions are ``inferior_conjunction`` or
+    ``superior_conjunction``; for other bodies they are ``conjunction`` or
+    ``opposition``.
+
+    :param body: A solar system body.
+    :returns: A :class:`~astropy.table.Table` of ``time`` and ``event``.
+    """
+    body = ephem_instance(body).copy()
+    func = _longitude_difference(body, ephem.Sun())
+    grid = date_grid(start, stop, step)
+    values = func(grid)
+    events = []
+    for level in (0.0, np.pi):
+        dates, rising = _crossings(func, grid, values, level, 2 * np.pi)
+        for date in dates:
+            body.compute(date)
+            if level == 0.0 and body.earth_distance < body.sun_distance:
+                name = 'inferior_conjunction'
+            elif level == 0.0:
+                name = 'superior_conjunction' if body.sun_distance < 1.0 else 'conjunction'
+            else:
+                name = 'opposition'
+            events.append((date, name))
+    return _event_table(events)
+
+def greatest_elongations(body, start, stop, step=1 * u.day):
+    """Every greatest eastern and western elongation of a body from the Sun between two times.
+
+    :param body: A solar system body, usually Mercury or Venus.
+    :returns: A :class:`~astropy.table.Table` of ``time``, ``event`` and the
+        elongation ``value``.
+    """
+    body = ephem_instance(body).copy()
+    func = lambda dates: sample(body, dates, fields=('elong',))['elong']
+    dates, values, maximum = find_extrema(func, start, stop, step)
+    keep = np.where(maximum, values > 0, values < 0)
+    dates, values, maximum = dates[keep], values[keep], maximum[keep]
+    events = [(date, 'greatest_elongation_east' if east else 'greatest_elongation_west')
+        for date, east in zip(dates, maximum)]
+    return _event_table(events, zip(dates, np.degrees(values)), u.deg)
+
+def closest_approaches(body, other, start, stop, step=1 * u.day, limit=None):
+    """Every closest approach of two bodies on the sky between two times.
+
+    :param body: A body.
+    :param other: Another body.
+    :param limit: If given, only approaches closer than this angle are included.
+    :returns: A :class:`~astropy.table.Table` of ``time``, ``event`` and the
+        separation ``value``.
+    """
+    body, other = ephem_instance(body).copy(), ephem_instance(other).copy()
+    def separation(dates):
+        first = sample(body, dates, fields=('a_ra', 'a_dec'))
+        second = sample(other, dates, fields=('a_ra', 'a_dec'))
+        return angular_separation(first['a_ra'], first['a_dec'], second['a_ra'], second['a_dec'])
+    dates, values, maximum = find_extrema(separation, start, stop, step, kind='minimum')
+    if limit is not None:
+        keep = values < u.Quantity(limit, u.radian).value
+        dates, values = dates[keep], values[keep]
+    return _event_table([(date, 'closest_approach') for date in dates], zip(dates, np.degrees(values)), u.deg)
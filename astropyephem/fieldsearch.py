@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+#
+#  fieldsearch.py
+#  astropyephem
+#
+
+"""
+Finding the minor bodies of an orbit catalog which fall in a field of view.
+
+:class:`FieldIndex` propagates a whole :class:`~astropyephem.orbits.OrbitCatalog`
+once onto a coarse grid of dates. A search then only needs a dot product
+against the grid to find candidate bodies near the field, and propagates
+just those candidates to the exact epoch.
+"""
+
+from __future__ import (absolute_import, unicode_literals, division,
+                        print_function)
+
+import numpy as np
+
+import astropy.units as u
+from astropy.coordinates import FK5
+from astropy.table import QTable
+
+from .bases import EQUINOX_J2000
+from .arrays import (ephem_instance, ephem_dates, date_grid, sidereal_time, unit_vectors, radec_from_vectors,
+    precession_matrix)
+from .cache import _observer_vector
+from .constraints import angular_separation
+from .kepler import propagate, earth_vectors, magnitudes
+
+__all__ = ['FieldIndex']
+
+# The largest geocentric parallax at one AU, in radians.
+_PARALLAX_AU = 6378137.0 / 149597870700.0
+
+class FieldIndex(object):
+    """Astrometric positions of every body in a catalog on a grid of dates.
+
+    The grid holds a single precision unit vector and distance for every body
+    at every date, so its size is ``16 * bodies * dates`` bytes.
+
+    :param catalog: An :class:`~astropyephem.orbits.OrbitCatalog`.
+    :param start: The first :class:`astropy.time.Time` which can be searched.
+    :param stop: The last :class:`astropy.time.Time` which can be searched.
+    :param step: The spacing of the grid.
+    """
+
+    def __init__(self, catalog, start, stop, step=1 * u.day):
+        super(FieldIndex, self).__init__()
+        self.catalog = catalog
+        self.dates = date_grid(start, stop, step)
+        if self.dates[-1] < ephem_dates(stop):
+            self.dates = np.append(self.dates, self.dates[-1] + u.Quantity(step, u.day).value)
+        self.vectors = np.empty((len(self.dates), len(catalog), 3), dtype=np.float32)
+        self.distances = np.empty((len(self.dates), len(catalog)), dtype=np.float32)
+        for i, date in enumerate(self.dates):
+            position = propagate(catalog, [date])
+            self.vectors[i] = unit_vectors(position['a_ra'][:, 0], position['a_dec'][:, 0])
+            self.distances[i] = position['earth_distance'][:, 0]
+
+    def __repr__(self):
+        """Represent this index."""
+        return "<{} {} bodies at {} dates>".format(self.__class__.__name__, len(self.catalog), len(self.dates))
+
+    def candidates(self, center, radius, date, parallax=False):
+        """Rows of the catalog which may lie within a radius of a center at a date.
+
+        Positions are interpolated between the neighbouring grid dates, and
+        the search radius for each body is widened by the distance it moves
+        between them, and by its parallax if asked.
+
+        :param center: A J2000 equatorial unit vector.
+        :param radius: The radius in radians.
+        :param date: An :mod:`ephem` date.
+        :param parallax: Whether to allow for the parallax of a topocentric observer.
+        """
+        if not self.dates[0] <= date <= self.dates[-1]:
+            raise ValueError("Date {} is outside the range of this index.".format(date))
+        i = min(max(np.searchsorted(self.dates, date, side='right') - 1, 0), len(self.dates) - 2)
+        fraction = np.float32((date - self.dates[i]) / (self.dates[i + 1] - self.dates[i]))
+        before, after = self.vectors[i], self.vectors[i + 1]
+        motion = after - before
+        interpolated = before + fraction * motion
+        cosine = np.dot(interpolated, np.asarray(center, dtype=np.float32))
+        cosine /= np.sqrt(np.sum(interpolated * interpolated, axis=-1))
+        pad = np.sqrt(np.sum(motion * motion, axis=-1)) + 1e-5
+        if parallax:
+            pad += _PARALLAX_AU / np.minimum(self.distances[i], self.distances[i + 1])
+        return np.flatnonzero(np.arccos(np.clip(cosine, -1, 1)) <= radius + pad)
+
+    def search(self, center, radius, epoch, observer=None):
+        """The bodies within a radius of a center at an epoch.
+
+        :param center: A scalar :class:`~astropy.coordinates.SkyCoord`.
+        :param radius: The field radius, as an angle.
+        :param epoch: An :class:`astropy.time.Time`.
+        :param observer: The :class:`~astropyephem.observers.Observer`, for
+            topocentric positions. Positions are geocentric if not given.
+        :returns: A :class:`~astropy.table.QTable` of the ``name``, astrometric
+            ``ra`` and ``dec``, ``separation`` from the center, ``mag``,
+            ``ra_rate`` (including the cosine of the declination), ``dec_rate``
+            and ``earth_distance`` of each body, nearest to the center first.
+        """
+        date = float(ephem_dates(epoch))
+        fk5 = center.transform_to(FK5(equinox=EQUINOX_J2000))
+        ra0, dec0 = float(fk5.ra.radian), float(fk5.dec.radian)
+        radius = u.Quantity(radius, u.radian).value
+        catalog = self.catalog.select(self.candidates(unit_vectors(ra0, dec0), radius, date, observer is not None))
+
+        # Rates come from the positions half an hour either side of the epoch.
+        half = 0.5 / 24.0
+        dates = np.array([date - half, date, date + half])
+        position = propagate(catalog, dates)
+        geo = position['earth_distance'][..., np.newaxis] * unit_vectors(position['a_ra'], position['a_dec'])
+        if observer is not None:
+            geo = geo - _observer_offsets(observer, dates)
+        ra, dec = radec_from_vectors(geo)
+        distance = np.sqrt(np.sum(geo * geo, axis=-1))
+        separation = angular_separation(ra[:, 1], dec[:, 1], ra0, dec0)
+        earth_sun = np.sqrt(np.sum(earth_vectors([date]) ** 2))
+        mag = magnitudes(catalog, position['sun_distance'][:, 1], distance[:, 1], earth_sun)
+        ra_rate = (np.remainder(ra[:, 2] - ra[:, 0] + np.pi, 2 * np.pi) - np.pi) * np.cos(dec[:, 1])
+        dec_rate = dec[:, 2] - dec[:, 0]
+
+        rows = np.flatnonzero(separation <= radius)
+        rows = rows[np.argsort(separation[rows])]
+        rate = u.arcsec / u.hour
+        return QTable([np.array(catalog.names[rows], dtype=np.str_), u.Quantity(np.degrees(ra[rows, 1]), u.deg),
+            u.Quantity(np.degrees(dec[rows, 1]), u.deg), u.Quantity(np.degrees(separation[rows]), u.deg),
+            u.Quantity(mag[rows], u.mag), u.Quantity(np.degrees(ra_rate[rows]) * 3600.0, rate),
+            u.Quantity(np.degrees(dec_rate[rows]) * 3600.0, rate), u.Quantity(distance[rows, 1], u.AU)],
+            names=['name', 'ra', 'dec', 'separation', 'mag', 'ra_rate', 'dec_rate', 'earth_distance'])
+
+def _observer_offsets(observer, dates):
+    """Geocentric positions of an observer in AU, in J2000 equatorial coordinates."""
+    observer = ephem_instance(observer)
+    lst = sidereal_time(dates, float(observer.lon))
+    offsets = np.array([_observer_vector(observer, angle) for angle in lst])
+    return np.einsum('nji,nj->ni', precession_matrix(dates), offsets)
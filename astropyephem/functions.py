@@ -22,17 +22,11 @@ __all__ = ['star','city']
 
 def star(name, *args, **kwargs):
     """Return a star, wrapping ephem star objects."""
-    estar = ephem.star(name, *args, **kwargs)
-    star = FixedBody()
-    star.__wrapped_instance__ = estar
-    return star
+    return FixedBody.from_ephem(ephem.star(name, *args, **kwargs))
     
 def city(name):
     """Return a city object."""
-    ecity = ephem.city(name)
-    city = Observer()
-    city.__wrapped_instance__ = ecity
-    return city
+    return Observer.from_ephem(ephem.city(name))
 
 
 # Wrap the pyephem functions to use astropy attributes.
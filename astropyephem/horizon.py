@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+#
+#  horizon.py
+#  astropyephem
+#
+
+"""
+Right ascensions and declinations for fixed grids of directions on the sky.
+
+:meth:`ephem.Observer.radec_of` turns one azimuth and altitude into an
+astrometric place at a time. :class:`HorizonGrid` does the same for a whole
+grid of directions, such as the pixels of an all-sky camera. Everything which
+depends only on the observer and the grid (refraction, and the conversion to
+hour angle and declination) is done once, when the grid is made, so that each
+new time needs only one rotation of the grid and a correction for aberration.
+"""
+
+from __future__ import (absolute_import, unicode_literals, division,
+                        print_function)
+
+import numpy as np
+
+import astropy.units as u
+from astropy.coordinates import Longitude, Latitude
+
+from .arrays import (ephem_instance, ephem_dates, sidereal_time, radec_from_vectors, unrefract,
+    precession_matrix, nutation_matrix, earth_velocity, _rotation)
+
+__all__ = ['HorizonGrid']
+
+# J2000 as an ephem date.
+_EPHEM_J2000 = 36525.0
+
+class HorizonGrid(object):
+    """A grid of apparent (refracted) azimuths and altitudes for an observer.
+
+    The places found agree with :meth:`ephem.Observer.radec_of`, which
+    treats every direction as infinitely distant: they are astrometric, in
+    the equinox of the observer's ``epoch``, with refraction found from the
+    observer's temperature and pressure.
+
+    :param observer: The :class:`~astropyephem.observers.Observer`.
+    :param az: Azimuths, east of north, as angles.
+    :param alt: Apparent altitudes as angles, which broadcast against the azimuths.
+    :param wavelength: The wavelength for refraction (see :func:`~astropyephem.arrays.dispersion`).
+    :param dtype: The floating point type of the stored grid, which may be
+        ``float32`` to halve the memory used by large grids, at a cost of
+        around a tenth of an arcsecond.
+    """
+
+    def __init__(self, observer, az, alt, wavelength=None, dtype=np.float64):
+        super(HorizonGrid, self).__init__()
+        observer = ephem_instance(observer)
+        self.longitude = float(observer.lon)
+        self.epoch = float(observer.epoch)
+        az, alt = np.broadcast_arrays(u.Quantity(az, u.radian).value, u.Quantity(alt, u.radian).value)
+        alt = unrefract(alt, observer.temp, observer.pressure, wavelength)
+        latitude = float(observer.lat)
+        sin_lat, cos_lat = np.sin(latitude), np.cos(latitude)
+        sin_alt, cos_alt, cos_az = np.sin(alt), np.cos(alt), np.cos(az)
+        # Unit vectors of (cos dec cos ha, -cos dec sin ha, sin dec), which a rotation by the
+        # sidereal time about the pole turns into equatorial vectors of date.
+        self.vectors = np.empty(az.shape + (3,), dtype=dtype)
+        self.vectors[..., 0] = cos_lat * sin_alt - sin_lat * cos_alt * cos_az
+        self.vectors[..., 1] = cos_alt * np.sin(az)
+        self.vectors[..., 2] = sin_lat * sin_alt + cos_lat * cos_alt * cos_az
+
+    def __repr__(self):
+        """Represent this grid."""
+        return "<{} {}>".format(self.__class__.__name__, "x".join(str(n) for n in self.shape) or "scalar")
+
+    @property
+    def shape(self):
+        """The shape of the grid."""
+        return self.vectors.shape[:-1]
+
+    def _matrix(self, date):
+        """The rotation from the grid to astrometric places, and the velocity of the Earth, at a date."""
+        lst = sidereal_time(date, self.longitude)
+        precession = precession_matrix(date).T
+        if abs(self.epoch - _EPHEM_J2000) > 1e-9:
+            precession = np.dot(precession_matrix(self.epoch), precession)
+        matrix = np.dot(precession, np.dot(nutation_matrix(date).T, _rotation(-lst, 2)))
+        return matrix, np.dot(precession, earth_velocity(date))
+
+    def vectors_at(self, time):
+        """Astrometric unit vectors (to first order in the aberration) for each direction at a time.
+
+        :param time: A scalar :class:`astropy.time.Time`.
+        :returns: An array with the shape of the grid and a last axis of 3.
+        """
+        matrix, velocity = self._matrix(float(ephem_dates(time)))
+        matrix, velocity = matrix.astype(self.vectors.dtype), velocity.astype(self.vectors.dtype)
+        # Work on a flat (N, 3) view, for which numpy's dot is a single matrix product.
+        vectors = np.dot(self.vectors.reshape(-1, 3), matrix.T)
+        # Remove the annual aberration which apparent_place adds, working in the output frame
+        # since rotations keep the dot product.
+        dot = np.dot(vectors, velocity)
+        vectors -= velocity
+        vectors += dot[:, np.newaxis] * vectors
+        return vectors.reshape(self.vectors.shape)
+
+    def radec(self, time):
+        """The astrometric right ascension and declination of each direction at a time.
+
+        :param time: A scalar :class:`astropy.time.Time`.
+        :returns: :class:`~astropy.coordinates.Longitude` and
+            :class:`~astropy.coordinates.Latitude` arrays with the shape of the grid.
+        """
+        ra, dec = radec_from_vectors(self.vectors_at(time))
+        return Longitude(ra * u.radian, copy=False), Latitude(dec * u.radian, copy=False)
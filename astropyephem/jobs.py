@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+#
+#  jobs.py
+#  astropyephem
+#
+
+"""
+Large ephemeris computations split into shards, for many workers on many machines.
+
+A job is a directory holding a ``job.json`` manifest, written by
+:func:`create_job`, which describes the targets (as lines of a target file,
+see :mod:`astropyephem.batch`), the sites, the time grid and the fields. The
+job is split deterministically into shards of a block of targets and a block
+of times at one site, so the same manifest always gives the same shards.
+
+Workers (:func:`run_worker`) share the directory, perhaps over a network file
+system. Each claims a shard by creating its lock file, computes it, and
+renames the finished table into place, so a shard is either complete or
+absent. Workers touch their locks while they compute, and only remove locks
+which they still hold. Running a worker again skips finished shards, and
+locks which have not been touched for a timeout are taken over (by renaming
+them away, which only one worker can do), so a job can be restarted after a
+worker dies.
+:func:`merge` concatenates the finished shards into one file.
+"""
+
+from __future__ import (absolute_import, unicode_literals, division,
+                        print_function)
+
+import io
+import os
+import json
+import time
+import uuid
+import socket
+import threading
+
+import numpy as np
+
+import astropy.units as u
+from astropy.time import Time
+from astropy.table import Table, vstack
+
+from .ephemeris import EphemerisWriter, _body_name, _time_grid, _chunk
+from .batch import parse_target, observer_from_dict, read_targets
+
+__all__ = ['MANIFEST', 'create_job', 'read_manifest', 'shards', 'compute_shard', 'run_worker', 'job_status',
+    'merge', 'main']
+
+#: The name of the job manifest in a job directory.
+MANIFEST = 'job.json'
+
+def create_job(directory, targets, sites, start, stop, step, fields=None, targets_per_shard=100,
+    times_per_shard=10000):
+    """Write the manifest for a job.
+
+    :param directory: The job directory, which is created if needed.
+    :param targets: Target file lines.
+    :param sites: A dictionary of observer dictionaries (see
+        :func:`~astropyephem.batch.observer_from_dict`) by site name.
+    :param start: The first :class:`~astropy.time.Time`.
+    :param stop: The last :class:`~astropy.time.Time`.
+    :param step: The time step.
+    :param fields: The fields to compute, by default ``a_ra``, ``a_dec``, ``alt`` and ``az``.
+    :param targets_per_shard: The number of targets in each shard.
+    :param times_per_shard: The number of times in each shard.
+    :returns: The manifest dictionary.
+    """
+    names = [_body_name(parse_target(line)) for line in targets]
+    manifest = {
+        'targets': list(targets), 'names': names, 'sites': dict(sites),
+        'start': Time(start).utc.isot, 'stop': Time(stop).utc.isot, 'step': u.Quantity(step, u.day).value,
+        'fields': list(fields or ('a_ra', 'a_dec', 'alt', 'az')),
+        'targets_per_shard': int(targets_per_shard), 'times_per_shard': int(times_per_shard),
+    }
+    if not os.path.isdir(os.path.join(directory, 'shards')):
+        os.makedirs(os.path.join(directory, 'shards'))
+    path = os.path.join(directory, MANIFEST)
+    with io.open(path + '.tmp', 'w', encoding='utf-8') as stream:
+        stream.write(json.dumps(manifest, indent=2, sort_keys=True))
+    os.rename(path + '.tmp', path)
+    return manifest
+
+def read_manifest(directory):
+    """The manifest dictionary of a job."""
+    with io.open(os.path.join(directory, MANIFEST), encoding='utf-8') as stream:
+        return json.load(stream)
+
+def _grid(manifest):
+    """The first date, step and number of times of a job."""
+    return _time_grid(Time(manifest['start'], scale='utc'), Time(manifest['stop'], scale='utc'),
+        manifest['step'] * u.day)
+
+def shards(manifest):
+    """The shards of a job, in order, as ``(site, target slice, time slice)``."""
+    first, step, count = _grid(manifest)
+    result = []
+    for site in sorted(manifest['sites']):
+        for target in range(0, len(manifest['targets']), manifest['targets_per_shard']):
+            for offset in range(0, count, manifest['times_per_shard']):
+                result.append((site, slice(target, min(target + manifest['targets_per_shard'],
+                    len(manifest['targets']))), slice(offset, min(offset + manifest['times_per_shard'], count))))
+    return result
+
+def _shard_path(directory, index):
+    """The finished table of a shard."""
+    return os.path.join(directory, 'shards', '{:06d}.ecsv'.format(index))
+
+def compute_shard(manifest, index):
+    """The :class:`~astropy.table.QTable` of one shard, with ``site`` as the first column."""
+    site, targets, times = shards(manifest)[index]
+    first, step, count = _grid(manifest)
+    dates = first + step * np.arange(times.start, times.stop)
+    observer = observer_from_dict(manifest['sites'][site])
+    name_dtype = 'U{}'.format(max(len(name) for name in manifest['names']))
+    table = vstack([_chunk(parse_target(line), name, name_dtype, dates, observer, manifest['fields'])
+        for line, name in zip(manifest['targets'][targets], manifest['names'][targets])])
+    table.add_column(np.full(len(table), site, dtype='U{}'.format(max(len(name) for name in manifest['sites']))),
+        name='site', index=0)
+    return table
+
+def _read_lock(path):
+    """The owner written in a lock file, or `None` if there is no lock."""
+    try:
+        with io.open(path, encoding='utf-8') as stream:
+            return stream.read()
+    except (IOError, OSError):
+        return None
+
+def _take(path, owner, timeout=None):
+    """Atomically move away a lock file if it holds an owner. Returns whether it was removed.
+
+    Only one worker can rename a given lock file. If the lock found is not
+    the expected one (it was replaced after the owner was read, or touched
+    within the timeout), it is put back without replacing any newer lock.
+    """
+    moved = '{}.{}.{}'.format(path, os.getpid(), uuid.uuid4().hex)
+    try:
+        os.rename(path, moved)
+    except OSError:
+        return False
+    if _read_lock(moved) == owner and (timeout is None or time.time() - os.path.getmtime(moved) >= timeout):
+        os.remove(moved)
+        return True
+    try:
+        os.link(moved, path)
+    except OSError:
+        pass
+    os.remove(moved)
+    return False
+
+def _claim(path, owner, timeout):
+    """Create a lock file, or take over one older than a timeout. Returns whether the lock was taken."""
+    for attempt in range(2):
+        try:
+            descriptor = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except OSError:
+            try:
+                if attempt or time.time() - os.path.getmtime(path) < timeout:
+                    return False
+            except OSError:
+                continue
+            stale = _read_lock(path)
+            if stale is None or not _take(path, stale, timeout):
+                return False
+            continue
+        os.write(descriptor, owner.encode('utf-8'))
+        os.close(descriptor)
+        return True
+    return False
+
+def _release(path, owner):
+    """Remove a lock file, if it is still held by an owner."""
+    _take(path, owner)
+
+def _keep_alive(path, owner, interval, stopped):
+    """Touch a lock file every interval while this worker still holds it, until stopped."""
+    while not stopped.wait(interval):
+        if _read_lock(path) != owner:
+            return
+        try:
+            os.utime(path, None)
+        except OSError:
+            return
+
+def run_worker(directory, worker=None, max_shards=None, timeout=3600.0):
+    """Compute unfinished shards of a job until none are left.
+
+    While a shard is computed its lock is touched regularly, so only the
+    locks of workers which have stopped become stale.
+
+    :param directory: The job directory.
+    :param worker: A name for this worker, written into its locks.
+    :param max_shards: Stop after computing this many shards.
+    :param timeout: The age in seconds after which another worker's lock is
+        taken to be stale.
+    :returns: The indices of the shards this worker computed.
+    """
+    if worker is None:
+        worker = "{}:{}".format(socket.gethostname(), os.getpid())
+    # Locks hold a unique token as well as the name, so that workers given the same name can't release each
+    # other's locks.
+    owner = "{} {}".format(worker, uuid.uuid4().hex)
+    manifest = read_manifest(directory)
+    done = []
+    for index in range(len(shards(manifest))):
+        if max_shards is not None and len(done) >= max_shards:
+            break
+        path = _shard_path(directory, index)
+        if os.path.exists(path) or not _claim(path + '.lock', owner, timeout):
+            continue
+        stopped = threading.Event()
+        keeper = threading.Thread(target=_keep_alive, args=(path + '.lock', owner, timeout / 4.0, stopped))
+        keeper.daemon = True
+        keeper.start()
+        try:
+            if not os.path.exists(path):
+                partial = '{}.{}.tmp'.format(path, os.getpid())
+                compute_shard(manifest, index).write(partial, format='ascii.ecsv')
+                os.rename(partial, path)
+                done.append(index)
+        finally:
+            stopped.set()
+            keeper.join()
+            _release(path + '.lock', owner)
+    return done
+
+def job_status(directory):
+    """The numbers of finished, locked and waiting shards of a job, as a dictionary."""
+    count = len(shards(read_manifest(directory)))
+    finished = sum(os.path.exists(_shard_path(directory, index)) for index in range(count))
+    locked = sum(os.path.exists(_shard_path(directory, index) + '.lock') for index in range(count))
+    return {'shards': count, 'finished': finished, 'locked': locked, 'waiting': count - finished - locked}
+
+def merge(directory, filename, format=None):
+    """Concatenate the shards of a finished job into one file, in shard order.
+
+    :returns: The number of rows written.
+    """
+    manifest = read_manifest(directory)
+    count = len(shards(manifest))
+    missing = [index for index in range(count) if not os.path.exists(_shard_path(directory, index))]
+    if missing:
+        raise ValueError("{} of {} shards are not finished, starting with shard {}.".format(len(missing), count,
+            missing[0]))
+    name_dtype = 'U{}'.format(max(len(name) for name in manifest['names']))
+    site_dtype = 'U{}'.format(max(len(name) for name in manifest['sites']))
+    with EphemerisWriter(filename, format=format) as writer:
+        for index in range(count):
+            table = Table.read(_shard_path(directory, index), format='ascii.ecsv')
+            # Text columns are read back as wide as their longest value, so set the width of the whole job.
+            table['site'] = table['site'].astype(site_dtype)
+            table['name'] = table['name'].astype(name_dtype)
+            writer.write(table)
+    return writer.rows
+
+def main(args=None):
+    """Command-line entry point to create, work on, and merge sharded ephemeris jobs."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Create, work on, and merge sharded ephemeris jobs.")
+    commands = parser.add_subparsers(dest='command')
+    create = commands.add_parser('create', help="Write a job manifest.")
+    create.add_argument('directory', help="Job directory.")
+    create.add_argument('targets', help="Target file, with one target per line.")
+    create.add_argument('sites', help="JSON file of observer definitions by site name.")
+    create.add_argument('--start', required=True, help="First date (any astropy Time string).")
+    create.add_argument('--stop', required=True, help="Last date (any astropy Time string).")
+    create.add_argument('--step', default='1 hour', help="Time step, e.g. '10 min'.")
+    create.add_argument('--fields', default=None, help="Comma separated fields (default: a_ra,a_dec,alt,az).")
+    create.add_argument('--targets-per-shard', type=int, default=100, help="Targets in each shard.")
+    create.add_argument('--times-per-shard', type=int, default=10000, help="Times in each shard.")
+    work = commands.add_parser('work', help="Compute unfinished shards.")
+    work.add_argument('directory', help="Job directory.")
+    work.add_argument('--max-shards', type=int, default=None, help="Stop after this many shards.")
+    work.add_argument('--timeout', type=float, default=3600.0, help="Seconds after which a lock is stale.")
+    status = commands.add_parser('status', help="Count finished shards.")
+    status.add_argument('directory', help="Job directory.")
+    combine = commands.add_parser('merge', help="Concatenate finished shards.")
+    combine.add_argument('directory', help="Job directory.")
+    combine.add_argument('output', help="Output file (.csv, .ecsv or .fits).")
+    opts = parser.parse_args(args)
+
+    if opts.command == 'create':
+        with io.open(opts.sites, encoding='utf-8') as stream:
+            sites = json.load(stream)
+        manifest = create_job(opts.directory, read_targets(opts.targets), sites, Time(opts.start, scale='utc'),
+            Time(opts.stop, scale='utc'), u.Quantity(opts.step), opts.fields.split(",") if opts.fields else None,
+            opts.targets_per_shard, opts.times_per_shard)
+        print("Created a job of {} shards in {}.".format(len(shards(manifest)), opts.directory))
+    elif opts.command == 'work':
+        done = run_worker(opts.directory, max_shards=opts.max_shards, timeout=opts.timeout)
+        print("Computed {} shards.".format(len(done)))
+    elif opts.command == 'status':
+        print("{finished} of {shards} shards finished, {locked} in progress, {waiting} waiting.".format(
+            **job_status(opts.directory)))
+    elif opts.command == 'merge':
+        print("Wrote {} rows to {}.".format(merge(opts.directory, opts.output), opts.output))
+    else:
+        parser.print_help()
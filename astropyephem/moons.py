@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+#
+#  moons.py
+#  astropyephem
+#
+
+"""
+Positions of the moons of the planets over arrays of times, and the
+transits, occultations and eclipses among them.
+
+:func:`moon_offsets` gives the ``x``, ``y`` and ``z`` offsets of every moon
+of a planet (in planet radii, as on the :mod:`ephem` moon objects) for a
+whole array of times. :func:`moon_events` scans those offsets on a coarse
+grid, as seen from both the Earth and the Sun, for the approaches of each
+moon to the planet and to the other moons, and refines each event in a batch.
+
+The planet is treated as a sphere with its equatorial radius, and shadows as
+cylinders, so contact times may differ by a few minutes from a full model.
+"""
+
+from __future__ import (absolute_import, unicode_literals, division,
+                        print_function)
+
+import numpy as np
+import ephem
+
+import astropy.units as u
+from astropy.table import Table
+
+from .arrays import ephem_instance, ephem_dates, date_grid, sample, unit_vectors
+from .almanac import _event_times
+from .events import refine_roots
+from .kepler import earth_vectors
+
+__all__ = ['PLANET_RADII', 'PLANET_MOONS', 'moon_offsets', 'moon_events']
+
+#: Equatorial radii of the planets with moons in :mod:`ephem`, in km.
+PLANET_RADII = {'Mars': 3396.19, 'Jupiter': 71492.0, 'Saturn': 60268.0, 'Uranus': 25559.0}
+
+#: The moons of each planet in :mod:`ephem`, with their mean radii in km.
+PLANET_MOONS = {
+    'Mars': (('Phobos', 11.1), ('Deimos', 6.2)),
+    'Jupiter': (('Io', 1821.6), ('Europa', 1560.8), ('Ganymede', 2631.2), ('Callisto', 2410.3)),
+    'Saturn': (('Mimas', 198.2), ('Enceladus', 252.1), ('Tethys', 531.1), ('Dione', 561.4), ('Rhea', 763.8),
+        ('Titan', 2574.7), ('Hyperion', 135.0), ('Iapetus', 734.5)),
+    'Uranus': (('Miranda', 235.8), ('Ariel', 578.9), ('Umbriel', 584.7), ('Titania', 788.9), ('Oberon', 761.4)),
+}
+
+def _planet_name(planet):
+    """The name of a planet, given as a name or a body."""
+    if isinstance(planet, (str, type(u''))):
+        name = planet
+    else:
+        name = ephem_instance(planet).name
+    if name not in PLANET_MOONS:
+        raise ValueError("No moons are known for '{}'.".format(name))
+    return name
+
+def _offsets(name, dates, fields=('x', 'y', 'z')):
+    """Moon fields with shape ``(moons, dates)`` for :mod:`ephem` dates."""
+    moons = [getattr(ephem, moon)() for moon, radius in PLANET_MOONS[name]]
+    result = dict((field, np.empty((len(moons), len(dates)))) for field in fields)
+    for i, moon in enumerate(moons):
+        values = sample(moon, dates, fields=fields)
+        for field in fields:
+            result[field][i] = values[field]
+    return result
+
+def moon_offsets(planet, times, fields=('x', 'y', 'z')):
+    """The offsets of every moon of a planet, for an array of times.
+
+    ``x`` is east and ``y`` south of the center of the planet on the sky,
+    and ``z`` towards the Earth, all in equatorial radii of the planet.
+
+    :param planet: A planet body, or its name.
+    :param times: An :class:`astropy.time.Time` array.
+    :param fields: Moon attributes to compute, which may also include
+        ``earth_visible`` and ``sun_visible``.
+    :returns: A dictionary of arrays of shape ``(moons, times)``, with the
+        moons in the order of :data:`PLANET_MOONS`.
+    """
+    return _offsets(_planet_name(planet), np.atleast_1d(ephem_dates(times)), fields)
+
+def _views(name, dates):
+    """Moon positions in planet radii, projected along the lines of sight from the Earth and the Sun.
+
+    Returns ``{view: (projected, depth)}``, with projected positions of shape
+    ``(moons, dates, 3)`` and depths (towards the Earth or Sun) of shape ``(moons, dates)``.
+    """
+    offsets = _offsets(name, dates)
+    planet = sample(getattr(ephem, name)(), dates, fields=('a_ra', 'a_dec', 'earth_distance'))
+    ra, dec = planet['a_ra'], planet['a_dec']
+    toward = unit_vectors(ra, dec)
+    east = np.stack([-np.sin(ra), np.cos(ra), np.zeros_like(ra)], axis=-1)
+    north = np.stack([-np.sin(dec) * np.cos(ra), -np.sin(dec) * np.sin(ra), np.cos(dec)], axis=-1)
+    x, y, z = offsets['x'][..., np.newaxis], offsets['y'][..., np.newaxis], offsets['z'][..., np.newaxis]
+    vectors = x * east - y * north - z * toward
+    earth = np.concatenate([offsets['x'][..., np.newaxis], offsets['y'][..., np.newaxis],
+        np.zeros(x.shape)], axis=-1)
+    sun = planet['earth_distance'][:, np.newaxis] * toward + earth_vectors(dates)
+    sun /= np.sqrt(np.sum(sun * sun, axis=-1))[:, np.newaxis]
+    along = np.sum(vectors * sun, axis=-1)
+    return {'earth': (earth, offsets['z']), 'sun': (vectors - along[..., np.newaxis] * sun, -along)}
+
+def _separation(views, view, i, j):
+    """The projected separation of moon ``i`` from moon ``j``, or from the planet if ``j`` is `None`."""
+    projected = views[view][0]
+    difference = projected[i] if j is None else projected[i] - projected[j]
+    return np.sqrt(np.sum(difference * difference, axis=-1))
+
+_EVENT_NAMES = {('earth', True): ('transit', 'occultation'), ('sun', True): ('shadow_transit', 'eclipse'),
+    ('earth', False): ('mutual_occultation',) * 2, ('sun', False): ('mutual_eclipse',) * 2}
+
+def moon_events(planet, start, stop, step=30 * u.minute, mutual=True):
+    """Transits, occultations and eclipses of the moons of a planet between two times.
+
+    Events with the planet are ``transit`` and ``occultation`` (as seen from
+    the Earth), and ``shadow_transit`` and ``eclipse`` (as seen from the
+    Sun). Between moons, ``mutual_occultation`` and ``mutual_eclipse`` events
+    name the nearer moon (to the Earth or Sun) as the ``moon`` and the other
+    as the ``other``. Contacts are first and last contact of the disks, and
+    are masked if they fall outside the searched span.
+
+    :param planet: A planet body, or its name.
+    :param start: The first :class:`astropy.time.Time` to search.
+    :param stop: The last :class:`astropy.time.Time` to search.
+    :param step: The spacing of the coarse grid, which should be shorter than
+        the shortest event.
+    :param mutual: Whether to search for events between pairs of moons.
+    :returns: A :class:`~astropy.table.Table` of ``event``, ``moon``,
+        ``other``, ``start``, ``middle`` and ``end`` times, and the least
+        projected ``separation`` in planet radii, ordered by the middle time.
+    """
+    name = _planet_name(planet)
+    moons = [moon for moon, radius in PLANET_MOONS[name]]
+    radii = np.array([radius for moon, radius in PLANET_MOONS[name]]) / PLANET_RADII[name]
+    dates = date_grid(start, stop, step)
+    views = _views(name, dates)
+    pairs = [(i, None) for i in range(len(moons))]
+    if mutual:
+        pairs += [(i, j) for i in range(len(moons)) for j in range(i + 1, len(moons))]
+
+    rows = []
+    for view in ('earth', 'sun'):
+        for i, j in pairs:
+            limit = radii[i] + (1.0 if j is None else radii[j])
+            separation = _separation(views, view, i, j)
+            func = lambda d, i=i, j=j, view=view: _separation(_views(name, d), view, i, j)
+            for event in _pair_events(func, dates, separation, limit):
+                middle, least, contacts = event
+                depth = _views(name, np.array([middle]))[view][1][:, 0]
+                front = depth[i] > (0.0 if j is None else depth[j])
+                names = _EVENT_NAMES[(view, j is None)]
+                if j is None:
+                    moon, other = moons[i], name
+                else:
+                    moon, other = (moons[i], moons[j]) if front else (moons[j], moons[i])
+                rows.append((names[0] if front else names[1], moon, other, contacts[0], middle, contacts[1], least))
+    rows.sort(key=lambda row: row[4])
+    columns = list(zip(*rows)) if rows else [[]] * 7
+    table = Table([np.array(columns[0], dtype=np.str_), np.array(columns[1], dtype=np.str_),
+        np.array(columns[2], dtype=np.str_)], names=['event', 'moon', 'other'])
+    for index, column in ((3, 'start'), (4, 'middle'), (5, 'end')):
+        table[column] = _event_times(np.array(columns[index], dtype=np.float64))
+    table['separation'] = np.array(columns[6], dtype=np.float64)
+    return table
+
+def _pair_events(func, dates, separation, limit):
+    """Refine the approaches closer than a limit from a coarse sampling of a separation.
+
+    Yields ``(middle, least separation, (first contact, last contact))``.
+    """
+    slope = np.diff(separation)
+    steps = np.flatnonzero((slope[:-1] < 0) & (slope[1:] >= 0))
+    # The true minimum may fall between grid points, by at most the motion over one step.
+    motion = np.maximum(np.abs(slope[steps]), np.abs(slope[steps + 1]))
+    steps = steps[separation[steps + 1] - motion < limit]
+    if not len(steps):
+        return
+    def derivative(d, delta=1e-4):
+        values = func(np.concatenate([d + delta, d - delta]))
+        return values[:len(d)] - values[len(d):]
+    middles = refine_roots(derivative, dates[steps], dates[steps + 2], tolerance=1e-6)
+    least = func(middles)
+    keep = least < limit
+    steps, middles, least = steps[keep], middles[keep], least[keep]
+    # The last sample outside the limit at or before each event, and the first at or after it.
+    outside = np.append(np.flatnonzero(separation >= limit), -1)
+    before = outside[np.searchsorted(outside[:-1], steps, side='right') - 1]
+    after = outside[np.searchsorted(outside[:-1], steps + 2, side='left')]
+    contacts = []
+    for ends in (before, after):
+        found = np.full(len(steps), np.nan)
+        valid = ends >= 0
+        if valid.any():
+            found[valid] = refine_roots(lambda d: func(d) - limit, dates[ends[valid]], middles[valid],
+                tolerance=1e-6)
+        contacts.append(found)
+    for event in zip(middles, least, zip(*contacts)):
+        yield event
@@ -13,9 +13,39 @@ from __future__ import (absolute_import, unicode_literals, division,
 import ephem
 
 import astropy.units as u
+from astropy.coordinates import Longitude
 from .bases import EphemClass, EphemAttribute, EphemCelciusAttribute
+from .arrays import ephem_dates, sidereal_time
 
-__all__ = ['Observer']
+__all__ = ['Observer', 'local_sidereal_time', 'hour_angle']
+
+def local_sidereal_time(times, longitude):
+    """Local apparent sidereal times for arrays of times and site longitudes.
+
+    Like :meth:`ephem.Observer.sidereal_time`, UTC is treated as UT1, and the
+    two agree to a few hundredths of a second.
+
+    :param times: An :class:`astropy.time.Time` array.
+    :param longitude: Site longitudes (east positive) as angles, which
+        broadcast against the times.
+    :returns: A :class:`~astropy.coordinates.Longitude` array in hours.
+    """
+    lst = sidereal_time(ephem_dates(times), u.Quantity(longitude, u.radian).value)
+    return Longitude(lst * u.radian).to(u.hourangle)
+
+def hour_angle(ra, times, longitude):
+    """Hour angles, between -12 and 12 hours, for right ascensions at arrays of times and site longitudes.
+
+    The right ascensions should be apparent places of date (``ra`` on a
+    computed body) to match the ``ha`` of :mod:`ephem`.
+
+    :param ra: Right ascensions as angles, which broadcast against the times.
+    :param times: An :class:`astropy.time.Time` array.
+    :param longitude: Site longitudes, as for :func:`local_sidereal_time`.
+    :returns: A :class:`~astropy.coordinates.Longitude` array in hours, wrapped at 12 hours.
+    """
+    lst = sidereal_time(ephem_dates(times), u.Quantity(longitude, u.radian).value)
+    return Longitude((lst - u.Quantity(ra, u.radian).value) * u.radian, wrap_angle=180 * u.deg).to(u.hourangle)
 
 class Observer(EphemClass):
     """Make an observer."""
@@ -47,3 +77,27 @@ class Observer(EphemClass):
     
     pressure = EphemAttribute("pressure", 1e-3 * u.bar)
     
+    def sidereal_times(self, times):
+        """Local apparent sidereal times for an array of times. See :func:`local_sidereal_time`."""
+        return local_sidereal_time(times, self.__wrapped_instance__.lon)
+
+    def hour_angles(self, ra, times):
+        """Hour angles of right ascensions at an array of times. See :func:`hour_angle`."""
+        return hour_angle(ra, times, self.__wrapped_instance__.lon)
+
+    def horizon_grid(self, az, alt, wavelength=None, dtype=None):
+        """A grid of apparent azimuths and altitudes, for mapping to right ascension and declination at many times.
+
+        See :class:`astropyephem.horizon.HorizonGrid`.
+        """
+        from .horizon import HorizonGrid
+        return HorizonGrid(self, az, alt, wavelength=wavelength, dtype=dtype or float)
+
+    def almanac(self, start, stop, step=10 * u.minute):
+        """A table of sun and moon rise and set times, twilights and moon phase for each night.
+        
+        See :func:`astropyephem.almanac.almanac`.
+        """
+        from .almanac import almanac
+        return almanac(self, start, stop, step=step)
+    
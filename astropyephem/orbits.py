@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+#
+#  orbits.py
+#  astropyephem
+#
+
+"""
+Catalogs of minor body orbital elements, held as columns.
+
+XEphem ``.edb`` files and the Minor Planet Center's ``MPCORB.DAT`` are read
+line by line into :class:`OrbitCatalog` chunks of :mod:`numpy` arrays, with
+an index by designation. :mod:`ephem` bodies are only made on request, with
+:meth:`OrbitCatalog.body`.
+
+Angles are stored in radians and dates as :mod:`ephem` dates, as read from
+the attributes of :class:`ephem.EllipticalBody` and friends: ``epoch`` is the
+equinox of the elements, ``epoch_M`` the epoch of the mean anomaly of an
+elliptical orbit and ``epoch_p`` the time of perihelion of a hyperbolic or
+parabolic one.
+"""
+
+from __future__ import (absolute_import, unicode_literals, division,
+                        print_function)
+
+import io
+import re
+import gzip
+import math
+import contextlib
+
+import numpy as np
+import ephem
+
+from . import targets
+from .arrays import EPHEM_JD_OFFSET, ephem_instance
+
+__all__ = ['ORBIT_COLUMNS', 'OrbitCatalog', 'iter_xephem', 'read_xephem', 'iter_mpcorb', 'read_mpcorb']
+
+#: The float columns of an :class:`OrbitCatalog`. Columns which do not apply
+#: to an orbit (such as ``a`` for a parabola, or ``H`` when the magnitude
+#: model is g/k) are ``nan``.
+ORBIT_COLUMNS = ('inc', 'Om', 'om', 'a', 'e', 'q', 'M', 'epoch', 'epoch_M', 'epoch_p', 'H', 'G', 'g', 'k', 'size')
+
+_COLUMN_INDEX = dict((name, i) for i, name in enumerate(ORBIT_COLUMNS))
+
+_KINDS = {'e': (ephem.EllipticalBody, 'EllipticalBody'), 'h': (ephem.HyperbolicBody, 'HyperbolicBody'),
+    'p': (ephem.ParabolicBody, 'ParabolicBody')}
+
+# The attributes of the ephem bodies which hold each column, by kind.
+_ATTRIBUTES = {
+    'e': ('inc', 'Om', 'om', 'a', 'e', 'M', 'epoch', 'epoch_M', 'size'),
+    'h': ('inc', 'Om', 'om', 'e', 'q', 'epoch', 'epoch_p', 'g', 'k', 'size'),
+    'p': ('inc', 'Om', 'om', 'q', 'epoch', 'epoch_p', 'g', 'k', 'size'),
+}
+
+# Columns which ephem reads back in radians, but sets from degrees.
+_ANGLES = set(['inc', 'Om', 'om', 'M'])
+
+_NUMBER = re.compile(r'\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?')
+
+def _number(text):
+    """The number at the start of some text, or zero, like C's ``atof``."""
+    match = _NUMBER.match(text)
+    return float(match.group(0)) if match else 0.0
+
+def _calendar_date(year, month, day):
+    """The :mod:`ephem` date of the start of a Gregorian calendar day."""
+    a = (14 - month) // 12
+    y = year + 4800 - a
+    m = month + 12 * a - 3
+    jdn = day + (153 * m + 2) // 5 + 365 * y + y // 4 - y // 100 + y // 400 - 32045
+    return jdn - 0.5 - EPHEM_JD_OFFSET
+
+def _xephem_date(text):
+    """The :mod:`ephem` date of an XEphem ``month/day/year`` date, ignoring any validity range."""
+    month, day, year = text.split('|')[0].split('/')
+    day = float(day)
+    return _calendar_date(int(year), int(month), int(math.floor(day))) + (day - math.floor(day))
+
+def _year_date(text):
+    """The :mod:`ephem` date of the start of a (possibly fractional) year."""
+    year = float(text)
+    start = _calendar_date(int(math.floor(year)), 1, 1)
+    return start + (year - math.floor(year)) * (_calendar_date(int(math.floor(year)) + 1, 1, 1) - start)
+
+@contextlib.contextmanager
+def _open(source):
+    """Lines of text from a filename (which may be gzipped), a file, or an iterable of lines.
+
+    Files opened here from a filename are closed on leaving the context;
+    files and iterables which are passed in are left open.
+    """
+    if isinstance(source, (str, type(u''))):
+        if source.endswith('.gz'):
+            stream = io.TextIOWrapper(gzip.open(source), encoding='latin-1')
+        else:
+            stream = io.open(source, encoding='latin-1')
+        with stream:
+            yield stream
+    else:
+        yield source
+
+class OrbitCatalog(object):
+    """Orbital elements for many bodies, as :mod:`numpy` columns with an index by name.
+
+    :param names: The designations of the bodies.
+    :param kinds: The XEphem orbit type of each body, ``e``, ``h`` or ``p``.
+    :param columns: A dictionary of the :data:`ORBIT_COLUMNS` arrays.
+    :param aliases: Further names for bodies, as a dictionary of row numbers.
+    """
+
+    def __init__(self, names, kinds, columns, aliases=None):
+        super(OrbitCatalog, self).__init__()
+        self.names = np.asarray(names, dtype=object)
+        self.kinds = np.asarray(kinds, dtype='U1')
+        self.columns = dict((name, np.asarray(columns[name], dtype=np.float64)) for name in ORBIT_COLUMNS)
+        self.index = dict((name, i) for i, name in enumerate(self.names))
+        if aliases:
+            for name, i in aliases.items():
+                self.index.setdefault(name, i)
+
+    def __repr__(self):
+        """Represent this catalog."""
+        return "<{} {} orbits>".format(self.__class__.__name__, len(self))
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __getitem__(self, column):
+        """A column of elements."""
+        return self.columns[column]
+
+    def row(self, key):
+        """The row number of a designation, or an integer row number."""
+        if isinstance(key, (int, np.integer)):
+            return int(key)
+        return self.index[key]
+
+    def body(self, key):
+        """A new :mod:`astropyephem` body for a designation or row number."""
+        i = self.row(key)
+        kind = self.kinds[i]
+        ephem_class, class_name = _KINDS[kind]
+        body = ephem_class()
+        body.name = str(self.names[i])
+        for name in _ATTRIBUTES[kind]:
+            value = self.columns[name][i]
+            setattr(body, '_' + name, math.degrees(value) if name in _ANGLES else value)
+        if kind == 'e':
+            if np.isnan(self.columns['H'][i]):
+                body._g, body._k = self.columns['g'][i], self.columns['k'][i]
+            else:
+                body._H, body._G = self.columns['H'][i], self.columns['G'][i]
+        return getattr(targets, class_name).from_ephem(body)
+
+    def select(self, rows):
+        """A new catalog of some rows, given as a boolean mask or row numbers."""
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        return self.__class__(self.names[rows], self.kinds[rows],
+            dict((name, column[rows]) for name, column in self.columns.items()))
+
+    @classmethod
+    def from_bodies(cls, bodies):
+        """A catalog of the elements of elliptical, hyperbolic and parabolic bodies."""
+        builder, chunks = _ChunkBuilder(max(len(bodies), 1)), []
+        for body in bodies:
+            body = ephem_instance(body)
+            record = body.writedb().split(',')
+            kind = record[1][0]
+            if kind not in _KINDS or not isinstance(body, _KINDS[kind][0]):
+                raise TypeError("Can't read orbital elements from {!r}".format(body))
+            values = dict((name, float(getattr(body, '_' + name))) for name in _ATTRIBUTES[kind])
+            if kind == 'e':
+                values['q'] = values['a'] * (1 - values['e'])
+                if record[11].startswith('H'):
+                    values.update(H=float(body._H), G=float(body._G))
+                else:
+                    values.update(g=float(body._g), k=float(body._k))
+            elif kind == 'p':
+                values['e'] = 1.0
+            chunks.append(builder.add(body.name, kind, values))
+        chunks.append(builder.finish())
+        return cls.concatenate(chunk for chunk in chunks if chunk is not None)
+
+    @classmethod
+    def concatenate(cls, catalogs):
+        """A single catalog from a sequence of catalogs."""
+        catalogs = list(catalogs)
+        if not catalogs:
+            return cls([], [], dict((name, []) for name in ORBIT_COLUMNS))
+        catalog = cls(np.concatenate([c.names for c in catalogs]), np.concatenate([c.kinds for c in catalogs]),
+            dict((name, np.concatenate([c.columns[name] for c in catalogs])) for name in ORBIT_COLUMNS))
+        offset = 0
+        for c in catalogs:
+            for name, i in c.index.items():
+                catalog.index.setdefault(name, i + offset)
+            offset += len(c)
+        return catalog
+
+class _ChunkBuilder(object):
+    """Collects parsed rows into catalogs of a fixed size."""
+
+    def __init__(self, chunk_size):
+        super(_ChunkBuilder, self).__init__()
+        self.chunk_size = chunk_size
+        self.reset()
+
+    def reset(self):
+        self.names, self.kinds, self.aliases = [], [], {}
+        self.columns = np.full((self.chunk_size, len(ORBIT_COLUMNS)), np.nan)
+
+    def add(self, name, kind, values, alias=None):
+        """Add a row, returning a finished catalog when the chunk is full."""
+        columns = self.columns[len(self.names)]
+        for column, value in values.items():
+            columns[_COLUMN_INDEX[column]] = value
+        self.names.append(name)
+        self.kinds.append(kind)
+        if alias is not None:
+            self.aliases[alias] = len(self.names) - 1
+        if len(self.names) == self.chunk_size:
+            return self.finish()
+
+    def finish(self):
+        """The catalog of the rows collected so far, or `None` if there are none."""
+        if not self.names:
+            return None
+        count = len(self.names)
+        catalog = OrbitCatalog(self.names, self.kinds,
+            dict((name, self.columns[:count, i].copy()) for i, name in enumerate(ORBIT_COLUMNS)), self.aliases)
+        self.reset()
+        return catalog
+
+def _parse_xephem(line):
+    """Parse an XEphem database line into a name, kind and dictionary of columns, or `None`."""
+    fields = line.strip().split(',')
+    if len(fields) < 2 or not fields[1] or fields[1][0] not in _KINDS:
+        return None
+    name, kind = fields[0], fields[1][0]
+    if kind == 'e':
+        values = dict(inc=math.radians(float(fields[2])), Om=math.radians(float(fields[3])),
+            om=math.radians(float(fields[4])), a=float(fields[5]), e=float(fields[7]),
+            M=math.radians(float(fields[8])), epoch_M=_xephem_date(fields[9]), epoch=_year_date(fields[10]))
+        values['q'] = values['a'] * (1 - values['e'])
+        magnitude = fields[11].strip() if len(fields) > 11 else ''
+        second = _number(fields[12]) if len(fields) > 12 else 0.0
+        if magnitude.startswith('H'):
+            values.update(H=_number(magnitude[1:]), G=second)
+        else:
+            values.update(g=_number(magnitude.lstrip('g')), k=second)
+        size = fields[13] if len(fields) > 13 else ''
+    elif kind == 'h':
+        values = dict(epoch_p=_xephem_date(fields[2]), inc=math.radians(float(fields[3])),
+            Om=math.radians(float(fields[4])), om=math.radians(float(fields[5])), e=float(fields[6]),
+            q=float(fields[7]), epoch=_year_date(fields[8]), g=_number(fields[9]), k=_number(fields[10]))
+        size = fields[11] if len(fields) > 11 else ''
+    else:
+        values = dict(epoch_p=_xephem_date(fields[2]), inc=math.radians(float(fields[3])),
+            om=math.radians(float(fields[4])), q=float(fields[5]), Om=math.radians(float(fields[6])),
+            epoch=_year_date(fields[7]), g=_number(fields[8]), k=_number(fields[9]), e=1.0)
+        size = fields[10] if len(fields) > 10 else ''
+    values['size'] = _number(size)
+    return name, kind, values
+
+def iter_xephem(source, chunk_size=100000):
+    """Read an XEphem database as a sequence of :class:`OrbitCatalog` chunks.
+
+    Only elliptical, hyperbolic and parabolic orbits are read; other lines
+    are skipped.
+
+    :param source: A filename (which may be gzipped), a file, or an iterable of lines.
+    :param chunk_size: The largest number of orbits in each chunk.
+    """
+    builder = _ChunkBuilder(chunk_size)
+    with _open(source) as lines:
+        for line in lines:
+            if not line.strip() or line.startswith('#'):
+                continue
+            parsed = _parse_xephem(line)
+            if parsed is not None:
+                chunk = builder.add(*parsed)
+                if chunk is not None:
+                    yield chunk
+    chunk = builder.finish()
+    if chunk is not None:
+        yield chunk
+
+def read_xephem(source):
+    """Read a whole XEphem database into one :class:`OrbitCatalog`."""
+    return OrbitCatalog.concatenate(iter_xephem(source))
+
+_PACKED = '0123456789ABCDEFGHIJKLMNOPQRSTUV'
+
+def _packed_date(text):
+    """The :mod:`ephem` date of an MPC packed date, such as ``K2555``."""
+    year = 100 * _PACKED.index(text[0]) + int(text[1:3])
+    return _calendar_date(year, _PACKED.index(text[3]), _PACKED.index(text[4]))
+
+def _parse_mpcorb(line):
+    """Parse an MPCORB line into a name, designation and dictionary of columns, or `None`."""
+    if len(line) < 103 or line[0] == ' ':
+        return None
+    try:
+        values = dict(H=float(line[8:13]) if line[8:13].strip() else np.nan,
+            G=float(line[14:19]) if line[14:19].strip() else 0.15,
+            epoch_M=_packed_date(line[20:25]), M=math.radians(float(line[26:35])),
+            om=math.radians(float(line[37:46])), Om=math.radians(float(line[48:57])),
+            inc=math.radians(float(line[59:68])), e=float(line[70:79]), a=float(line[92:103]),
+            epoch=float(ephem.J2000), size=0.0)
+    except (ValueError, IndexError):
+        return None
+    values['q'] = values['a'] * (1 - values['e'])
+    if np.isnan(values['H']):
+        values.update(H=np.nan, G=np.nan, g=0.0, k=0.0)
+    designation = line[0:7].strip()
+    name = line[166:194].strip() or designation
+    return name, designation, values
+
+def iter_mpcorb(source, chunk_size=100000):
+    """Read an ``MPCORB.DAT`` file as a sequence of :class:`OrbitCatalog` chunks.
+
+    Bodies are named by their readable designation, such as ``(1) Ceres``,
+    and can also be found by their packed designation.
+
+    :param source: A filename (which may be gzipped), a file, or an iterable of lines.
+    :param chunk_size: The largest number of orbits in each chunk.
+    """
+    builder = _ChunkBuilder(chunk_size)
+    with _open(source) as lines:
+        for line in lines:
+            parsed = _parse_mpcorb(line)
+            if parsed is not None:
+                name, designation, values = parsed
+                chunk = builder.add(name, 'e', values, alias=designation)
+                if chunk is not None:
+                    yield chunk
+    chunk = builder.finish()
+    if chunk is not None:
+        yield chunk
+
+def read_mpcorb(source):
+    """Read a whole ``MPCORB.DAT`` file into one :class:`OrbitCatalog`."""
+    return OrbitCatalog.concatenate(iter_mpcorb(source))
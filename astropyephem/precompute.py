@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+#
+#  precompute.py
+#  astropyephem
+#
+
+"""
+Precomputed, memory-mapped tables of geocentric solar system positions.
+
+:func:`write_table` computes the astrometric geocentric position of the
+planets and moons provided by :mod:`astropyephem.targets` on a regular grid
+of dates and writes them to a single binary file. :class:`EphemerisTable`
+memory-maps that file read-only, so that many processes on one machine share
+the same pages, and interpolates positions at arbitrary times.
+
+Each body is tabulated with its own spacing: the requested step, or a
+twenty-fourth of the body's orbital period around its planet if that is
+shorter, so that four-point Lagrange interpolation stays well below an
+arcsecond even for fast moons such as Phobos. The writer measures the
+interpolation error at interval midpoints for every body and records the
+largest one in the header as ``max_error`` (arcseconds).
+
+The file is a fixed header followed by a JSON description and a
+little-endian ``float64`` array of shape ``(rows, 4)``, holding the unit
+vector ``x, y, z`` and the distance in AU (``NaN`` where :mod:`ephem` does
+not provide one). Each body occupies a contiguous block of rows described by
+its ``offset``, ``start``, ``step`` and ``count`` in the header.
+"""
+
+from __future__ import (absolute_import, unicode_literals, division,
+                        print_function)
+
+import io
+import json
+import struct
+import inspect
+
+import numpy as np
+
+import astropy.units as u
+from astropy.time import Time
+from astropy.coordinates import SkyCoord, ICRS, FK5
+
+from . import targets
+from .bases import EQUINOX_J2000
+from .arrays import date_grid, ephem_dates, astropy_times
+
+__all__ = ['FORMAT_VERSION', 'ORBITAL_PERIODS', 'solar_system_bodies', 'body_step', 'write_table', 'EphemerisTable']
+
+MAGIC = b'APYEPHEM'
+FORMAT_VERSION = 2
+_PREAMBLE = struct.Struct('<8sII')
+_ALIGNMENT = 64
+_FIELDS = ('x', 'y', 'z', 'distance')
+
+#: Sidereal orbital periods, in hours, of the planet moons provided by :mod:`ephem`.
+ORBITAL_PERIODS = {
+    'Phobos' : 7.65, 'Deimos' : 30.3,
+    'Io' : 42.5, 'Europa' : 85.2, 'Ganymede' : 171.7, 'Callisto' : 400.5,
+    'Mimas' : 22.6, 'Enceladus' : 32.9, 'Tethys' : 45.3, 'Dione' : 65.7, 'Rhea' : 108.4,
+    'Titan' : 382.7, 'Hyperion' : 510.6, 'Iapetus' : 1903.9,
+    'Miranda' : 33.9, 'Ariel' : 60.5, 'Umbriel' : 99.5, 'Titania' : 208.9, 'Oberon' : 323.1,
+}
+
+# The number of samples per orbit used for fast moons, and the number of
+# interval midpoints used to measure the interpolation error of each body.
+_SAMPLES_PER_ORBIT = 24
+_ERROR_SAMPLES = 64
+
+def solar_system_bodies():
+    """The names of all planet and planet-moon classes in :mod:`astropyephem.targets`."""
+    names = []
+    for name in targets.__all__:
+        cls = getattr(targets, name)
+        if inspect.isclass(cls) and issubclass(cls, (targets.Planet, targets.PlanetMoon)) \
+            and cls not in (targets.Planet, targets.PlanetMoon):
+            names.append(name)
+    return sorted(set(names))
+
+def _compute_body(name, dates):
+    """Compute unit vectors and distances for a single body."""
+    cls = getattr(targets, name)
+    body = cls.__wrapped_class__()
+    has_distance = issubclass(cls, targets.Planet)
+    values = np.empty((len(dates), len(_FIELDS)), dtype=np.float64)
+    for i, date in enumerate(dates):
+        body.compute(date)
+        ra, dec = body.a_ra, body.a_dec
+        values[i, 0] = np.cos(dec) * np.cos(ra)
+        values[i, 1] = np.cos(dec) * np.sin(ra)
+        values[i, 2] = np.sin(dec)
+        values[i, 3] = body.earth_distance if has_distance else np.nan
+    return values
+
+def body_step(name, step=3 * u.hour):
+    """The table spacing used for a body, given the requested spacing."""
+    step = u.Quantity(step, u.hour)
+    if name in ORBITAL_PERIODS:
+        return min(step, ORBITAL_PERIODS[name] * u.hour / _SAMPLES_PER_ORBIT)
+    return step
+
+def _lagrange(rows, position):
+    """Four-point Lagrange interpolation of table rows at fractional row positions."""
+    count = rows.shape[0]
+    index = np.clip(np.floor(position).astype(int) - 1, 0, max(count - 4, 0))
+    n = min(count, 4)
+    p = position - index
+    result = np.zeros(position.shape + (rows.shape[-1],))
+    for j in range(n):
+        weight = np.ones_like(p)
+        for k in range(n):
+            if k != j:
+                weight *= (p - k) / (j - k)
+        result += weight[..., np.newaxis] * rows[index + j]
+    vector = result[..., :3]
+    vector /= np.sqrt(np.sum(vector ** 2, axis=-1))[..., np.newaxis]
+    return vector, result[..., 3]
+
+def _interpolation_error(name, dates, values):
+    """The largest interpolation error, in arcseconds, at midpoints between table rows."""
+    if len(dates) < 2:
+        return 0.0
+    midpoints = np.unique(np.linspace(0, len(dates) - 2, min(_ERROR_SAMPLES, len(dates) - 1)).astype(int)) + 0.5
+    exact = _compute_body(name, dates[0] + midpoints * (dates[1] - dates[0]))
+    vector, distance = _lagrange(values, midpoints)
+    cosine = np.clip(np.sum(vector * exact[:, :3], axis=-1), -1.0, 1.0)
+    return float(np.degrees(np.max(np.arccos(cosine))) * 3600.0)
+
+def write_table(filename, start, stop, step=3 * u.hour, bodies=None):
+    """Compute and write a table of geocentric positions.
+
+    :param filename: The output file.
+    :param start: The first date, as an :class:`astropy.time.Time`.
+    :param stop: The last date, as an :class:`astropy.time.Time`.
+    :param step: The largest spacing of the table, as a time :class:`astropy.units.Quantity`.
+        Fast moons use a shorter spacing, see :func:`body_step`.
+    :param bodies: Names of bodies in :mod:`astropyephem.targets`. Defaults to all planets and moons.
+    """
+    bodies = solar_system_bodies() if bodies is None else list(bodies)
+    blocks, entries, offset = [], [], 0
+    for name in bodies:
+        dates = date_grid(start, stop, body_step(name, step))
+        values = _compute_body(name, dates)
+        blocks.append(values)
+        entries.append({
+            'name' : name,
+            'offset' : offset,
+            'start' : float(dates[0]),
+            'step' : body_step(name, step).to(u.day).value,
+            'count' : len(dates),
+            'max_error' : _interpolation_error(name, dates, values),
+        })
+        offset += len(dates)
+    header = {
+        'bodies' : entries,
+        'fields' : list(_FIELDS),
+        'rows' : offset,
+        'dtype' : '<f8',
+        'frame' : 'FK5',
+        'equinox' : 'J2000',
+    }
+    header_bytes = json.dumps(header, sort_keys=True).encode('utf-8')
+    padding = -(_PREAMBLE.size + len(header_bytes)) % _ALIGNMENT
+    with io.open(filename, 'wb') as stream:
+        stream.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes) + padding))
+        stream.write(header_bytes + b' ' * padding)
+        for values in blocks:
+            stream.write(values.astype('<f8').tobytes())
+    return filename
+
+class EphemerisTable(object):
+    """A read-only, memory-mapped table written by :func:`write_table`."""
+
+    def __init__(self, filename):
+        super(EphemerisTable, self).__init__()
+        self.filename = filename
+        with io.open(filename, 'rb') as stream:
+            magic, version, length = _PREAMBLE.unpack(stream.read(_PREAMBLE.size))
+            if magic != MAGIC:
+                raise ValueError("{} is not an ephemeris table.".format(filename))
+            if version != FORMAT_VERSION:
+                raise ValueError("{} has table format version {}, expected {}.".format(filename, version, FORMAT_VERSION))
+            self.header = json.loads(stream.read(length).decode('utf-8'))
+        self._entries = dict((entry['name'], entry) for entry in self.header['bodies'])
+        self.bodies = [entry['name'] for entry in self.header['bodies']]
+        self.data = np.memmap(filename, dtype=self.header['dtype'], mode='r', offset=_PREAMBLE.size + length,
+                              shape=(self.header['rows'], len(self.header['fields'])))
+
+    def __repr__(self):
+        """Represent this table."""
+        return "<{} '{}' {} bodies from {} to {}>".format(self.__class__.__name__, self.filename,
+            len(self.bodies), self.start.iso, self.stop.iso)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    @property
+    def start(self):
+        """The first date covered by every body in the table."""
+        return astropy_times(max(entry['start'] for entry in self._entries.values()))
+
+    @property
+    def stop(self):
+        """The last date covered by every body in the table."""
+        return astropy_times(min(entry['start'] + entry['step'] * (entry['count'] - 1)
+                                 for entry in self._entries.values()))
+
+    def max_error(self, name):
+        """The largest interpolation error for a body measured when the table was written."""
+        return self._entries[name]['max_error'] * u.arcsec
+
+    def rows(self, name):
+        """The memory-mapped table rows for a single body."""
+        entry = self._entries[name]
+        return self.data[entry['offset']:entry['offset'] + entry['count']]
+
+    def interpolate(self, name, times):
+        """Interpolate the raw table for a body, returning the unit vector and distance.
+
+        Uses four-point Lagrange interpolation between table rows.
+        """
+        entry = self._entries[name]
+        dates = np.asarray(ephem_dates(times), dtype=np.float64)
+        position = (dates - entry['start']) / entry['step']
+        if np.any(position < 0) or np.any(position > entry['count'] - 1):
+            raise ValueError("Requested times fall outside the table range for {}".format(name))
+        return _lagrange(self.rows(name), position)
+
+    def radec(self, name, times):
+        """Return interpolated astrometric (FK5 J2000) RA and Dec in radians."""
+        vector, distance = self.interpolate(name, times)
+        ra = np.arctan2(vector[..., 1], vector[..., 0]) % (2 * np.pi)
+        dec = np.arcsin(np.clip(vector[..., 2], -1.0, 1.0))
+        return ra, dec
+
+    def position(self, name, times):
+        """Return the interpolated astrometric position as an ICRS :class:`astropy.coordinates.SkyCoord`."""
+        vector, distance = self.interpolate(name, times)
+        ra = np.arctan2(vector[..., 1], vector[..., 0]) * u.radian
+        dec = np.arcsin(np.clip(vector[..., 2], -1.0, 1.0)) * u.radian
+        if np.all(np.isfinite(distance)):
+            coord = SkyCoord(ra, dec, distance=distance * u.AU, frame=FK5, equinox=EQUINOX_J2000)
+        else:
+            coord = SkyCoord(ra, dec, frame=FK5, equinox=EQUINOX_J2000)
+        return coord.transform_to(ICRS)
+
+def main(args=None):
+    """Command-line entry point to write an ephemeris table."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Precompute a memory-mapped table of solar system positions.")
+    parser.add_argument('filename', help="Output table file.")
+    parser.add_argument('--start', required=True, help="First date (any astropy Time string).")
+    parser.add_argument('--stop', required=True, help="Last date (any astropy Time string).")
+    parser.add_argument('--step', default='3 hour', help="Largest table spacing, e.g. '3 hour'.")
+    parser.add_argument('--bodies', default=None, help="Comma separated body names (default: all planets and moons).")
+    opts = parser.parse_args(args)
+    bodies = opts.bodies.split(",") if opts.bodies else None
+    write_table(opts.filename, Time(opts.start, scale='utc'), Time(opts.stop, scale='utc'),
+                u.Quantity(opts.step), bodies=bodies)
+    table = EphemerisTable(opts.filename)
+    print(repr(table))
+    for name in table.bodies:
+        print("{:<12s} max interpolation error {:.2g}".format(name, table.max_error(name)))
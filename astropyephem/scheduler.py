@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+#
+#  scheduler.py
+#  astropyephem
+#
+
+"""
+A greedy night scheduler.
+
+Visibility of every block is evaluated once on a regular grid of time slots
+with :func:`~astropyephem.constraints.constraint_grid`. The sequencer then
+repeatedly picks the best block which can start after slewing from the
+current position and stay observable for its whole exposure, scoring all of
+the remaining blocks at once with :mod:`numpy`.
+"""
+
+from __future__ import (absolute_import, unicode_literals, division,
+                        print_function)
+
+import numpy as np
+
+import astropy.units as u
+from astropy.table import Table
+
+from .arrays import ephem_dates, astropy_times
+from .constraints import constraint_grid
+
+__all__ = ['ObservingBlock', 'ScheduledObservation', 'Schedule', 'Scheduler', 'night_window']
+
+class ObservingBlock(object):
+    """A request to observe a target.
+
+    :param target: A scalar :class:`~astropy.coordinates.SkyCoord` or a body.
+    :param exposure: The total time on target, as a time :class:`~astropy.units.Quantity`.
+    :param priority: The relative priority of this block; larger is more important.
+    :param constraints: Keyword arguments for :func:`~astropyephem.constraints.constraint_grid`,
+        which replace the scheduler's constraints for this block.
+    :param name: A name for this block. Defaults to the name of the target.
+    """
+
+    def __init__(self, target, exposure, priority=1.0, constraints=None, name=None):
+        super(ObservingBlock, self).__init__()
+        self.target = target
+        self.exposure = u.Quantity(exposure, u.s)
+        self.priority = float(priority)
+        self.constraints = constraints
+        if name is None:
+            name = getattr(target, 'name', None)
+        self.name = name
+
+    def __repr__(self):
+        """Represent this block."""
+        return "<{} '{}' {} priority={}>".format(self.__class__.__name__, self.name, self.exposure, self.priority)
+
+class ScheduledObservation(object):
+    """An observing block placed in a schedule."""
+
+    def __init__(self, block, start, end, slew):
+        super(ScheduledObservation, self).__init__()
+        self.block = block
+        self.start = start
+        self.end = end
+        self.slew = slew
+
+    def __repr__(self):
+        """Represent this observation."""
+        return "<{} '{}' {} to {}>".format(self.__class__.__name__, self.block.name, self.start.iso, self.end.iso)
+
+class Schedule(object):
+    """An ordered plan of observations, and the blocks which could not be scheduled."""
+
+    def __init__(self, observations, unscheduled):
+        super(Schedule, self).__init__()
+        self.observations = observations
+        self.unscheduled = unscheduled
+
+    def __repr__(self):
+        """Represent this schedule."""
+        return "<{} {} observations, {} unscheduled>".format(self.__class__.__name__,
+            len(self.observations), len(self.unscheduled))
+
+    def __len__(self):
+        return len(self.observations)
+
+    def __iter__(self):
+        return iter(self.observations)
+
+    def __getitem__(self, index):
+        return self.observations[index]
+
+    def to_table(self):
+        """The schedule as an :class:`~astropy.table.Table`."""
+        start = astropy_times([ephem_dates(o.start) for o in self.observations])
+        end = astropy_times([ephem_dates(o.end) for o in self.observations])
+        start.format = end.format = 'iso'
+        return Table([
+            [o.block.name for o in self.observations], start, end,
+            u.Quantity([o.slew for o in self.observations], u.s),
+            [o.block.priority for o in self.observations],
+        ], names=['name', 'start', 'end', 'slew', 'priority'])
+
+def night_window(observer, date, twilight='astronomical'):
+    """The start and end of the night of a date, between evening and morning twilight.
+
+    Raises :exc:`ValueError` if the Sun does not cross the twilight horizon
+    that night, as happens near the poles in summer.
+    """
+    from .almanac import almanac
+    night = almanac(observer, date, date)
+    window = []
+    for name in ('{}_twilight_evening'.format(twilight), '{}_twilight_morning'.format(twilight)):
+        if np.any(night[name].mask):
+            raise ValueError("There is no {} twilight on the night of {}.".format(twilight, night['date'][0]))
+        window.append(night[name][0])
+    return tuple(window)
+
+class Scheduler(object):
+    """Produce ordered observing plans for an observer.
+
+    Slew time is estimated from the altitude/azimuth offset between targets,
+    with independent axes moving at ``slew_rate``, plus ``settle_time``.
+    Blocks are chosen greedily by ``priority / (exposure + slew)``, boosted
+    for blocks whose remaining observable time is short compared to their
+    exposure. A block must be observable in every time slot from its start
+    to its end. Blocks without an altitude or airmass limit are held above
+    the horizon.
+
+    :param observer: The :class:`~astropyephem.observers.Observer`.
+    :param slew_rate: The slew rate of each telescope axis.
+    :param settle_time: The overhead added to every slew.
+    :param resolution: The spacing of the time slots used to check visibility.
+    :param constraints: Default keyword arguments for :func:`~astropyephem.constraints.constraint_grid`.
+    """
+
+    def __init__(self, observer, slew_rate=1.0 * u.deg / u.s, settle_time=30 * u.s, resolution=2 * u.minute,
+        **constraints):
+        super(Scheduler, self).__init__()
+        self.observer = observer
+        self.slew_rate = u.Quantity(slew_rate, u.deg / u.s)
+        self.settle_time = u.Quantity(settle_time, u.s)
+        self.resolution = u.Quantity(resolution, u.s)
+        self.constraints = constraints
+
+    def visibility(self, blocks, times):
+        """Observable masks, altitudes and azimuths in radians for blocks, each of shape ``(blocks, times)``."""
+        groups = {}
+        for i, block in enumerate(blocks):
+            constraints = dict(self.constraints if block.constraints is None else block.constraints)
+            if 'min_altitude' not in constraints and 'max_airmass' not in constraints:
+                constraints['min_altitude'] = 0 * u.deg
+            key = tuple(sorted((name, repr(value)) for name, value in constraints.items()))
+            groups.setdefault(key, (constraints, []))[1].append(i)
+        observable = np.zeros((len(blocks), len(times)), dtype=bool)
+        altitude = np.zeros(observable.shape)
+        azimuth = np.zeros(observable.shape)
+        for constraints, members in groups.values():
+            grid = constraint_grid([blocks[i].target for i in members], self.observer, times, **constraints)
+            observable[members] = grid.observable
+            altitude[members] = grid.altitude.to(u.radian).value
+            azimuth[members] = grid.azimuth.to(u.radian).value
+        return observable, altitude, azimuth
+
+    def schedule(self, blocks, start, stop):
+        """Schedule blocks between two times, returning a :class:`Schedule`."""
+        blocks = list(blocks)
+        step = self.resolution.to(u.day).value
+        dates = np.arange(ephem_dates(start), ephem_dates(stop) + 0.5 * step, step)
+        slots = len(dates)
+        if not blocks or slots < 2:
+            return Schedule([], blocks)
+        observable, altitude, azimuth = self.visibility(blocks, astropy_times(dates))
+        counts = np.zeros((len(blocks), slots + 1), dtype=int)
+        np.cumsum(observable, axis=1, out=counts[:, 1:])
+
+        exposure = np.array([block.exposure.to(u.day).value for block in blocks])
+        length = np.ceil(exposure / step - 1e-9).astype(int)
+        priority = np.array([block.priority for block in blocks])
+        rate = self.slew_rate.to(u.radian / u.day).value
+        settle = self.settle_time.to(u.day).value
+        rows = np.arange(len(blocks))
+        pending = np.ones(len(blocks), dtype=bool)
+
+        observations = []
+        current, position = 0, None
+        while pending.any():
+            if position is None:
+                slew = np.zeros(len(blocks))
+            else:
+                d_alt = np.abs(altitude[:, current] - position[0])
+                d_az = np.abs((azimuth[:, current] - position[1] + np.pi) % (2 * np.pi) - np.pi)
+                slew = np.maximum(d_alt, d_az) / rate + settle
+            first = current + np.ceil(slew / step - 1e-9).astype(int)
+            last = first + length
+            fits = pending & (last < slots)
+            first, last = np.where(fits, first, 0), np.where(fits, last, 0)
+            fits &= (counts[rows, last + 1] - counts[rows, first]) == length + 1
+            if not fits.any():
+                current += 1
+                if current >= slots or not (pending & (current + length < slots)).any():
+                    break
+                continue
+            remaining = counts[:, slots] - counts[rows, first]
+            urgency = 1.0 + length / np.maximum(remaining, 1)
+            score = np.where(fits, priority * urgency / (exposure + slew), -np.inf)
+            best = int(np.argmax(score))
+            begin = dates[0] + first[best] * step
+            observations.append(ScheduledObservation(blocks[best], astropy_times(begin),
+                astropy_times(begin + exposure[best]), slew[best] * u.day.to(u.s)))
+            pending[best] = False
+            current = int(last[best])
+            position = (altitude[best, current], azimuth[best, current])
+        return Schedule(observations, [block for block, waiting in zip(blocks, pending) if waiting])
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+#
+#  server.py
+#  astropyephem
+#
+
+"""
+A local server which answers pointing queries for many clients.
+
+:class:`PointingServer` keeps observers and targets in memory and answers
+requests over a TCP or Unix socket, so that several programs can share one
+process which has already imported :mod:`astropyephem`. Requests and
+responses are single lines of JSON. A request such as::
+
+    {"id": 1, "targets": ["Mars", "M31"], "observer": "summit"}
+
+is answered with::
+
+    {"id": 1, "date": 41698.91, "results": [{"target": "Mars", "alt": 35.2, ...}, ...]}
+
+giving the ``alt``, ``az``, ``ra`` and ``dec`` of each target in degrees and
+the ``alt_rate`` and ``az_rate`` in arcseconds per second. Current positions
+are for the start of the current tick, so every request received in one tick
+gets the same answer, which is computed only once. The requests received in
+one pass of the event loop are answered together.
+
+This module needs Python 3.
+"""
+
+from __future__ import (absolute_import, unicode_literals, division,
+                        print_function)
+
+import math
+import json
+import asyncio
+
+import ephem
+
+import astropy.units as u
+
+from .arrays import ephem_instance
+
+__all__ = ['PointingServer']
+
+class PointingServer(object):
+    """Observers and targets kept in memory, with pointings cached for each tick.
+
+    :param observers: A dictionary of :class:`~astropyephem.observers.Observer`
+        objects by name, or a single observer. Requests may leave out the
+        observer when there is only one.
+    :param targets: A dictionary of bodies by name. The planets and moons of
+        :mod:`ephem` can also be requested by name.
+    :param tick: The time for which a current pointing is reused.
+    :param rate_interval: The interval over which rates are found.
+    """
+
+    def __init__(self, observers, targets=None, tick=0.05 * u.s, rate_interval=1 * u.s):
+        super(PointingServer, self).__init__()
+        if not isinstance(observers, dict):
+            observers = {'default': observers}
+        self.observers = dict((name, ephem_instance(observer).copy()) for name, observer in observers.items())
+        self.tick = u.Quantity(tick, u.day).value
+        self.rate_interval = u.Quantity(rate_interval, u.day).value
+        self.hits = 0
+        self.misses = 0
+        self._cache = {}
+        self._cache_date = None
+        self._pending = []
+        self.targets = {}
+        for name, target in (targets or {}).items():
+            self.define(name, target)
+
+    def __repr__(self):
+        """Represent this server."""
+        return "<{} {} observers, {} targets>".format(self.__class__.__name__, len(self.observers),
+            len(self.targets))
+
+    def define(self, name, target):
+        """Add or replace a target.
+
+        :param name: The name requests will use.
+        :param target: A body, or an XEphem database line.
+        """
+        if isinstance(target, (str, type(''))):
+            target = ephem.readdb(target)
+        self.targets[name] = ephem_instance(target).copy()
+        self._cache = dict((key, value) for key, value in self._cache.items() if key[1] != name)
+
+    def _target(self, name):
+        """The named target, which may be an :mod:`ephem` planet or moon."""
+        if name not in self.targets:
+            planet = getattr(ephem, name, None)
+            if not (isinstance(planet, type) and issubclass(planet, ephem.Planet)):
+                raise KeyError("Unknown target '{}'.".format(name))
+            self.targets[name] = planet()
+        return self.targets[name]
+
+    def _observer(self, name):
+        """The named observer, or the only observer if no name is given."""
+        if name is None and len(self.observers) == 1:
+            name = next(iter(self.observers))
+        if name not in self.observers:
+            raise KeyError("Unknown observer '{}'.".format(name))
+        return name, self.observers[name]
+
+    def current_date(self):
+        """The :mod:`ephem` date at the start of the current tick."""
+        return math.floor(ephem.now() / self.tick) * self.tick
+
+    def point(self, targets, observer=None, date=None):
+        """Pointings for a list of targets.
+
+        :param targets: Target names.
+        :param observer: The observer name.
+        :param date: An :mod:`ephem` date, or the current tick if not given.
+        :returns: The date, and a list of result dictionaries as sent to clients.
+        """
+        name, observer = self._observer(observer)
+        date = self.current_date() if date is None else float(date)
+        if not math.isfinite(date):
+            raise ValueError("The date must be finite.")
+        if date != self._cache_date:
+            self._cache, self._cache_date = {}, date
+        results = []
+        for target in targets:
+            key = (name, target)
+            if key in self._cache:
+                self.hits += 1
+            else:
+                self.misses += 1
+                self._cache[key] = self._compute(target, observer, date)
+            results.append(self._cache[key])
+        return date, results
+
+    def _compute(self, target, observer, date):
+        """The pointing of one target for an observer at a date."""
+        body = self._target(target)
+        positions = []
+        for when in (date, date + self.rate_interval):
+            observer.date = when
+            body.compute(observer)
+            positions.append((body.alt, body.az, body.ra, body.dec))
+        (alt, az, ra, dec), (alt2, az2, ra2, dec2) = positions
+        seconds = self.rate_interval * 86400.0
+        return {'target': target, 'alt': math.degrees(alt), 'az': math.degrees(az), 'ra': math.degrees(ra),
+            'dec': math.degrees(dec), 'alt_rate': math.degrees(alt2 - alt) * 3600.0 / seconds,
+            'az_rate': math.degrees((az2 - az + math.pi) % (2 * math.pi) - math.pi) * 3600.0 / seconds}
+
+    def respond(self, request):
+        """The response to a decoded request.
+
+        Requests with ``"op": "define"`` add a target from an XEphem ``db``
+        line, and ``"op": "targets"`` lists the defined targets. Other
+        requests ask for the pointing of ``targets``, for an optional
+        ``observer`` and :mod:`ephem` ``date``. Errors, including those
+        from :mod:`ephem` computations, are returned as an ``error`` message.
+        """
+        response = {'id': request.get('id')}
+        try:
+            op = request.get('op', 'point')
+            if op == 'define':
+                self.define(request['target'], request['db'])
+            elif op == 'targets':
+                response['targets'] = sorted(self.targets)
+            elif op == 'point':
+                targets = request['targets']
+                if isinstance(targets, (str, type(''))):
+                    targets = [targets]
+                response['date'], response['results'] = self.point(targets, request.get('observer'),
+                    request.get('date'))
+            else:
+                raise ValueError("Unknown operation '{}'.".format(op))
+        except (KeyError, ValueError, TypeError, RuntimeError) as error:
+            response['error'] = error.args[0] if error.args else repr(error)
+        return response
+
+    def _flush(self):
+        """Answer every request received in this pass of the event loop.
+
+        An unexpected error in one request is sent to that client, and the
+        other requests are still answered.
+        """
+        pending, self._pending = self._pending, []
+        for request, future in pending:
+            try:
+                response = self.respond(request)
+            except Exception as error:
+                response = {'id': request.get('id'), 'error': "Internal error: {!r}".format(error)}
+            if not future.cancelled():
+                future.set_result(response)
+
+    async def _client(self, reader, writer):
+        """Answer the requests of one connection, one line at a time."""
+        loop = asyncio.get_event_loop()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line.decode('utf-8'))
+                    if not isinstance(request, dict):
+                        raise ValueError("Requests must be JSON objects.")
+                except ValueError as error:
+                    response = {'id': None, 'error': "Bad request: {}".format(error)}
+                else:
+                    future = loop.create_future()
+                    if not self._pending:
+                        loop.call_soon(self._flush)
+                    self._pending.append((request, future))
+                    response = await future
+                try:
+                    line = json.dumps(response, separators=(',', ':'), allow_nan=False)
+                except ValueError:
+                    line = json.dumps({'id': response.get('id'), 'error': "The response is not finite."})
+                writer.write(line.encode('utf-8') + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=0, path=None):
+        """Start listening, on a Unix socket if a path is given, or on TCP.
+
+        :returns: The :class:`asyncio.Server`.
+        """
+        if path is not None:
+            return await asyncio.start_unix_server(self._client, path)
+        return await asyncio.start_server(self._client, host, port)
+
+    async def serve_forever(self, host='127.0.0.1', port=0, path=None):
+        """Start listening, and serve until cancelled."""
+        server = await self.start(host, port, path)
+        async with server:
+            await server.serve_forever()
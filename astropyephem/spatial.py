@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+#
+#  spatial.py
+#  astropyephem
+#
+
+"""
+Separations and spatial indexing for collections of coordinates and bodies.
+
+Collections may be :class:`~astropy.coordinates.SkyCoord` arrays, or
+sequences of scalar coordinates and :mod:`astropyephem` or :mod:`ephem`
+bodies. Bodies are placed at their astrometric (J2000) position, either as
+already computed or computed at a given epoch, and everything is reduced to
+ICRS in a single batch.
+
+:class:`SkyIndex` needs :mod:`scipy`.
+"""
+
+from __future__ import (absolute_import, unicode_literals, division,
+                        print_function)
+
+import numpy as np
+
+import astropy.units as u
+from astropy.coordinates import SkyCoord, Angle, FK5
+
+from .bases import EQUINOX_J2000
+from .arrays import ephem_instance, ephem_dates, sample, unit_vectors
+from .constraints import angular_separation
+
+__all__ = ['catalog_positions', 'separation_matrix', 'SkyIndex']
+
+def catalog_positions(targets, epoch=None):
+    """ICRS right ascensions and declinations in radians for a collection of targets.
+
+    :param targets: A :class:`~astropy.coordinates.SkyCoord`, or a sequence of
+        scalar coordinates and bodies.
+    :param epoch: An :class:`astropy.time.Time` at which to compute bodies. If
+        `None`, bodies are used as they were last computed.
+    """
+    if isinstance(targets, SkyCoord):
+        icrs = targets.icrs
+        return np.atleast_1d(icrs.ra.radian).ravel(), np.atleast_1d(icrs.dec.radian).ravel()
+    ra, dec = np.empty(len(targets)), np.empty(len(targets))
+    fk5 = np.zeros(len(targets), dtype=bool)
+    date = None if epoch is None else float(ephem_dates(epoch))
+    for i, target in enumerate(targets):
+        if isinstance(target, SkyCoord):
+            icrs = target.icrs
+            ra[i], dec[i] = icrs.ra.radian, icrs.dec.radian
+        elif date is None:
+            body = ephem_instance(target)
+            ra[i], dec[i] = body.a_ra, body.a_dec
+            fk5[i] = True
+        else:
+            position = sample(target, [date])
+            ra[i], dec[i] = position['a_ra'][0], position['a_dec'][0]
+            fk5[i] = True
+    if fk5.any():
+        icrs = SkyCoord(ra[fk5] * u.radian, dec[fk5] * u.radian, frame=FK5(equinox=EQUINOX_J2000)).icrs
+        ra[fk5], dec[fk5] = icrs.ra.radian, icrs.dec.radian
+    return ra, dec
+
+def separation_matrix(a, b, epoch=None):
+    """The angular separation between every member of ``a`` and every member of ``b``.
+
+    :param a: A :class:`~astropy.coordinates.SkyCoord`, or a sequence of coordinates and bodies.
+    :param b: A :class:`~astropy.coordinates.SkyCoord`, or a sequence of coordinates and bodies.
+    :param epoch: The :class:`astropy.time.Time` at which to compute bodies, see :func:`catalog_positions`.
+    :returns: An :class:`~astropy.coordinates.Angle` array of shape ``(len(a), len(b))``.
+    """
+    ra1, dec1 = catalog_positions(a, epoch)
+    ra2, dec2 = catalog_positions(b, epoch)
+    separation = angular_separation(ra1[:, np.newaxis], dec1[:, np.newaxis], ra2[np.newaxis, :], dec2[np.newaxis, :])
+    return Angle(separation, u.radian).to(u.deg)
+
+def _chord(angle):
+    """The chord length on the unit sphere for an angle."""
+    return 2.0 * np.sin(0.5 * np.minimum(u.Quantity(angle, u.radian).value, np.pi))
+
+class SkyIndex(object):
+    """A KD-tree of unit vectors for cone searches and nearest neighbours in a catalog.
+
+    :param catalog: A :class:`~astropy.coordinates.SkyCoord`, or a sequence of coordinates and bodies.
+    :param epoch: The :class:`astropy.time.Time` at which to compute bodies, see :func:`catalog_positions`.
+    """
+
+    def __init__(self, catalog, epoch=None):
+        super(SkyIndex, self).__init__()
+        try:
+            from scipy.spatial import cKDTree
+        except ImportError:
+            raise ImportError("SkyIndex requires scipy.")
+        self.epoch = epoch
+        self.ra, self.dec = catalog_positions(catalog, epoch)
+        self.tree = cKDTree(unit_vectors(self.ra, self.dec))
+
+    def __repr__(self):
+        """Represent this index."""
+        return "<{} {} positions>".format(self.__class__.__name__, len(self))
+
+    def __len__(self):
+        return len(self.ra)
+
+    def cone_search(self, center, radius):
+        """Indices of the catalog entries within a radius of a center.
+
+        ``center`` may be a scalar or array :class:`~astropy.coordinates.SkyCoord`,
+        or a sequence of targets. For a scalar center, returns a sorted index
+        array; otherwise returns a list of them, one per center.
+        """
+        ra, dec = catalog_positions([center] if _is_scalar(center) else center, self.epoch)
+        found = self.tree.query_ball_point(unit_vectors(ra, dec), _chord(radius) * (1 + 1e-12))
+        found = [np.array(sorted(indices), dtype=int) for indices in found]
+        return found[0] if _is_scalar(center) else found
+
+    def nearest(self, targets, k=1):
+        """The ``k`` nearest catalog entries to each target.
+
+        :returns: ``(indices, separations)`` arrays with shape ``(targets,)`` if
+            ``k`` is 1, and ``(targets, k)`` otherwise.
+        """
+        ra, dec = catalog_positions([targets] if _is_scalar(targets) else targets, self.epoch)
+        distance, index = self.tree.query(unit_vectors(ra, dec), k=k)
+        index = np.asarray(index)
+        separation = angular_separation(ra.reshape((-1,) + (1,) * (index.ndim - 1)),
+            dec.reshape((-1,) + (1,) * (index.ndim - 1)), self.ra[index], self.dec[index])
+        return index, Angle(separation, u.radian).to(u.deg)
+
+def _is_scalar(target):
+    """Whether a target is a single position rather than a collection."""
+    if isinstance(target, SkyCoord):
+        return target.isscalar
+    return not isinstance(target, (list, tuple, np.ndarray))
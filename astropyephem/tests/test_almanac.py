@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+def _observer():
+    """A test observer on Mauna Kea."""
+    from ..observers import Observer
+    from astropy.coordinates import Latitude, Longitude
+    import astropy.units as u
+    return Observer(lat=Latitude(19.8 * u.deg), lon=Longitude(-155.47 * u.deg), elevation=4000 * u.m)
+
+def test_almanac_matches_ephem():
+    """Almanac sunsets and twilights agree with the individual ephem searches."""
+    import astropy.time
+    import ephem
+    observer = _observer()
+    table = observer.almanac(astropy.time.Time("2014-03-01", scale='utc'), astropy.time.Time("2014-03-05", scale='utc'))
+    assert len(table) == 5
+    eobserver = observer.__wrapped_instance__.copy()
+    for row in table:
+        eobserver.date = row['date'].jd - 2415020.0 - 0.5
+        sunset = ephem.julian_date(eobserver.next_setting(ephem.Sun()))
+        assert abs(row['sunset'].jd - sunset) * 86400 < 2
+        eobserver.horizon = '-18'
+        dusk = ephem.julian_date(eobserver.next_setting(ephem.Sun(), use_center=True))
+        eobserver.horizon = '0'
+        assert abs(row['astronomical_twilight_evening'].jd - dusk) * 86400 < 60
+        assert row['sunset'] < row['civil_twilight_evening'] < row['astronomical_twilight_evening']
+        assert row['astronomical_twilight_morning'] < row['sunrise']
+
+def test_almanac_polar_day():
+    """Events which do not happen are masked."""
+    from ..observers import Observer
+    from astropy.coordinates import Latitude, Longitude
+    import astropy.units as u
+    import astropy.time
+    import numpy as np
+    observer = Observer(lat=Latitude(78 * u.deg), lon=Longitude(15 * u.deg))
+    table = observer.almanac(astropy.time.Time("2014-06-20", scale='utc'), astropy.time.Time("2014-06-21", scale='utc'))
+    assert np.all(table['sunset'].mask)
+    assert not np.any(table['date'].mask)
+    assert 'nan' not in str(table['sunset'][0]) and '-2147483648' not in str(table)
+    assert np.all((table['moon_illumination'] >= 0) & (table['moon_illumination'] <= 1))
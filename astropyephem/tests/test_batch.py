@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+TARGETS = """# A planet, fixed stars, and a comet.
+Mars
+M31 00:42:44.3 +41:16:09
+Vega 279.2347 38.7837
+C/2020 F3 (NEOWISE),e,128.9375,61.0103,37.2786,358.4460,0.0001240,0.999170,0.0000,07/03.6761/2020,2000,g  8.0,3.2
+"""
+
+def test_parse_target():
+    """Target lines are read as planets, fixed bodies and database entries."""
+    from ..batch import parse_target, observer_from_dict
+    import numpy as np
+    import ephem
+    import pytest
+
+    assert isinstance(parse_target("Jupiter"), ephem.Jupiter)
+    m31 = parse_target("M31 00:42:44.3 +41:16:09").__wrapped_instance__
+    assert m31.name == "M31" and abs(np.degrees(m31._ra) - 10.6846) < 1e-3
+    vega = parse_target("alpha Lyr 279.2347 38.7837").__wrapped_instance__
+    assert vega.name == "alpha Lyr" and abs(np.degrees(vega._dec) - 38.7837) < 1e-4
+    for line in ("Nowhere", "M31 00:42:44.3"):
+        with pytest.raises(ValueError):
+            parse_target(line)
+    observer = observer_from_dict({'lat': 19.8, 'lon': '-155:28:12', 'elevation': 4000, 'pressure': 600})
+    assert abs(np.degrees(observer.lat) - 19.8) < 1e-9 and observer.pressure == 600
+
+def test_batch_main(tmpdir, capsys):
+    """The command line tool writes the same ephemeris with one or several processes."""
+    from ..batch import main, read_targets, parse_target, observer_from_dict
+    from ..ephemeris import ephemeris_table
+    from astropy.table import Table
+    import astropy.time
+    import astropy.units as u
+    import numpy as np
+    import json
+
+    targets, observer = str(tmpdir.join("targets.txt")), str(tmpdir.join("observer.json"))
+    with open(targets, 'w') as stream:
+        stream.write(TARGETS)
+    definition = {'lat': 19.8, 'lon': -155.47, 'elevation': 4000}
+    with open(observer, 'w') as stream:
+        json.dump(definition, stream)
+    arguments = [targets, '--observer', observer, '--start', '2020-07-01', '--stop', '2020-07-02',
+        '--step', '1 hour', '--chunk-size', '10']
+    main(arguments + [str(tmpdir.join("one.csv")), '--processes', '1'])
+    main(arguments + [str(tmpdir.join("two.fits")), '--processes', '2'])
+    assert "100 rows for 4 targets" in capsys.readouterr().out
+
+    one = Table.read(str(tmpdir.join("one.csv")), format='ascii.csv')
+    two = Table.read(str(tmpdir.join("two.fits")))
+    start = astropy.time.Time("2020-07-01", scale='utc')
+    expected = ephemeris_table([parse_target(line) for line in read_targets(targets)], start, start + 1 * u.day,
+        1 * u.hour, observer=observer_from_dict(definition))
+    assert list(one['name']) == list(expected['name'])
+    for table in (one, two):
+        assert np.allclose(table['alt'], expected['alt'].value, atol=1e-9)
+        assert np.allclose(table['a_ra'], expected['a_ra'].value, atol=1e-9)
+
+def test_bounded_imap():
+    """Only a bounded number of tasks are read ahead of the consumer, and results keep their order."""
+    from ..batch import _bounded_imap
+    from multiprocessing.pool import ThreadPool
+
+    read = []
+
+    def tasks():
+        for i in range(100):
+            read.append(i)
+            yield i
+
+    pool = ThreadPool(4)
+    try:
+        results = _bounded_imap(pool, abs, tasks(), 8)
+        assert next(results) == 0
+        assert len(read) == 9
+        for i, result in enumerate(results, 1):
+            assert result == i
+            assert len(read) <= i + 9
+    finally:
+        pool.close()
+        pool.join()
+    assert len(read) == 100
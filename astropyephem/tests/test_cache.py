@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+def test_geocentric_cache():
+    """Positions derived from the cache agree with ephem for each observer."""
+    from ..cache import GeocentricCache
+    import numpy as np
+    import ephem
+
+    cache = GeocentricCache(maxsize=4)
+    observers = []
+    for elevation, pressure in ((4000, 600), (4100, 0), (0, 1010)):
+        observer = ephem.Observer()
+        observer.lat, observer.lon = '19.8', '-155.47'
+        observer.elevation, observer.pressure = elevation, pressure
+        observer.date = '2014/3/1 10:00'
+        observers.append(observer)
+    arcsec = np.radians(1.0 / 3600.0)
+    for body in (ephem.Moon(), ephem.Mars(), ephem.Sun(), ephem.Io(), ephem.star('Sirius')):
+        for observer in observers:
+            result = cache.compute(body, observer)
+            body.compute(observer)
+            for name in ('g_ra', 'g_dec', 'a_ra', 'a_dec', 'mag'):
+                if name in result:
+                    assert abs(result[name] - getattr(body, name)) < 1e-8
+            assert abs(result['ra'] - body.ra) < arcsec
+            assert abs(result['dec'] - body.dec) < arcsec
+            assert abs(result['alt'] - body.alt) < arcsec
+            if hasattr(body, 'ha'):
+                assert abs((result['ha'] - body.ha + np.pi) % (2 * np.pi) - np.pi) < arcsec
+            assert abs((result['az'] - body.az + np.pi) % (2 * np.pi) - np.pi) < 2 * arcsec
+    assert cache.misses == 5
+    assert cache.hits == 10
+    assert len(cache) == 4
+
+def _nearby_stars():
+    """Two fixed bodies whose catalog lines, written by ephem, are identical."""
+    import ephem
+    stars = []
+    for ra, dec in (('10:00:00', '40:00:00'), ('10:00:00.04', '40:00:00.4')):
+        star = ephem.FixedBody()
+        star._ra, star._dec = ra, dec
+        stars.append(star)
+    return stars
+
+def test_geocentric_cache_exact_keys():
+    """Bodies which differ by less than the precision of their database lines are cached separately."""
+    from ..cache import GeocentricCache, body_key
+    import ephem
+
+    first, second = _nearby_stars()
+    assert first.writedb() == second.writedb()
+    assert body_key(first) != body_key(second)
+    observer = ephem.Observer()
+    observer.lat, observer.lon, observer.date = '19.8', '-155.47', '2014/3/1 10:00'
+    cache = GeocentricCache()
+    for star in (first, second):
+        result = cache.compute(star, observer)
+        star.compute(observer)
+        assert abs(result['a_dec'] - star.a_dec) < 1e-10
+        assert abs(result['a_ra'] - star.a_ra) < 1e-10
+    assert cache.misses == 2
+
+def test_refraction():
+    """The refraction model agrees with ephem from the zenith to below the horizon."""
+    from ..arrays import refract, unrefract
+    import numpy as np
+    import ephem
+
+    observer = ephem.Observer()
+    observer.date = '2014/3/1'
+    star = ephem.FixedBody()
+    star._dec, star._epoch = 0.0, observer.date
+    altitudes = np.radians(np.linspace(-12, 89, 300))
+    for temp, pressure in ((15, 1010), (-10, 600)):
+        observer.temp = temp
+        expected = []
+        for alt in altitudes:
+            star._ra = observer.sidereal_time() - (np.pi / 2 - alt)
+            observer.pressure = 0
+            star.compute(observer)
+            true = star.alt
+            observer.pressure = pressure
+            star.compute(observer)
+            expected.append((true, star.alt))
+        true, apparent = np.array(expected).T
+        assert np.all(np.abs(refract(true, temp, pressure) - apparent) < np.radians(0.2 / 3600.0))
+        visible = true > np.radians(-1)
+        assert np.all(np.abs(unrefract(apparent[visible], temp, pressure) - true[visible]) < np.radians(0.2 / 3600.0))
+
+def _fill_disk_cache(args):
+    """Compute positions through a shared disk cache, in a worker process."""
+    from ..cache import DiskCache
+    import ephem
+    filename, offset = args
+    cache = DiskCache(filename)
+    for i in range(20):
+        cache.compute(ephem.Mars(), 41000.0 + offset + i)
+    return cache.misses
+
+def test_disk_cache(tmpdir):
+    """Results persist between cache instances, searches are cached, and old entries are evicted."""
+    from ..cache import DiskCache
+    import multiprocessing
+    import ephem
+    import pytest
+
+    filename = str(tmpdir.join("cache.sqlite"))
+    observer = ephem.Observer()
+    observer.lat, observer.lon, observer.date = '19.8', '-155.47', '2014/3/1 10:00'
+    cache = DiskCache(filename)
+    result = cache.compute(ephem.Moon(), observer)
+    moon = ephem.Moon()
+    moon.compute(observer)
+    assert result['alt'] == moon.alt
+    assert result['earth_distance'] == moon.earth_distance
+    assert cache.misses == 1
+
+    again = DiskCache(filename)
+    assert again.compute(ephem.Moon(), observer) == result
+    assert again.hits == 1
+    assert again.compute(ephem.Moon(), 41000.0)['alt'] is None
+
+    rising = again.search(observer, 'next_rising', ephem.Sun())
+    assert rising == observer.next_rising(ephem.Sun())
+    assert again.search(observer, 'next_rising', ephem.Sun()) == rising
+    assert again.hits == 2
+    polar = ephem.Observer()
+    polar.lat, polar.date = '78', '2014/6/21'
+    for i in range(2):
+        with pytest.raises(ephem.AlwaysUpError):
+            again.search(polar, 'next_rising', ephem.Sun())
+
+    small = DiskCache(str(tmpdir.join("small.sqlite")), max_bytes=4000)
+    for i in range(20):
+        small.compute(ephem.Mars(), 41000.0 + i)
+    assert 0 < len(small) < 20
+    assert small.compute(ephem.Mars(), 41019.0) is not None
+    assert small.hits == 1
+
+    context = multiprocessing.get_context('fork')
+    pool = context.Pool(3)
+    try:
+        misses = pool.map(_fill_disk_cache, [(filename, 0), (filename, 10), (filename, 5)])
+    finally:
+        pool.close()
+        pool.join()
+    assert sum(misses) >= 30
+    assert len(DiskCache(filename)) == 4 + 30
+
+def test_disk_cache_exact_keys(tmpdir):
+    """Stored results of bodies which differ by less than the precision of their database lines are not shared."""
+    from ..cache import DiskCache
+    import ephem
+
+    filename = str(tmpdir.join("cache.sqlite"))
+    observer = ephem.Observer()
+    observer.lat, observer.lon, observer.date = '19.8', '-155.47', '2014/3/1 10:00'
+    first, second = _nearby_stars()
+    DiskCache(filename).compute(first, observer)
+    DiskCache(filename).search(observer, 'next_rising', first)
+    cache = DiskCache(filename)
+    result = cache.compute(second, observer)
+    second.compute(observer)
+    assert result['a_ra'] == second.a_ra
+    assert result['a_dec'] == second.a_dec
+    assert cache.search(observer, 'next_rising', second) == observer.next_rising(second)
+    assert cache.misses == 2 and cache.hits == 0
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+
+def test_constellation_matches_ephem():
+    """Batch constellation lookups agree with ephem, except within an arcsecond of a boundary."""
+    from ..constellations import constellation
+    from astropy.coordinates import SkyCoord
+    import astropy.units as u
+    import numpy as np
+    import ephem
+
+    random = np.random.RandomState(3)
+    coords = SkyCoord(random.uniform(0, 360, 20000) * u.deg,
+        np.degrees(np.arcsin(random.uniform(-1, 1, 20000))) * u.deg)
+    result = constellation(coords)
+    assert result.shape == coords.shape
+    fk5 = coords.fk5
+    expected = np.array([ephem.constellation((ra, dec))[0] for ra, dec in zip(fk5.ra.radian, fk5.dec.radian)])
+    assert np.sum(result != expected) <= 2
+
+    assert constellation(SkyCoord(10.68 * u.deg, 41.27 * u.deg)) == 'And'
+    names = constellation(coords[:10].reshape(2, 5), short_name=False)
+    assert names.shape == (2, 5)
+    assert names[0, 0] == ephem.constellation((fk5.ra.radian[0], fk5.dec.radian[0]))[1]
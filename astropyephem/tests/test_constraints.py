@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+def _observer():
+    """A test observer on Mauna Kea."""
+    from ..observers import Observer
+    from astropy.coordinates import Latitude, Longitude
+    import astropy.units as u
+    return Observer(lat=Latitude(19.8 * u.deg), lon=Longitude(-155.47 * u.deg), elevation=4000 * u.m)
+
+def test_constraint_grid_altitudes():
+    """Grid altitudes agree with per-object ephem computations."""
+    from ..constraints import constraint_grid
+    from ..targets import FixedBody, Mars
+    from astropy.coordinates import SkyCoord
+    import astropy.time
+    import astropy.units as u
+    import numpy as np
+
+    observer = _observer()
+    times = astropy.time.Time("2014-03-01 06:00", scale='utc') + np.linspace(0, 10, 21) * u.hour
+    coords = SkyCoord([10.0, 150.0, 250.0] * u.deg, [41.0, -20.0, 5.0] * u.deg)
+    bodies = [FixedBody(position=coord) for coord in coords] + [Mars()]
+    grid = constraint_grid(bodies, observer, times, min_altitude=30 * u.deg, max_sun_altitude=-12 * u.deg,
+        min_moon_separation=10 * u.deg, max_hour_angle=4 * u.hourangle)
+    assert grid.shape == (4, 21)
+    assert set(grid.masks) == set(['altitude', 'sun_altitude', 'moon_separation', 'hour_angle'])
+
+    eobserver = observer.__wrapped_instance__.copy()
+    eobserver.pressure = 0
+    for i, body in enumerate(bodies):
+        ebody = body.__wrapped_instance__.copy()
+        for j in (0, 10, 20):
+            eobserver.date = times[j].jd - 2415020.0
+            ebody.compute(eobserver)
+            assert abs(grid.altitude[i, j].to(u.arcsec).value - np.degrees(ebody.alt) * 3600) < 5
+
+    coord_grid = constraint_grid(coords, observer, times, max_airmass=2.0)
+    assert np.allclose(coord_grid.altitude.to(u.arcsec).value, grid.altitude[:3].to(u.arcsec).value, atol=2.0)
+    assert np.array_equal(coord_grid.observable, coord_grid.airmass.value <= 2.0)
+
+def test_constraint_grid_refraction():
+    """Refracted altitudes agree with ephem, and follow per-time weather and wavelength."""
+    from ..constraints import constraint_grid
+    from ..targets import FixedBody
+    from astropy.coordinates import SkyCoord
+    import astropy.time
+    import astropy.units as u
+    import numpy as np
+
+    observer = _observer()
+    times = astropy.time.Time("2014-03-01 06:00", scale='utc') + np.linspace(0, 10, 11) * u.hour
+    coords = SkyCoord([10.0, 150.0] * u.deg, [41.0, -20.0] * u.deg)
+    bodies = [FixedBody(position=coord) for coord in coords]
+    grid = constraint_grid(bodies, observer, times, refraction=True)
+    eobserver = observer.__wrapped_instance__.copy()
+    for i, body in enumerate(bodies):
+        ebody = body.__wrapped_instance__.copy()
+        for j in range(len(times)):
+            eobserver.date = times[j].jd - 2415020.0
+            ebody.compute(eobserver)
+            if ebody.alt > 0:
+                assert abs(grid.altitude[i, j].to(u.arcsec).value - np.degrees(ebody.alt) * 3600) < 5
+
+    geometric = constraint_grid(bodies, observer, times)
+    pressure = np.linspace(0, 1000, len(times)) * u.mbar
+    weather = constraint_grid(bodies, observer, times, refraction=True, temperature=0 * u.deg_C, pressure=pressure)
+    assert np.allclose(weather.altitude[:, 0].value, geometric.altitude[:, 0].value)
+    up = geometric.altitude > 0
+    assert np.all((weather.altitude - geometric.altitude)[:, 1:][up[:, 1:]] > 0)
+    blue = constraint_grid(bodies, observer, times, refraction=True, wavelength=400 * u.nm)
+    red = constraint_grid(bodies, observer, times, refraction=True, wavelength=1 * u.micron)
+    assert np.all(blue.altitude[up] > grid.altitude[up])
+    assert np.all(red.altitude[up] < grid.altitude[up])
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+def test_copy():
+    """Copies carry parameters and computed state, and are independent."""
+    from ..targets import FixedBody, Mars
+    from ..observers import Observer
+    from astropy.coordinates import SkyCoord, Latitude, Longitude
+    import astropy.units as u
+    import copy
+
+    star = FixedBody(SkyCoord(10 * u.deg, 20 * u.deg), name="Test")
+    star.compute("2014/3/1")
+    clone = star.copy()
+    assert isinstance(clone, FixedBody)
+    assert clone.__wrapped_instance__ is not star.__wrapped_instance__
+    assert clone.name == "Test"
+    assert clone.a_ra == star.a_ra
+    clone.fixed_position = SkyCoord(30 * u.deg, 20 * u.deg)
+    assert abs(star.fixed_position.ra - 10 * u.deg) < 1 * u.arcsec
+
+    observer = Observer(lat=Latitude(19.8 * u.deg), lon=Longitude(-155.47 * u.deg), elevation=4000 * u.m)
+    other = copy.copy(observer)
+    other.elevation = 10 * u.m
+    assert observer.elevation == 4000 * u.m
+    assert other.lat == observer.lat
+
+    mars = Mars()
+    mars.compute(observer)
+    assert mars.copy().alt == mars.alt
+
+def test_from_ephem():
+    """Existing ephem objects are wrapped without a copy."""
+    from ..targets import FixedBody
+    from ..functions import star, city
+    from ..observers import Observer
+    import ephem
+    import pytest
+
+    body = ephem.FixedBody()
+    assert FixedBody.from_ephem(body).__wrapped_instance__ is body
+    with pytest.raises(TypeError):
+        FixedBody.from_ephem(ephem.Mars())
+    assert isinstance(star("Sirius"), FixedBody)
+    assert star("Sirius").name == "Sirius"
+    assert isinstance(city("London"), Observer)
+
+def test_copy_pool():
+    """Pooled copies are reused, and reset from the template."""
+    from ..tools import CopyPool
+    from ..targets import Mars
+
+    template = Mars()
+    template.compute("2014/3/1")
+    pool = CopyPool(template)
+    with pool.borrow() as first:
+        first.compute("2015/3/1")
+        assert first.a_ra != template.a_ra
+    second = pool.acquire()
+    assert second is first
+    assert second.a_ra == template.a_ra
+    assert second.__wrapped_instance__ is not template.__wrapped_instance__
+    assert pool.acquire() is not second
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+def test_ephemeris_chunks():
+    """Chunks have bounded size, units, and agree with ephem."""
+    from ..ephemeris import ephemeris_chunks
+    from ..observers import Observer
+    from ..targets import Mars
+    from ..arrays import ephem_dates
+    from astropy.coordinates import Latitude, Longitude
+    import astropy.time
+    import astropy.units as u
+    import ephem
+
+    observer = Observer(lat=Latitude(19.8 * u.deg), lon=Longitude(-155.47 * u.deg), elevation=4000 * u.m)
+    start = astropy.time.Time("2014-03-01", scale='utc')
+    chunks = list(ephemeris_chunks([Mars(), ephem.Moon()], start, start + 1 * u.day, 1 * u.hour,
+        observer=observer, fields=('a_ra', 'a_dec', 'alt', 'mag'), chunk_size=10))
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5, 10, 10, 5]
+    assert chunks[0]['alt'].unit == u.deg
+    assert chunks[0]['mag'].unit == u.mag
+    assert chunks[3]['name'][0] == 'Moon'
+
+    date = ephem_dates(chunks[4]['time'][3])
+    body, eobserver = ephem.Moon(), observer.__wrapped_instance__.copy()
+    eobserver.date = date
+    body.compute(eobserver)
+    assert abs(chunks[4]['alt'][3].to(u.radian).value - body.alt) < 1e-9
+    assert abs(chunks[4]['a_ra'][3].to(u.radian).value - body.a_ra) < 1e-9
+
+def test_write_ephemeris(tmpdir):
+    """Chunks written to ECSV and FITS read back as one table."""
+    from ..ephemeris import ephemeris_chunks, ephemeris_table, write_ephemeris
+    from ..targets import Mars, Jupiter
+    from astropy.table import QTable
+    import astropy.time
+    import astropy.units as u
+    import numpy as np
+
+    start = astropy.time.Time("2014-03-01", scale='utc')
+    expected = ephemeris_table([Mars(), Jupiter()], start, start + 2 * u.day, 1 * u.hour)
+    for filename in ("ephemeris.ecsv", "ephemeris.fits"):
+        filename = str(tmpdir.join(filename))
+        chunks = ephemeris_chunks([Mars(), Jupiter()], start, start + 2 * u.day, 1 * u.hour, chunk_size=7)
+        assert write_ephemeris(chunks, filename) == len(expected) == 98
+        table = QTable.read(filename, astropy_native=True) if filename.endswith('.fits') else QTable.read(filename)
+        assert len(table) == len(expected)
+        assert list(table['name']) == list(expected['name'])
+        assert np.allclose(table['a_ra'].to(u.deg).value, expected['a_ra'].to(u.deg).value)
+        assert table['a_dec'].unit == u.deg
+        assert np.allclose((table['time'] - expected['time']).to(u.s).value, 0, atol=1e-3)
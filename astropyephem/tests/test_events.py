@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+def test_moon_phases_and_seasons():
+    """Moon phases and seasons agree with the ephem search functions."""
+    from ..events import moon_phases, seasons
+    import astropy.time
+    import ephem
+
+    start, stop = astropy.time.Time("2014-01-01", scale='utc'), astropy.time.Time("2016-01-01", scale='utc')
+    searches = {'new_moon': ephem.next_new_moon, 'first_quarter': ephem.next_first_quarter_moon,
+        'full_moon': ephem.next_full_moon, 'last_quarter': ephem.next_last_quarter_moon,
+        'march_equinox': ephem.next_vernal_equinox, 'june_solstice': ephem.next_summer_solstice,
+        'september_equinox': ephem.next_autumnal_equinox, 'december_solstice': ephem.next_winter_solstice}
+
+    phases = moon_phases(start, stop)
+    assert len(phases) == 99
+    assert list(phases['event'][:4]) == ['new_moon', 'first_quarter', 'full_moon', 'last_quarter']
+    table = seasons(start, stop)
+    assert len(table) == 8
+    for row in list(phases) + list(table):
+        date = row['time'].jd - 2415020.0
+        assert abs(searches[row['event']](date - 1.0) - date) < 2.0 / 86400.0
+
+def test_elongations_and_conjunctions():
+    """Greatest elongations are extrema, and conjunctions are classified."""
+    from ..events import greatest_elongations, conjunctions
+    from ..targets import Mercury
+    import astropy.time
+    import numpy as np
+    import ephem
+
+    start, stop = astropy.time.Time("2014-01-01", scale='utc'), astropy.time.Time("2015-01-01", scale='utc')
+    table = greatest_elongations(Mercury(), start, stop)
+    assert len(table) == 6
+    mercury = ephem.Mercury()
+    for row in table:
+        date = row['time'].jd - 2415020.0
+        nearby = []
+        for offset in np.linspace(-0.1, 0.1, 21):
+            mercury.compute(date + offset)
+            nearby.append(mercury.elong)
+        nearby = np.abs(nearby)
+        assert nearby.max() - nearby[10] < 1e-6 and nearby[10] > max(nearby[0], nearby[-1])
+        assert (row['event'] == 'greatest_elongation_east') == (row['value'] > 0)
+
+    table = conjunctions(ephem.Venus(), start, astropy.time.Time("2016-01-01", scale='utc'))
+    assert list(table['event']) == ['inferior_conjunction', 'superior_conjunction', 'inferior_conjunction']
+    table = conjunctions(ephem.Mars(), start, stop)
+    assert list(table['event']) == ['opposition']
+    assert abs(table['time'][0].jd - astropy.time.Time("2014-04-08 21:03", scale='utc').jd) < 1.0 / 24.0
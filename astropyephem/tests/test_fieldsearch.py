@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+def test_field_search():
+    """Field searches find the same bodies as propagating the whole catalog."""
+    from ..orbits import read_xephem
+    from ..fieldsearch import FieldIndex
+    from ..kepler import propagate
+    from ..arrays import ephem_dates
+    from ..constraints import angular_separation
+    from astropy.coordinates import SkyCoord
+    import astropy.time
+    import astropy.units as u
+    import numpy as np
+    import ephem
+    import pytest
+
+    random = np.random.RandomState(11)
+    lines = ["{},e,{},{},{},{},0,{},{},9/13.0/2023,2000,H{:.2f},0.15".format(i, random.uniform(0, 30),
+        random.uniform(0, 360), random.uniform(0, 360), random.uniform(0.9, 4), random.uniform(0, 0.5),
+        random.uniform(0, 360), random.uniform(10, 20)) for i in range(3000)]
+    catalog = read_xephem(lines)
+    start = astropy.time.Time("2024-01-01", scale='utc')
+    index = FieldIndex(catalog, start, start + 4 * u.day)
+    epoch = start + 1.3 * u.day
+    date = float(ephem_dates(epoch))
+    everything = propagate(catalog, [date])
+
+    for row in random.randint(len(catalog), size=3):
+        center = SkyCoord(everything['a_ra'][row, 0] * u.radian, everything['a_dec'][row, 0] * u.radian, frame='fk5')
+        table = index.search(center, 5 * u.deg, epoch)
+        separation = angular_separation(everything['a_ra'][:, 0], everything['a_dec'][:, 0],
+            center.ra.radian, center.dec.radian)
+        expected = set(str(i) for i in np.flatnonzero(separation <= np.radians(5)))
+        assert set(table['name']) == expected
+        assert table['separation'][0] < 1e-6 * u.deg
+
+    body = ephem.readdb(lines[int(table['name'][0])])
+    body.compute(date)
+    assert abs(body.mag - table['mag'][0].value) < 0.01
+    before, after = ephem.Date(date - 0.5 / 24), ephem.Date(date + 0.5 / 24)
+    body.compute(before)
+    ra, dec = body.a_ra, body.a_dec
+    body.compute(after)
+    ra_rate = np.degrees((body.a_ra - ra + np.pi) % (2 * np.pi) - np.pi) * np.cos(table['dec'][0]) * 3600
+    assert abs(ra_rate - table['ra_rate'][0].value) < 0.05
+    assert abs(np.degrees(body.a_dec - dec) * 3600 - table['dec_rate'][0].value) < 0.05
+
+    with pytest.raises(ValueError):
+        index.search(center, 5 * u.deg, start + 10 * u.day)
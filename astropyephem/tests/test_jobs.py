@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+def test_sharded_job(tmpdir):
+    """Shards are deterministic, restartable, and merge to the full ephemeris."""
+    from ..jobs import create_job, read_manifest, shards, run_worker, job_status, merge, _shard_path
+    from ..batch import parse_target, observer_from_dict
+    from ..ephemeris import ephemeris_table
+    from astropy.table import Table
+    import astropy.time
+    import astropy.units as u
+    import numpy as np
+    import os
+    import pytest
+
+    directory = str(tmpdir.join("job"))
+    targets = ["Mars", "Vega 279.2347 38.7837", "Jupiter"]
+    sites = {'summit': {'lat': 19.8, 'lon': -155.47, 'elevation': 4000}, 'base': {'lat': 19.7, 'lon': -155.1}}
+    start = astropy.time.Time("2014-03-01", scale='utc')
+    manifest = create_job(directory, targets, sites, start, start + 1 * u.day, 1 * u.hour, fields=('alt', 'az'),
+        targets_per_shard=2, times_per_shard=10)
+    assert manifest == read_manifest(directory)
+    assert len(shards(manifest)) == 2 * 2 * 3
+    assert shards(manifest)[0] == ('base', slice(0, 2), slice(0, 10))
+
+    assert run_worker(directory, worker="first", max_shards=5) == [0, 1, 2, 3, 4]
+    # A stale lock left by a dead worker is taken over; a fresh one is skipped.
+    open(_shard_path(directory, 5) + '.lock', 'w').close()
+    os.utime(_shard_path(directory, 5) + '.lock', (0, 0))
+    open(_shard_path(directory, 6) + '.lock', 'w').close()
+    assert job_status(directory) == {'shards': 12, 'finished': 5, 'locked': 2, 'waiting': 5}
+    with pytest.raises(ValueError):
+        merge(directory, str(tmpdir.join("merged.fits")))
+    assert run_worker(directory, worker="second") == [5, 7, 8, 9, 10, 11]
+    os.remove(_shard_path(directory, 6) + '.lock')
+    assert run_worker(directory) == [6]
+    assert run_worker(directory) == []
+
+    rows = merge(directory, str(tmpdir.join("merged.fits")))
+    merged = Table.read(str(tmpdir.join("merged.fits")))
+    assert rows == len(merged) == 2 * 3 * 25
+    summit = merged[(merged['site'] == 'summit') & (merged['name'] == 'Vega')]
+    expected = ephemeris_table(parse_target(targets[1]), start, start + 1 * u.day, 1 * u.hour,
+        observer=observer_from_dict(sites['summit']), fields=('alt', 'az'))
+    assert np.allclose(summit['alt'], expected['alt'].value, atol=1e-9)
+
+def test_locks(tmpdir):
+    """Locks are only released by their owner, stale locks are taken over once, and held locks are refreshed."""
+    from ..jobs import _claim, _release, _keep_alive, _read_lock
+    import threading
+    import time
+    import os
+
+    path = str(tmpdir.join("000000.ecsv.lock"))
+    assert _claim(path, "a 1", 60.0)
+    assert not _claim(path, "b 2", 60.0)
+    _release(path, "b 2")
+    assert _read_lock(path) == "a 1"
+
+    os.utime(path, (0, 0))
+    claims = []
+    threads = [threading.Thread(target=lambda owner=owner: claims.append(_claim(path, owner, 60.0)))
+        for owner in ("b 2", "c 3", "d 4")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert claims.count(True) == 1
+    assert _read_lock(path) in ("b 2", "c 3", "d 4")
+    assert sorted(os.listdir(str(tmpdir))) == ["000000.ecsv.lock"]
+
+    owner = _read_lock(path)
+    os.utime(path, (0, 0))
+    stopped = threading.Event()
+    keeper = threading.Thread(target=_keep_alive, args=(path, owner, 0.01, stopped))
+    keeper.start()
+    time.sleep(0.1)
+    stopped.set()
+    keeper.join()
+    assert time.time() - os.path.getmtime(path) < 60.0
+    assert not _claim(path, "e 5", 60.0)
+    _release(path, owner)
+    assert not os.path.exists(path)
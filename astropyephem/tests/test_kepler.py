@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+
+def test_solve_kepler():
+    """Kepler's equation is solved for eccentric and hyperbolic orbits."""
+    from ..kepler import solve_kepler, solve_hyperbolic
+    import numpy as np
+
+    random = np.random.RandomState(3)
+    M = random.uniform(-20, 20, 1000)
+    e = random.uniform(0, 0.99, 1000)
+    E = solve_kepler(M, e)
+    assert np.allclose(np.remainder(E - e * np.sin(E) - M + np.pi, 2 * np.pi) - np.pi, 0, atol=1e-10)
+    e = random.uniform(1.001, 5, 1000)
+    H = solve_hyperbolic(M, e)
+    assert np.allclose(e * np.sinh(H) - H, M, atol=1e-9)
+
+def test_propagate():
+    """Vectorized propagation agrees with ephem for each kind of orbit."""
+    from ..kepler import propagate
+    from ..orbits import read_xephem
+    from ..arrays import earth_velocity, precession_matrix, unit_vectors, radec_from_vectors
+    from .test_orbits import XEPHEM_LINES
+    import numpy as np
+    import ephem
+
+    lines = XEPHEM_LINES[1:4] + ["1P/Halley,e,162.2384,59.3937,112.2128,17.93003,0,0.9679221,38.3838,2/17.9/1994,2000,g 5.5,4"]
+    catalog = read_xephem(lines)
+    dates = np.array([ephem.Date('1981/1/1'), ephem.Date('2020/7/20'), ephem.Date('2024/2/3 5:00')])
+    result = propagate(catalog, dates)
+    assert result['a_ra'].shape == (4, 3)
+    for i, line in enumerate(lines):
+        body = ephem.readdb(line)
+        for j, date in enumerate(dates):
+            body.compute(date)
+            ra, dec = result['a_ra'][i, j], result['a_dec'][i, j]
+            if catalog.kinds[i] == 'p':
+                # ephem includes the annual aberration for parabolic orbits.
+                velocity = np.dot(precession_matrix(date).T, earth_velocity(date))
+                ra, dec = radec_from_vectors(unit_vectors(ra, dec) + velocity)
+            assert ephem.separation((body.a_ra, body.a_dec), (ra, dec)) < np.radians(1.5 / 3600.0)
+            assert abs(body.earth_distance / result['earth_distance'][i, j] - 1) < 1e-4
+            assert abs(body.sun_distance / result['sun_distance'][i, j] - 1) < 1e-4
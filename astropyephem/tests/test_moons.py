@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+def test_moon_offsets():
+    """Moon offsets match each moon computed by ephem."""
+    from ..moons import moon_offsets
+    import astropy.time
+    import astropy.units as u
+    import numpy as np
+    import ephem
+    import pytest
+
+    times = astropy.time.Time("2024-01-01", scale='utc') + np.arange(5) * u.hour
+    offsets = moon_offsets('Jupiter', times)
+    assert offsets['x'].shape == (4, 5)
+    europa = ephem.Europa()
+    for i, time in enumerate(times):
+        europa.compute(time.jd - 2415020.0)
+        assert abs(offsets['x'][1, i] - europa.x) < 1e-5
+        assert abs(offsets['z'][1, i] - europa.z) < 1e-5
+    with pytest.raises(ValueError):
+        moon_offsets('Venus', times)
+
+def test_moon_events():
+    """Occultations and eclipses of Io fall where ephem hides it."""
+    from ..moons import moon_events
+    import astropy.time
+    import astropy.units as u
+    import ephem
+
+    start = astropy.time.Time("2024-01-01", scale='utc')
+    table = moon_events('Jupiter', start, start + 3 * u.day, mutual=False)
+    assert set(table['event']) == set(['transit', 'occultation', 'shadow_transit', 'eclipse'])
+    io = ephem.Io()
+    for row in table[table['moon'] == 'Io']:
+        middle = row['middle'].jd - 2415020.0
+        io.compute(middle)
+        if row['event'] == 'occultation':
+            assert not io.earth_visible
+            # Contacts are for the edge of Io, which is a minute or two before its center.
+            for contact, sign in ((row['start'], -1), (row['end'], 1)):
+                date = contact.jd - 2415020.0
+                io.compute(date + sign * 5.0 / 1440.0)
+                assert io.earth_visible
+                io.compute(date - sign * 5.0 / 1440.0)
+                assert not io.earth_visible
+        elif row['event'] == 'eclipse':
+            assert not io.sun_visible
+        assert row['start'] < row['middle'] < row['end']
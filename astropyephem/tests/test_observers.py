@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+def test_sidereal_times_and_hour_angles():
+    """Vectorized sidereal times and hour angles agree with ephem, for arrays of sites and times."""
+    from ..observers import Observer, local_sidereal_time
+    from astropy.coordinates import Latitude, Longitude
+    import astropy.time
+    import astropy.units as u
+    import numpy as np
+    import ephem
+
+    observer = Observer(lat=Latitude(19.8 * u.deg), lon=Longitude(-155.47 * u.deg), elevation=4000 * u.m)
+    times = astropy.time.Time("2014-03-01", scale='utc') + np.linspace(0, 400, 50) * u.day
+    lst = observer.sidereal_times(times)
+    assert isinstance(lst, Longitude) and lst.shape == (50,)
+    eobserver = observer.__wrapped_instance__.copy()
+    mars = ephem.Mars()
+    ra, expected = [], []
+    for time in times:
+        eobserver.date = time.jd - 2415020.0
+        mars.compute(eobserver)
+        ra.append(mars.ra)
+        expected.append((eobserver.sidereal_time(), mars.ha))
+    expected = np.array(expected)
+    assert np.all(np.abs((lst.radian - expected[:, 0] + np.pi) % (2 * np.pi) - np.pi) < np.radians(0.5 / 3600.0))
+    ha = observer.hour_angles(np.array(ra) * u.radian, times)
+    assert np.all((ha > -12 * u.hourangle) & (ha <= 12 * u.hourangle))
+    assert np.all(np.abs((ha.radian - expected[:, 1] + np.pi) % (2 * np.pi) - np.pi) < np.radians(0.5 / 3600.0))
+
+    sites = Longitude([0.0, 90.0, -155.47] * u.deg)
+    grid = local_sidereal_time(times, sites[:, np.newaxis])
+    assert grid.shape == (3, 50)
+    assert np.allclose(grid[2].hourangle, lst.hourangle)
+    assert np.allclose(((grid[1] - grid[0]).hourangle + 12) % 24 - 12, 6.0)
+
+def test_horizon_grid():
+    """A grid of azimuths and altitudes maps to the same places as ephem's radec_of, with refraction."""
+    from ..observers import Observer
+    from astropy.coordinates import Latitude, Longitude
+    import astropy.time
+    import astropy.units as u
+    import numpy as np
+
+    observer = Observer(lat=Latitude(19.8 * u.deg), lon=Longitude(-155.47 * u.deg), elevation=4000 * u.m)
+    observer.pressure = 620 * 1e-3 * u.bar
+    az, alt = np.meshgrid(np.arange(0, 360, 30.0) * u.deg, [0.0, 5.0, 14.8, 30.0, 60.0, 89.5] * u.deg)
+    grid = observer.horizon_grid(az, alt)
+    assert grid.shape == (6, 12)
+    eobserver = observer.__wrapped_instance__.copy()
+    for time in astropy.time.Time(["2014-03-01 08:00", "2021-06-01 12:30"], scale='utc'):
+        ra, dec = grid.radec(time)
+        assert isinstance(ra, Longitude) and ra.shape == (6, 12)
+        eobserver.date = time.jd - 2415020.0
+        expected = np.array([eobserver.radec_of(a, b) for a, b in zip(az.to(u.radian).value.flat, alt.to(u.radian).value.flat)])
+        dra = (ra.radian.flatten() - expected[:, 0] + np.pi) % (2 * np.pi) - np.pi
+        errors = np.hypot(dra * np.cos(expected[:, 1]), dec.radian.flatten() - expected[:, 1])
+        assert np.all(errors < np.radians(1.0 / 3600.0))
+
+    single = observer.horizon_grid(az, alt, dtype=np.float32)
+    assert single.vectors.dtype == np.float32
+    assert np.all(np.abs(single.radec(time)[1] - dec) < 0.2 * u.arcsec)
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+XEPHEM_LINES = [
+    "# A comment, and orbit types which are not read",
+    "1 Ceres,e,10.5868,80.2550,73.4218,2.7672543,0.2141068,0.0789126,60.0788,9/13.0/2023,2000,H3.34,0.12",
+    "C/1980 E1 (Bowell),h,03/12.4200/1982,1.6619,114.5589,135.0822,1.057731,3.363949,2000,g 3.5,4",
+    "C/2020 F3 (NEOWISE),p,07/03.6745/2020,128.9375,37.2786,0.294654,61.0102,2000,g 6.0,4.0",
+    "Sirius,f|M|A1,6:45:09.3,-16:42:47,-1.44,2000,0",
+    "",
+]
+
+def test_xephem_catalog():
+    """Bodies from an XEphem catalog match ephem.readdb."""
+    from ..orbits import iter_xephem, read_xephem
+    import ephem
+
+    chunks = list(iter_xephem(XEPHEM_LINES, chunk_size=2))
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    catalog = read_xephem(XEPHEM_LINES)
+    assert len(catalog) == 3
+    assert list(catalog.kinds) == ['e', 'h', 'p']
+    assert 'Sirius' not in catalog
+
+    observer = ephem.Observer()
+    observer.date = '2020/7/20'
+    for line in XEPHEM_LINES[1:4]:
+        expected = ephem.readdb(line)
+        body = catalog.body(expected.name).__wrapped_instance__
+        body.compute(observer)
+        expected.compute(observer)
+        assert body.writedb() == expected.writedb()
+        assert float(body.ra) == float(expected.ra)
+        assert body.mag == expected.mag
+
+def test_catalog_files_closed(tmpdir, monkeypatch):
+    """Catalog files opened from a filename are closed when read, or when reading stops early."""
+    from ..orbits import _open, iter_xephem, read_xephem
+    import gzip
+    import io
+
+    filename = str(tmpdir.join("orbits.edb.gz"))
+    with gzip.open(filename, 'wt') as stream:
+        stream.write("\n".join(XEPHEM_LINES))
+    assert len(read_xephem(filename)) == 3
+    with _open(filename) as lines:
+        pass
+    assert lines.closed
+    with _open(XEPHEM_LINES) as lines:
+        assert lines is XEPHEM_LINES
+
+    plain = str(tmpdir.join("orbits.edb"))
+    with io.open(plain, 'w') as stream:
+        stream.write("\n".join(XEPHEM_LINES))
+    opened, original = [], io.open
+    monkeypatch.setattr(io, 'open', lambda *args, **kwargs: opened.append(original(*args, **kwargs)) or opened[-1])
+    chunks = iter_xephem(plain, chunk_size=1)
+    next(chunks)
+    chunks.close()
+    assert len(opened) == 1 and opened[0].closed
+
+def test_mpcorb_catalog():
+    """Fixed-width MPCORB lines are read, and found by packed designation."""
+    from ..orbits import read_mpcorb
+    import numpy as np
+    import ephem
+
+    ceres = "{:7s} {:5.2f} {:5.2f} {:5s}  {:9.5f}  {:9.5f}  {:9.5f}  {:9.5f}  {:9.7f} {:11.8f} {:11.7f}".format(
+        "00001", 3.34, 0.12, "K239D", 60.0788, 73.4218, 80.2550, 10.5868, 0.0789126, 0.2141068, 2.7672543)
+    ceres = ceres.ljust(166) + "(1) Ceres"
+    catalog = read_mpcorb(["MPCORB header", "-" * 160, ceres, ""])
+    assert len(catalog) == 1
+    assert catalog.row("00001") == catalog.row("(1) Ceres") == 0
+    assert catalog['epoch_M'][0] == float(ephem.Date('2023/9/13'))
+    assert np.allclose(np.degrees(catalog['inc']), 10.5868)
+
+    body = catalog.body("00001").__wrapped_instance__
+    expected = ephem.readdb(XEPHEM_LINES[1])
+    body.compute('2020/7/20')
+    expected.compute('2020/7/20')
+    assert abs(ephem.separation(body, expected)) < np.radians(1.0 / 3600.0)
+    assert body.mag == expected.mag
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+
+def test_fast_precision():
+    """Fast positions agree with exact ones, and the setting is global or per call."""
+    from ..bases import precision, set_precision
+    from ..targets import Mars, FixedBody
+    from astropy.coordinates import SkyCoord
+    import astropy.units as u
+    import ephem
+    import pytest
+
+    mars = Mars()
+    mars.compute("2014/3/1")
+    star = FixedBody()
+    star._ra, star._dec = "10:00:00", "40:00:00"
+    star.__wrapped_instance__._epoch = ephem.Date("1950/1/1")
+    star.compute("2014/3/1")
+    for body in (mars, star):
+        for kind in ('astrometric', 'geocentric', 'apparent'):
+            exact = SkyCoord(body.icrs_position(kind, 'exact'))
+            fast = SkyCoord(body.icrs_position(kind, 'fast'))
+            assert exact.separation(fast) < 1 * u.uas
+
+    with precision('fast'):
+        assert SkyCoord(mars.position).separation(SkyCoord(mars.icrs_position(precision='exact'))) < 1 * u.uas
+        assert set_precision('exact') == 'fast'
+        set_precision('fast')
+    assert set_precision('exact') == 'exact'
+    with pytest.raises(ValueError):
+        set_precision('sloppy')
+    with pytest.raises(ValueError):
+        mars.icrs_position(precision='sloppy')
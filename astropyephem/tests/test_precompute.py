@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+def test_table_roundtrip(tmpdir):
+    """Interpolated table positions agree with a direct computation."""
+    from ..precompute import write_table, EphemerisTable
+    from ..arrays import ephem_dates
+    import astropy.time
+    import astropy.units as u
+    import numpy as np
+    import ephem
+
+    filename = str(tmpdir.join("table.bin"))
+    # Around the 2014 Mars opposition, where Phobos moves fastest on the sky.
+    start = astropy.time.Time("2014-04-04", scale='utc')
+    stop = astropy.time.Time("2014-04-12", scale='utc')
+    names = ['Mars', 'Moon', 'Io', 'Phobos', 'Mimas']
+    write_table(filename, start, stop, bodies=names)
+    table = EphemerisTable(filename)
+    assert table.bodies == names
+    assert isinstance(table.data, np.memmap)
+
+    times = astropy.time.Time("2014-04-08 05:17", scale='utc') + np.linspace(0, 8, 17) * u.hour
+    for name in names:
+        assert table.max_error(name) < 0.1 * u.arcsec
+        ra, dec = table.radec(name, times)
+        body = getattr(ephem, name)()
+        for date, r, d in zip(ephem_dates(times), ra, dec):
+            body.compute(date)
+            assert ephem.separation((body.a_ra, body.a_dec), (r, d)) < np.radians(0.1 / 3600.0)
+
+def test_table_bad_file(tmpdir):
+    """Files without the table header are rejected."""
+    from ..precompute import EphemerisTable
+    import pytest
+    filename = tmpdir.join("table.bin")
+    filename.write(b"not a table at all", mode='wb')
+    with pytest.raises(ValueError):
+        EphemerisTable(str(filename))
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+def test_schedule_feasible():
+    """Scheduled observations do not overlap and respect the constraints."""
+    from ..observers import Observer
+    from ..scheduler import ObservingBlock, Scheduler, night_window
+    from ..constraints import constraint_grid
+    from astropy.coordinates import SkyCoord, Latitude, Longitude
+    import astropy.time
+    import astropy.units as u
+    import numpy as np
+
+    observer = Observer(lat=Latitude(19.8 * u.deg), lon=Longitude(-155.47 * u.deg), elevation=4000 * u.m)
+    start, stop = night_window(observer, astropy.time.Time("2014-03-01", scale='utc'))
+    assert start < stop
+    ra = np.linspace(0, 330, 12)
+    blocks = [ObservingBlock(SkyCoord(r * u.deg, 20 * u.deg), 20 * u.minute, priority=1 + i % 3, name=str(i))
+              for i, r in enumerate(ra)]
+    scheduler = Scheduler(observer, min_altitude=30 * u.deg)
+    schedule = scheduler.schedule(blocks, start, stop)
+    assert len(schedule) + len(schedule.unscheduled) == len(blocks)
+    assert len(schedule) > 0
+
+    table = schedule.to_table()
+    assert np.all(table['start'][1:] >= table['end'][:-1])
+    for observation in schedule:
+        grid = constraint_grid([observation.block.target], observer,
+            astropy.time.Time([observation.start, observation.end]))
+        assert np.all(grid.altitude > 29.9 * u.deg)
+
+def test_schedule_many_blocks():
+    """A thousand blocks are scheduled quickly, and only above the horizon by default."""
+    from ..observers import Observer
+    from ..scheduler import ObservingBlock, Scheduler
+    from ..constraints import constraint_grid
+    from astropy.coordinates import SkyCoord, Latitude, Longitude
+    import astropy.time
+    import astropy.units as u
+    import numpy as np
+    import time
+
+    observer = Observer(lat=Latitude(19.8 * u.deg), lon=Longitude(-155.47 * u.deg), elevation=4000 * u.m)
+    random = np.random.RandomState(42)
+    ra, dec = random.uniform(0, 360, 1000), np.degrees(np.arcsin(random.uniform(-1, 1, 1000)))
+    blocks = [ObservingBlock(SkyCoord(r * u.deg, d * u.deg), 5 * u.minute, priority=random.uniform(1, 3), name=str(i))
+              for i, (r, d) in enumerate(zip(ra, dec))]
+    start = astropy.time.Time("2014-03-01 06:00", scale='utc')
+    scheduler = Scheduler(observer)
+    began = time.time()
+    schedule = scheduler.schedule(blocks, start, start + 10 * u.hour)
+    assert time.time() - began < 1.0
+    assert len(schedule) > 50
+    assert len(schedule) + len(schedule.unscheduled) == len(blocks)
+    for observation in schedule[:20]:
+        grid = constraint_grid([observation.block.target], observer,
+            astropy.time.Time([observation.start, observation.end]))
+        assert np.all(grid.altitude > -0.1 * u.deg)
+
+def test_night_window_polar_day():
+    """There is no night to schedule during polar day."""
+    from ..observers import Observer
+    from ..scheduler import night_window
+    from astropy.coordinates import Latitude, Longitude
+    import astropy.time
+    import astropy.units as u
+    import pytest
+
+    observer = Observer(lat=Latitude(78.2 * u.deg), lon=Longitude(15.6 * u.deg), elevation=10 * u.m)
+    with pytest.raises(ValueError):
+        night_window(observer, astropy.time.Time("2014-06-21", scale='utc'))
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+def test_point():
+    """Pointings agree with ephem, and are cached within a tick."""
+    from ..server import PointingServer
+    from ..observers import Observer
+    from ..targets import FixedBody
+    from astropy.coordinates import SkyCoord, Latitude, Longitude
+    import astropy.units as u
+    import numpy as np
+    import ephem
+
+    observer = Observer(lat=Latitude(19.8 * u.deg), lon=Longitude(-155.47 * u.deg), elevation=4000 * u.m)
+    server = PointingServer(observer, {'M31': FixedBody(SkyCoord(10.68 * u.deg, 41.27 * u.deg))})
+    date = ephem.Date("2014/3/1 10:00")
+    result_date, results = server.point(['Mars', 'M31', 'Mars'], date=date)
+    assert result_date == date
+    assert (server.misses, server.hits) == (2, 1)
+    eobserver = observer.__wrapped_instance__.copy()
+    eobserver.date = date
+    mars = ephem.Mars(eobserver)
+    assert abs(results[0]['alt'] - np.degrees(mars.alt)) < 1e-9
+    eobserver.date = date + 10.0 / 86400.0
+    mars.compute(eobserver)
+    assert abs(results[0]['alt'] + 10.0 * results[0]['alt_rate'] / 3600.0 - np.degrees(mars.alt)) < 1e-5
+
+    assert 'error' in server.respond({'targets': ['Nothing']})
+    assert 'error' in server.respond({'op': 'define', 'target': 'comet'})
+    db = "C/2002 Y1 (Juels-Holvorcem),e,103.7816,166.2194,128.8232,242.3470,0.0002843,0.99713,0.0000,04/13.2508/2003,2000,g  6.5,4.0"
+    assert server.respond({'id': 3, 'op': 'define', 'target': 'comet', 'db': db}) == {'id': 3}
+    assert server.respond({'op': 'targets'})['targets'] == ['M31', 'Mars', 'comet']
+    assert 'error' in server.respond({'targets': ['Mars'], 'date': float('nan')})
+    assert 'error' in server.respond({'targets': ['Mars'], 'date': float('inf')})
+
+def test_flush_errors():
+    """An error computing one request is answered to that client, and the rest of the batch is still answered."""
+    from ..server import PointingServer
+    from ..observers import Observer
+    import asyncio
+
+    server = PointingServer(Observer())
+    compute = server._compute
+
+    def failing(target, observer, date):
+        if target == 'Saturn':
+            raise RuntimeError("cannot compute")
+        if target == 'Venus':
+            raise ZeroDivisionError("unexpected")
+        return compute(target, observer, date)
+    server._compute = failing
+
+    async def run():
+        loop = asyncio.get_event_loop()
+        futures = []
+        for i, target in enumerate(['Saturn', 'Venus', 'Mars']):
+            futures.append(loop.create_future())
+            server._pending.append(({'id': i, 'targets': [target], 'date': 41698.5}, futures[-1]))
+        loop.call_soon(server._flush)
+        return await asyncio.wait_for(asyncio.gather(*futures), 10)
+
+    saturn, venus, mars = asyncio.run(run())
+    assert saturn == {'id': 0, 'error': "cannot compute"}
+    assert venus['id'] == 1 and 'unexpected' in venus['error']
+    assert mars['results'][0]['target'] == 'Mars'
+
+def test_server_socket():
+    """Requests over a socket are answered together, from one computation per tick."""
+    from ..server import PointingServer
+    from ..observers import Observer
+    import asyncio
+    import json
+
+    server = PointingServer({'summit': Observer(), 'base': Observer()})
+
+    async def request(port, message):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(json.dumps(message).encode('utf-8') + b'\n')
+        writer.write(b'not json\n')
+        await writer.drain()
+        response = json.loads((await reader.readline()).decode('utf-8'))
+        error = json.loads((await reader.readline()).decode('utf-8'))
+        writer.close()
+        return response, error
+
+    async def run():
+        listener = await server.start()
+        port = listener.sockets[0].getsockname()[1]
+        message = {'id': 1, 'targets': ['Moon'], 'observer': 'summit', 'date': 41698.5}
+        answers = await asyncio.gather(*[request(port, message) for i in range(3)])
+        listener.close()
+        return answers
+
+    answers = asyncio.run(run())
+    assert all(answer == answers[0] for answer in answers)
+    response, error = answers[0]
+    assert response['id'] == 1 and response['results'][0]['target'] == 'Moon'
+    assert 'error' in error
+    assert (server.misses, server.hits) == (1, 2)
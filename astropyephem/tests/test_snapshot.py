@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+def test_snapshot():
+    """Snapshots hold every computed field, with units."""
+    from ..targets import Mars, Io, FixedBody
+    from ..observers import Observer
+    from astropy.coordinates import SkyCoord, Latitude, Longitude
+    import astropy.units as u
+    import numpy as np
+    import pytest
+
+    observer = Observer(lat=Latitude(19.8 * u.deg), lon=Longitude(-155.47 * u.deg), elevation=4000 * u.m)
+    observer.date = "2014/3/1 10:00"
+    mars = Mars()
+    with pytest.raises(RuntimeError):
+        mars.snapshot()
+    mars.compute(observer)
+    record = mars.snapshot()
+    body = mars.__wrapped_instance__
+    for name in ('ra', 'dec', 'a_ra', 'alt', 'az', 'mag', 'size', 'sun_distance', 'earth_distance', 'phase'):
+        assert record[name] == getattr(body, name)
+    units = record.dtype.metadata['units']
+    assert units['alt'] == 'rad'
+    assert u.Quantity(record['earth_distance'], units['earth_distance']) == mars.earth_distance
+
+    io = Io()
+    io.compute("2014/3/1")
+    record = io.snapshot()
+    assert 'earth_distance' not in record.dtype.names
+    assert np.isnan(record['alt'])
+    assert record['x'] == io.__wrapped_instance__.x
+
+    star = FixedBody(SkyCoord(10 * u.deg, 20 * u.deg))
+    star.compute(observer)
+    assert star.snapshot().dtype.names[:2] == ('ra', 'dec')
+
+def test_stream():
+    """Streams yield the same record, computed at each tick of the cadence."""
+    from ..targets import Mars
+    from ..observers import Observer
+    from astropy.coordinates import Latitude, Longitude
+    import astropy.time
+    import astropy.units as u
+    import ephem
+
+    observer = Observer(lat=Latitude(19.8 * u.deg), lon=Longitude(-155.47 * u.deg), elevation=4000 * u.m)
+    start = astropy.time.Time("2014-03-01 10:00", scale='utc')
+    stream = Mars().stream(observer, start, cadence=1 * u.minute)
+    eobserver = observer.__wrapped_instance__.copy()
+    mars = ephem.Mars()
+    first = next(stream)
+    for tick in range(1, 5):
+        record = next(stream)
+        assert record is first
+        eobserver.date = start.jd - 2415020.0 + tick / 1440.0
+        mars.compute(eobserver)
+        assert abs(record['date'] - eobserver.date) < 1e-9
+        for name in ('alt', 'az', 'ra', 'dec'):
+            assert abs(record[name] - getattr(mars, name)) < 1e-9
+        assert 0 < record['latency'] < 0.1
+    assert record.dtype.metadata['units']['latency'] == 's'
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+def test_separation_matrix():
+    """Separation matrices agree with ephem, pair by pair."""
+    from ..spatial import separation_matrix
+    from ..targets import Mars, Jupiter
+    from astropy.coordinates import SkyCoord
+    import astropy.time
+    import astropy.units as u
+    import numpy as np
+    import ephem
+
+    epoch = astropy.time.Time("2014-03-01", scale='utc')
+    a = SkyCoord([10, 120, 250] * u.deg, [-30, 5, 60] * u.deg)
+    b = [SkyCoord(121 * u.deg, 4 * u.deg), Mars(), Jupiter()]
+    matrix = separation_matrix(a, b, epoch=epoch)
+    assert matrix.shape == (3, 3)
+
+    positions = []
+    for target in b[1:]:
+        body = target.__wrapped_instance__
+        body.compute(ephem.Date(epoch.datetime))
+        positions.append((body.a_ra, body.a_dec))
+    for i, coord in enumerate(a):
+        assert abs(matrix[i, 0] - coord.separation(b[0])) < 1e-6 * u.arcsec
+        for j, position in enumerate(positions):
+            expected = ephem.separation((coord.fk5.ra.radian, coord.fk5.dec.radian), position)
+            assert abs(matrix[i, j + 1].radian - expected) < np.radians(0.1 / 3600.0)
+
+def test_sky_index():
+    """Cone searches and nearest neighbours agree with a brute force search."""
+    import pytest
+    pytest.importorskip('scipy')
+    from ..spatial import SkyIndex, separation_matrix
+    from astropy.coordinates import SkyCoord
+    import astropy.units as u
+    import numpy as np
+
+    random = np.random.RandomState(7)
+    catalog = SkyCoord(random.uniform(0, 360, 2000) * u.deg, np.degrees(np.arcsin(random.uniform(-1, 1, 2000))) * u.deg)
+    targets = SkyCoord(random.uniform(0, 360, 50) * u.deg, np.degrees(np.arcsin(random.uniform(-1, 1, 50))) * u.deg)
+    index = SkyIndex(catalog)
+    assert len(index) == 2000
+    matrix = separation_matrix(targets, catalog)
+
+    found = index.cone_search(targets, 5 * u.deg)
+    for row, indices in zip(matrix, found):
+        assert np.array_equal(indices, np.flatnonzero(row <= 5 * u.deg))
+    assert np.array_equal(index.cone_search(targets[0], 5 * u.deg), found[0])
+
+    nearest, separation = index.nearest(targets)
+    assert np.array_equal(nearest, np.argmin(matrix, axis=1))
+    assert np.allclose(separation.deg, matrix.deg.min(axis=1))
+    nearest, separation = index.nearest(targets, k=3)
+    assert nearest.shape == (50, 3)
+    assert np.all(np.diff(separation.deg, axis=1) >= 0)
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+
+def test_validate():
+    """The validation report covers every path, with errors at the expected levels."""
+    from ..validation import validate
+    from astropy.coordinates import SkyCoord, EarthLocation
+    from astropy.utils import iers
+    import astropy.time
+    import astropy.units as u
+    import numpy as np
+
+    times = astropy.time.Time("2014-03-01", scale='utc') + np.linspace(0, 300, 4) * u.day
+    site = EarthLocation(lat=19.8 * u.deg, lon=-155.47 * u.deg, height=4000 * u.m)
+    stars = SkyCoord([10.68, 279.23] * u.deg, [41.27, 38.78] * u.deg)
+    with iers.conf.set_temp('auto_download', False):
+        table = validate(times, [site], bodies=('Sun', 'Venus'), stars=stars, ephemeris='builtin')
+    assert len(table) == 2 * 2 + 2 + 4
+    assert np.all(table['samples'] == 4)
+    rows = dict(((row['target'], row['path']), row) for row in table)
+    assert rows[('Sun', 'astrometric')]['max'] < 1 * u.arcsec
+    assert rows[('0', 'astrometric')]['max'] < 0.01 * u.arcsec
+    for target in ('Sun', 'Venus', '0', '1'):
+        assert rows[(target, 'altaz')]['max'] < 15 * u.arcsec
+    assert np.all(table['ephem_time'] > 0)
@@ -9,4 +9,59 @@
 
 from __future__ import (absolute_import, unicode_literals, division, print_function)
 
+import threading
+import contextlib
 
+__all__ = ['CopyPool']
+
+class CopyPool(object):
+    """A pool of copies of a template body or observer, for transient use.
+    
+    Released wrappers are kept and given a fresh copy of the template's
+    :mod:`ephem` object when they are acquired again, so fan-out work over
+    many times does not build a new wrapper for every evaluation. Templates
+    which are plain :mod:`ephem` objects are simply copied.
+    
+    :param template: The body or observer to copy.
+    :param maxsize: The largest number of released copies to keep.
+    """
+    
+    def __init__(self, template, maxsize=32):
+        super(CopyPool, self).__init__()
+        self.template = template
+        self.maxsize = maxsize
+        self._free = []
+        self._lock = threading.Lock()
+        
+    def __repr__(self):
+        """Represent this pool."""
+        return "<{} of {!r}, {} free>".format(self.__class__.__name__, self.template, len(self._free))
+        
+    def acquire(self):
+        """A copy of the template, in the template's current state."""
+        with self._lock:
+            obj = self._free.pop() if self._free else None
+        if obj is None:
+            return self.template.copy()
+        obj.__dict__.clear()
+        obj.__dict__.update(self.template.__dict__)
+        obj.__dict__['__wrapped_instance__'] = self.template.__wrapped_instance__.copy()
+        obj.__dict__['__keywords__'] = set(self.template.__keywords__)
+        return obj
+        
+    def release(self, obj):
+        """Return a copy to the pool, after which it must not be used."""
+        if not hasattr(obj, '__wrapped_instance__'):
+            return
+        with self._lock:
+            if len(self._free) < self.maxsize:
+                self._free.append(obj)
+    
+    @contextlib.contextmanager
+    def borrow(self):
+        """A context manager which acquires a copy and releases it afterwards."""
+        obj = self.acquire()
+        try:
+            yield obj
+        finally:
+            self.release(obj)
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+#
+#  validation.py
+#  astropyephem
+#
+
+"""
+Accuracy and cost of the position properties, measured against :mod:`astropy`.
+
+:func:`validate` computes bodies through the wrappers, and the same places
+with :mod:`astropy.coordinates`, over grids of times and sites. For each
+target and each path it reports the distribution of the differences and the
+time taken per sample by each side. The paths are:
+
+``astrometric``
+    :attr:`~astropyephem.bases.EphemPositionClass.astrometric_position`,
+    against the light-time corrected barycentric position of the body less
+    that of the Earth (for stars, against the catalog position itself).
+``apparent``
+    :attr:`~astropyephem.bases.EphemPositionClass.apparent_position`, against
+    the geocentric :class:`~astropy.coordinates.GCRS` place from
+    :func:`~astropy.coordinates.get_body`.
+``altaz``
+    The refraction-free ``alt`` and ``az`` for each site, against
+    :class:`~astropy.coordinates.AltAz`.
+
+The comparison can be no better than the reference: with the ``builtin``
+:mod:`astropy` ephemeris the outer planets are themselves only good to some
+tens of arcseconds, so pass ``ephemeris='de432s'`` (or another JPL kernel)
+where one is available. :mod:`astropy` times are vectorized, so its time per
+sample is that of the whole batch divided by the number of samples.
+"""
+
+from __future__ import (absolute_import, unicode_literals, division,
+                        print_function)
+
+import timeit
+
+import numpy as np
+
+import astropy.units as u
+from astropy.time import Time
+from astropy.table import QTable
+from astropy.coordinates import (SkyCoord, EarthLocation, AltAz, get_body, get_body_barycentric,
+    SphericalRepresentation, solar_system_ephemeris, Latitude, Longitude)
+
+__all__ = ['VALIDATION_BODIES', 'astrometric_reference', 'validate', 'main']
+
+#: The bodies which can be validated against :mod:`astropy`, by wrapper class name.
+VALIDATION_BODIES = ('Sun', 'Moon', 'Mercury', 'Venus', 'Mars', 'Jupiter', 'Saturn', 'Uranus', 'Neptune')
+
+# The speed of light, in AU per day.
+_LIGHT_AU_PER_DAY = 173.1446326846693
+
+def astrometric_reference(name, times, iterations=3):
+    """The astrometric geocentric ICRS place of a solar system body, from :mod:`astropy`.
+
+    :param name: The body name, as used by :func:`~astropy.coordinates.get_body`.
+    :param times: An :class:`astropy.time.Time` array.
+    """
+    earth = get_body_barycentric('earth', times)
+    delay = np.zeros(times.shape) * u.day
+    for iteration in range(iterations):
+        vector = get_body_barycentric(name, times - delay) - earth
+        delay = vector.norm().to(u.AU).value / _LIGHT_AU_PER_DAY * u.day
+    spherical = vector.represent_as(SphericalRepresentation)
+    return SkyCoord(spherical.lon, spherical.lat, frame='icrs')
+
+def _observer(location):
+    """An observer at an :class:`~astropy.coordinates.EarthLocation`, without refraction."""
+    from .observers import Observer
+    observer = Observer(lat=Latitude(location.lat), lon=Longitude(location.lon), elevation=location.height)
+    observer.pressure = 0 * u.bar
+    return observer
+
+def _errors(found, expected):
+    """Separations in arcseconds between two coordinates, or alt/az pairs in degrees."""
+    if isinstance(found, SkyCoord):
+        return found.separation(expected).arcsec
+    (alt, az), (ref_alt, ref_az) = found, expected
+    daz = (az - ref_az + 180.0) % 360.0 - 180.0
+    return np.hypot(alt - ref_alt, daz * np.cos(np.radians(ref_alt))) * 3600.0
+
+def _row(target, path, site, errors, ephem_seconds, astropy_seconds):
+    """A row of the report."""
+    errors = np.asarray(errors)
+    return (target, path, site, len(errors), np.median(errors), np.percentile(errors, 95), np.max(errors),
+        1e3 * ephem_seconds / len(errors), 1e3 * astropy_seconds / len(errors))
+
+def _sweep(body, observers, times, properties):
+    """Compute a wrapped body at each time (and observer) and read its properties, with the time taken.
+
+    Bodies are computed geocentrically for the date if there are no observers.
+    """
+    values = []
+    began = timeit.default_timer()
+    for observer, time in zip(observers or [None] * len(times), times):
+        if observer is None:
+            body.compute(time)
+        else:
+            observer.date = time
+            body.compute(observer)
+        values.append(properties(body))
+    return values, timeit.default_timer() - began
+
+def _timed(func, *args):
+    """Call a function, returning its result and the time taken."""
+    began = timeit.default_timer()
+    result = func(*args)
+    return result, timeit.default_timer() - began
+
+def _coordinates(values):
+    """A coordinate array from a list of scalar coordinates."""
+    return SkyCoord([value.ra.deg for value in values] * u.deg, [value.dec.deg for value in values] * u.deg,
+        frame='icrs')
+
+def validate(times, sites=(), bodies=VALIDATION_BODIES, stars=None, ephemeris=None, precision=None):
+    """Compare the position properties with :mod:`astropy` over times and sites.
+
+    :param times: An :class:`astropy.time.Time` array.
+    :param sites: :class:`~astropy.coordinates.EarthLocation` objects for the
+        ``altaz`` path, which is skipped if there are none.
+    :param bodies: Names from :data:`VALIDATION_BODIES`.
+    :param stars: A :class:`~astropy.coordinates.SkyCoord` array of fixed
+        targets, which are named by their index.
+    :param ephemeris: The :mod:`astropy` solar system ephemeris, such as
+        ``builtin`` or ``de432s``. The current setting is used if not given.
+    :param precision: The precision of the position properties (see
+        :func:`~astropyephem.bases.set_precision`). The current setting is
+        used if not given.
+    :returns: A :class:`~astropy.table.QTable` with the ``target``, ``path``
+        and ``site``, the number of ``samples``, the ``median``, 95th
+        ``percentile`` and ``max`` errors, and the ``ephem_time`` and
+        ``astropy_time`` per sample.
+    """
+    from . import targets as wrappers
+    from .bases import set_precision
+    times = Time(times).reshape(-1)
+    previous = set_precision(precision) if precision else None
+    try:
+        return _validate(wrappers, times, sites, bodies, stars, ephemeris)
+    finally:
+        if previous:
+            set_precision(previous)
+
+def _validate(wrappers, times, sites, bodies, stars, ephemeris):
+    """Make the validation table, for :func:`validate`."""
+    with solar_system_ephemeris.set(ephemeris or solar_system_ephemeris.get()):
+        rows = []
+        for name in bodies:
+            body = getattr(wrappers, name)()
+            values, seconds = _sweep(body, None, times,
+                lambda body: (body.astrometric_position, body.apparent_position))
+            expected, reference = _timed(astrometric_reference, name.lower(), times)
+            rows.append(_row(name, 'astrometric', '', _errors(_coordinates([v[0] for v in values]), expected),
+                seconds, reference))
+            expected, reference = _timed(get_body, name.lower(), times)
+            expected = SkyCoord(expected.ra, expected.dec, frame='icrs')
+            rows.append(_row(name, 'apparent', '', _errors(_coordinates([v[1] for v in values]), expected),
+                seconds, reference))
+        targets = [] if stars is None else [(str(i), star) for i, star in enumerate(stars.icrs)]
+        for label, star in targets:
+            body = wrappers.FixedBody(star)
+            values, seconds = _sweep(body, None, times, lambda body: body.astrometric_position)
+            rows.append(_row(label, 'astrometric', '', _errors(_coordinates(values), star), seconds, 0.0))
+        for index, site in enumerate(sites):
+            observers = [_observer(site) for time in times]
+            frame = AltAz(obstime=times, location=site)
+            for label, body, star in [(name, getattr(wrappers, name)(), None) for name in bodies] + [(label,
+                wrappers.FixedBody(star), star) for label, star in targets]:
+                values, seconds = _sweep(body, observers, times,
+                    lambda body: (body.alt.to(u.deg).value, body.az.to(u.deg).value))
+                began = timeit.default_timer()
+                source = get_body(label.lower(), times, location=site) if star is None else star
+                expected = source.transform_to(frame)
+                reference = timeit.default_timer() - began
+                found = np.array(values).T
+                rows.append(_row(label, 'altaz', str(index), _errors(found, (expected.alt.deg, expected.az.deg)),
+                    seconds, reference))
+    columns = list(zip(*rows))
+    return QTable([np.array(columns[0], dtype=np.str_), np.array(columns[1], dtype=np.str_),
+        np.array(columns[2], dtype=np.str_), np.array(columns[3], dtype=int)]
+        + [u.Quantity(np.array(columns[i], dtype=np.float64), u.arcsec) for i in (4, 5, 6)]
+        + [u.Quantity(np.array(columns[i], dtype=np.float64), u.ms) for i in (7, 8)],
+        names=['target', 'path', 'site', 'samples', 'median', 'percentile', 'max', 'ephem_time', 'astropy_time'])
+
+def main(args=None):
+    """Command-line entry point to print an accuracy and timing report."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Compare astropyephem positions with astropy.")
+    parser.add_argument('--start', default='2014-01-01', help="First date (any astropy Time string).")
+    parser.add_argument('--stop', default='2024-01-01', help="Last date (any astropy Time string).")
+    parser.add_argument('--samples', type=int, default=50, help="Number of times between start and stop.")
+    parser.add_argument('--site', action='append', default=None,
+        help="A site as 'lat,lon,height' in degrees and meters (may be repeated).")
+    parser.add_argument('--ephemeris', default=None, help="Astropy solar system ephemeris, e.g. de432s.")
+    parser.add_argument('--precision', default=None, help="Precision of the position properties, exact or fast.")
+    opts = parser.parse_args(args)
+    start, stop = Time(opts.start, scale='utc'), Time(opts.stop, scale='utc')
+    times = start + (stop - start) * np.linspace(0, 1, opts.samples)
+    sites = []
+    for site in opts.site or ['19.8,-155.47,4000']:
+        lat, lon, height = [float(part) for part in site.split(',')]
+        sites.append(EarthLocation(lat=lat * u.deg, lon=lon * u.deg, height=height * u.m))
+    stars = SkyCoord([0.0, 90.0, 180.0, 279.2347] * u.deg, [0.0, 60.0, -60.0, 38.7837] * u.deg, frame='icrs')
+    table = validate(times, sites, stars=stars, ephemeris=opts.ephemeris, precision=opts.precision)
+    for name in ('median', 'percentile', 'max'):
+        table[name].info.format = '.2f'
+    for name in ('ephem_time', 'astropy_time'):
+        table[name].info.format = '.3f'
+    table.pprint(max_lines=-1, max_width=-1)